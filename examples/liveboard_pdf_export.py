@@ -31,6 +31,13 @@ try:
 except requests.exceptions.HTTPError as e:
     print(e)
 
+# For large PDFs, write directly to disk as the export downloads, rather than holding it in memory
+try:
+    ts.export_pinboard_pdf_to_file(destination="../Test PDF Streamed.pdf", pinboard_id=first_liveboard_id,
+                                   cover_page=False, filter_page=False, landscape_or_portrait='PORTRAIT')
+except requests.exceptions.HTTPError as e:
+    print(e)
+
 ts.session_logout()
 
 # See examples_v2 directory for V2 Endpoints with additional options
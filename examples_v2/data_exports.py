@@ -73,5 +73,33 @@ search_data_request = {
 }
 search_data_response = ts.searchdata(request=search_data_request)
 
+# For results of any size, the *_rows() / *_batches() methods page through record_offset until all rows are
+# retrieved, requesting the next page while the current one is processed, in constant memory
+search_data_stream_request = {
+    'query_string': tml_search_string,
+    'logical_table_identifier': ds_guid,
+    'data_format': 'COMPACT'
+}
+row_count = 0
+for row in ts.searchdata_rows(request=search_data_stream_request, record_size=10000):
+    # Do processing of each row (a List of values in COMPACT format)
+    row_count += 1
+print("Rows retrieved: {}".format(row_count))
+
+# Batches include the 'column_names' along with the 'data_rows' of each page
+for batch in ts.metadata_answer_data_batches(request={'metadata_identifier': answer_guid, 'data_format': 'COMPACT'}):
+    print(batch['column_names'], len(batch['data_rows']))
+
+# Liveboard batches are paged per visualization, with the 'visualization_id' on each batch
+for batch in ts.metadata_liveboard_data_batches(request={'metadata_identifier': lb_guid, 'data_format': 'COMPACT'}):
+    print(batch['visualization_id'], batch['visualization_name'], len(batch['data_rows']))
+
+# Large extracts can be written straight to a file, one row group at a time, without holding the result in memory
+rows_written = write_data_pages(ts.metadata_answer_data_batches(request={'metadata_identifier': answer_guid,
+                                                                         'data_format': 'COMPACT'}),
+                                'answer_data.parquet', file_format='parquet', row_group_size=250000,
+                                compression='zstd')
+print("Rows written: {}".format(rows_written))
+
 # You can also get data results in CSV and XSLX format using the V2 REST API when the viz is in a table format using
 # the /report/ endpoints. See liveboard_pdf_export.pdf for those examples (as the same endpoints export PDF and PNG)
@@ -24,49 +24,41 @@ org_names_to_deploy_to = [
     "cust_b"
 ]
 
-# Must log into Primary / Org 0 to get the list of Orgs, to get their org_id properties
-org0: TSRestApiV2 = TSRestApiV2(server_url=server)
+# OrgClientPool logs into Primary / Org 0 to resolve the Org names to their org_id properties (once), then
+# creates one TSRestApiV2 object per Org with its own bearer token, all sharing the same connections
+org_pool = OrgClientPool(server_url=server, username=username, password=password, validity_time_in_sec=3000)
 try:
-    auth_token_response = org0.auth_token_full(username=username, password=password,
-                                               validity_time_in_sec=3000, org_id=0)
-    org0.bearer_token = auth_token_response['token']
+    org_pool.get_org_ids_by_name()
 except requests.exceptions.HTTPError as e:
     print(e)
     print(e.response.content)
     exit()
 
-for org_name in org_names_to_deploy_to:
-    org_search_req = {
-        "org_identifier": org_name
+
+def deploy_to_org(ts: TSRestApiV2):
+    # This shows Pattern 1, to deploy from a single "pre_prod" branch. Match org_name to branch name
+    # or do a more complex mapping if you needed to do a PR to each branch and make final adjustments to TML
+    deploy_req = {
+      "branch_name": branch_name_to_deploy_from,   # use the org_name if you make PR to each branch vs. 1 pre_prod
+      "deploy_type": "DELTA",  # Switch to FULL if you know that works best for you
+      "deploy_policy": "PARTIAL"   # ALL_OR_NONE or VALIDATE are other options, depending on your needs
     }
-    search_resp = org0.orgs_search(request=org_search_req)
-    if len(search_resp) == 1:
-        org_id = search_resp[0]['id']
+    return ts.vcs_git_commits_deploy(request=deploy_req)
 
-        # Create bearer token for the org matching the org name
-        ts: TSRestApiV2 = TSRestApiV2(server_url=server)
-        try:
-            auth_resp = ts.auth_token_full(username=username, password=password,
-                                           validity_time_in_sec=3000, org_id=org_id)
-            ts.bearer_token = auth_resp['token']
-        except requests.exceptions.HTTPError as e:
-            print(e)
-            print(e.response.content)
-            exit()
 
-        # This shows Pattern 1, to deploy from a single "pre_prod" branch. Match org_name to branch name
-        # or do a more complex mapping if you needed to do a PR to each branch and make final adjustments to TML
-        deploy_req = {
-          "branch_name": branch_name_to_deploy_from,   # use the org_name if you make PR to each branch vs. 1 pre_prod
-          "deploy_type": "DELTA",  # Switch to FULL if you know that works best for you
-          "deploy_policy": "PARTIAL"   # ALL_OR_NONE or VALIDATE are other options, depending on your needs
-        }
-        deploy_resp = ts.vcs_git_commits_deploy(request=deploy_req)
-        print("Deployed to: " + org_name)
-        print(json.dumps(deploy_resp, indent=2))
+# Deploys to several Orgs at once. Each result is returned as its Org finishes, with any error for that Org
+for org_id, deploy_resp, error in org_pool.fanout(deploy_to_org, orgs=org_names_to_deploy_to, max_workers=8):
+    if error is not None:
+        print("Deploy failed for org_id {}".format(org_id))
+        print(error)
+        if isinstance(error, requests.exceptions.HTTPError):
+            print(error.response.content)
+        continue
+    print("Deployed to org_id {}".format(org_id))
+    print(json.dumps(deploy_resp, indent=2))
 
-        #
-        # When content is deployed to an Org for the first time, you must share the content to
-        # give access to customers. See `share_objects_access_control.py example
-        # You may also want to Tag content. See `tag_objects.py` for example
-        #
\ No newline at end of file
+#
+# When content is deployed to an Org for the first time, you must share the content to
+# give access to customers. See `share_objects_access_control.py example
+# You may also want to Tag content. See `tag_objects.py` for example
+#
@@ -0,0 +1,96 @@
+# Benchmark of the HTTP/2 transport (set_http2_transport) against the pooled HTTP/1.1 transport
+# (set_connection_pool), issuing many small concurrent calls like metadata_search from worker threads
+#
+# Runs entirely locally against a stand-in server answering the V2.0 endpoints with a fixed delay, so no
+# ThoughtSpot instance is needed. Requires: pip install thoughtspot_rest_api_v1[http2] hypercorn
+#
+# The stand-in server records the client port of each request, to count the TCP connections each transport opened
+
+import asyncio
+import threading
+import time
+import json
+from concurrent.futures import ThreadPoolExecutor
+
+from hypercorn.asyncio import serve
+from hypercorn.config import Config
+
+from thoughtspot_rest_api_v1 import *
+
+host = '127.0.0.1'
+port = 8642
+server_delay_secs = 0.02  # Simulated server processing time per call
+worker_threads = 32
+calls_per_run = 500
+
+client_ports = set()
+
+
+# Minimal ASGI app standing in for the ThoughtSpot V2.0 REST API
+async def stand_in_server(scope, receive, send):
+    if scope['type'] != 'http':
+        return
+    client_ports.add(scope['client'][1])
+    more_body = True
+    while more_body:
+        message = await receive()
+        more_body = message.get('more_body', False)
+    await asyncio.sleep(server_delay_secs)
+    body = json.dumps([{'metadata_id': 'guid', 'metadata_name': 'name', 'metadata_type': 'LIVEBOARD'}]).encode()
+    await send({'type': 'http.response.start', 'status': 200,
+                'headers': [(b'content-type', b'application/json'), (b'content-length', str(len(body)).encode())]})
+    await send({'type': 'http.response.body', 'body': body})
+
+
+def run_server(shutdown_event: threading.Event):
+    config = Config()
+    config.bind = ['{}:{}'.format(host, port)]
+    config.loglevel = 'WARNING'
+
+    async def wait_for_shutdown():
+        while not shutdown_event.is_set():
+            await asyncio.sleep(0.1)
+
+    asyncio.run(serve(stand_in_server, config, shutdown_trigger=wait_for_shutdown))
+
+
+def run_calls(ts: TSRestApiV2, label: str):
+    client_ports.clear()
+    search_request = {'metadata': [{'type': 'LIVEBOARD'}], 'record_size': 10}
+
+    start = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=worker_threads) as executor:
+        for _ in executor.map(lambda i: ts.metadata_search(request=search_request), range(calls_per_run)):
+            pass
+    elapsed = time.perf_counter() - start
+
+    print('{:<28} {:>8.2f} s {:>10.0f} calls/s {:>6} connections'.format(
+        label, elapsed, calls_per_run / elapsed, len(client_ports)))
+
+
+shutdown = threading.Event()
+server_thread = threading.Thread(target=run_server, args=(shutdown,), daemon=True)
+server_thread.start()
+time.sleep(1)  # Let the server start listening
+
+server_url = 'http://{}:{}'.format(host, port)
+print('{} calls from {} threads, {} ms simulated server time per call'.format(
+    calls_per_run, worker_threads, int(server_delay_secs * 1000)))
+
+# requests defaults: 10 pooled connections, so the rest of the threads open throwaway connections
+ts_default = TSRestApiV2(server_url=server_url)
+run_calls(ts_default, 'HTTP/1.1 default pool')
+
+# Pool sized to the number of threads
+ts_pooled = TSRestApiV2(server_url=server_url)
+ts_pooled.set_connection_pool(pool_maxsize=worker_threads, pool_block=True)
+run_calls(ts_pooled, 'HTTP/1.1 pool of {}'.format(worker_threads))
+
+# HTTP/2 multiplexed over a few connections. prior_knowledge=True because the stand-in server is plain http://
+for max_connections in [1, 4]:
+    ts_http2 = TSRestApiV2(server_url=server_url)
+    ts_http2.set_http2_transport(max_connections=max_connections, prior_knowledge=True)
+    run_calls(ts_http2, 'HTTP/2 max {} connections'.format(max_connections))
+
+shutdown.set()
+server_thread.join(timeout=5)
@@ -62,6 +62,13 @@ whole_lb_pdf = ts.report_liveboard(request=liveboard_request)  # Many additional
 with open('whole_lb_test.pdf', 'wb') as fh:
     fh.write(whole_lb_pdf)
 
+# Large exports can be written straight to disk in chunks as they download, rather than held in memory
+bytes_written = ts.report_liveboard_to_file(request=liveboard_request, destination='whole_lb_streamed_test.pdf')
+
+# Or processed chunk by chunk (the _stream methods yield bytes)
+for chunk in ts.report_liveboard_stream(request=liveboard_request, chunk_size=1024 * 1024):
+    pass
+
 # Specific Viz on Liveboard
 viz_request = {
     'metadata_identifier': lb_guid,
@@ -3,6 +3,22 @@ from .tsrestapiv1 import (
     TSTypes, Sorts, Categories,
     ShareModes, Privileges, PermissionTypes, MetadataTypes, MetadataSubtypes, GroupVisibility
 )
-from .tsrestapiv2 import TSRestApiV2, ReportTypes, TSTypesV2
+from .tsrestapiv2 import TSRestApiV2, TSRestApiV2Base, ReportTypes, TSTypesV2
+from .tsrestapiv2_async import AsyncTSRestApiV2
+from .transport import TSHTTPAdapter, TSHTTP2Adapter, ConnectionPoolExhausted
+from .retry import RetryPolicy
+from .rate_limit import RateLimiter, RateLimit
+from .compression import RequestCompression
+from .auth import BearerTokenManager, ManagedBearerAuth
+from .org_pool import OrgClientPool
+from .coalesce import RequestCoalescer, COALESCED_ENDPOINTS
+from .columnar import ColumnarConverter, iter_numpy_batches, iter_arrow_batches
+from .sinks import CSVSink, ParquetSink, write_data_pages
+from .dataframes import DataFrameBuilder, LiveboardDataFrameBuilder, data_to_dataframe, liveboard_data_to_dataframes
+from .tml_export import BulkTMLExporter, TMLExportBatchJob, TMLExportError
+from .tml_import import WaveTMLImporter, TMLDocument, plan_tml_waves
+from .tml_import import TMLImportJobManager, AsyncTMLImportJobManager, TMLImportTaskError
+from .json_backend import JSONBackend
+from .logs import LogWindowSplitter, LogTailer, LogCheckpoint, FileLogCheckpoint, SQLiteLogCheckpoint
 from .details_objects import *
 from ._version import __version__
@@ -0,0 +1,157 @@
+#
+# Managed bearer tokens for TSRestApiV2
+#
+#   A token from auth_token_full() is only valid for validity_time_in_sec, so a long job would start failing
+#   with 401 partway through. BearerTokenManager remembers the credentials used to mint the token and mints
+#   a new one shortly before the current one expires:
+#
+#   ts = TSRestApiV2(server_url=server)
+#   ts.set_managed_bearer_token(username=username, secret_key=secret_key, org_id=org_id)
+#
+#   Within refresh_margin_sec of expiry, the first call starts a refresh in a background thread while every
+#   call (including that one) continues with the still-valid token. Only when the token has actually expired
+#   do callers wait, and then only one of them mints the new token while the others wait for it.
+#
+import threading
+import time
+from typing import Optional, Dict
+
+import requests
+
+
+class BearerTokenManager:
+    """
+    Mints bearer tokens for a TSRestApiV2 object using auth_token_full(), with either password or secret_key,
+    and keeps its bearer_token property current. refresh_margin_sec (default: a quarter of the validity time,
+    at most 60 seconds) is how long before expiry the replacement token is requested.
+    """
+    def __init__(self, ts, username: str, password: Optional[str] = None, secret_key: Optional[str] = None,
+                 org_id: Optional[int] = None, validity_time_in_sec: int = 300,
+                 refresh_margin_sec: Optional[float] = None, additional_request_parameters: Optional[Dict] = None):
+        if password is None and secret_key is None:
+            raise Exception("BearerTokenManager requires either password or secret_key")
+        self.ts = ts
+        self.username = username
+        self.password = password
+        self.secret_key = secret_key
+        self.org_id = org_id
+        self.validity_time_in_sec = validity_time_in_sec
+        if refresh_margin_sec is None:
+            refresh_margin_sec = min(60.0, validity_time_in_sec / 4)
+        self.refresh_margin_sec = refresh_margin_sec
+        self.additional_request_parameters = additional_request_parameters
+
+        self.token = None  # type: Optional[str]
+        self.refresh_count = 0
+        # Exception from the last background refresh, if it failed. The next blocking refresh raises its own
+        self.last_refresh_error = None  # type: Optional[Exception]
+
+        self._expires_at = 0.0  # time.monotonic() value
+        self._refresh_lock = threading.Lock()
+        self._background_refresh = None  # type: Optional[threading.Thread]
+
+    @property
+    def seconds_until_expiry(self) -> float:
+        return self._expires_at - time.monotonic()
+
+    # The token to send on a request, refreshing it first if it has expired (or was never minted)
+    def get_token(self) -> str:
+        remaining = self._expires_at - time.monotonic()
+        token = self.token
+        if token is not None and remaining > self.refresh_margin_sec:
+            return token
+        if token is not None and remaining > 0:
+            self._start_background_refresh(token)
+            return token
+        return self.refresh(stale_token=token)
+
+    # Mints a new token, unless another thread replaced stale_token while this one waited for the lock
+    def refresh(self, stale_token: Optional[str] = None) -> str:
+        with self._refresh_lock:
+            if self.token is not None and self.token != stale_token and time.monotonic() < self._expires_at:
+                return self.token
+            return self._mint()
+
+    def _start_background_refresh(self, stale_token: str):
+        # Non-blocking: if a refresh is already running (background or blocking), there is nothing to do
+        if not self._refresh_lock.acquire(blocking=False):
+            return
+        try:
+            if self._background_refresh is not None and self._background_refresh.is_alive():
+                return
+            self._background_refresh = threading.Thread(target=self._refresh_in_background, args=(stale_token,),
+                                                         daemon=True, name='ts-bearer-token-refresh')
+            self._background_refresh.start()
+        finally:
+            self._refresh_lock.release()
+
+    def _refresh_in_background(self, stale_token: str):
+        try:
+            self.refresh(stale_token=stale_token)
+            self.last_refresh_error = None
+        except Exception as e:
+            # Calls continue with the current token. Once it expires, the blocking refresh raises to the caller
+            self.last_refresh_error = e
+
+    # Must be called holding _refresh_lock
+    def _mint(self) -> str:
+        # The lifetime is counted from before the request was sent, so the token is never used past its expiry
+        requested_at = time.monotonic()
+        auth_token_response = self.ts.auth_token_full(
+            username=self.username, password=self.password, secret_key=self.secret_key, org_id=self.org_id,
+            validity_time_in_sec=self.validity_time_in_sec,
+            additional_request_parameters=self.additional_request_parameters
+        )
+        token = auth_token_response['token']
+        validity_secs = self.validity_time_in_sec
+        if 'expiration_time_in_millis' in auth_token_response and 'creation_time_in_millis' in auth_token_response:
+            validity_secs = (auth_token_response['expiration_time_in_millis']
+                             - auth_token_response['creation_time_in_millis']) / 1000
+
+        self.ts.bearer_token = token
+        self.token = token
+        self._expires_at = requested_at + validity_secs
+        self.refresh_count += 1
+        return token
+
+
+class ManagedBearerAuth(requests.auth.AuthBase):
+    """
+    requests.Session.auth for a TSRestApiV2 object using a BearerTokenManager: sets the current token on every
+    request, and if the server still answers 401 (token revoked, clocks disagreeing), mints a new token and
+    sends the request once more
+    """
+    # Requests that mint tokens authenticate with password / secret_key, an expired token would only get in the way
+    TOKEN_ENDPOINTS = ('auth/token/full', 'auth/token/object', 'auth/token/custom')
+
+    def __init__(self, token_manager: BearerTokenManager):
+        self.token_manager = token_manager
+
+    def __call__(self, r: requests.PreparedRequest):
+        if r.path_url.split('?')[0].endswith(self.TOKEN_ENDPOINTS):
+            r.headers.pop('Authorization', None)
+            return r
+        r.headers['Authorization'] = 'Bearer {}'.format(self.token_manager.get_token())
+        r.register_hook('response', self.handle_401)
+        return r
+
+    def handle_401(self, r: requests.Response, **kwargs):
+        if r.status_code != 401 or getattr(r.request, '_ts_token_resent', False):
+            return r
+
+        sent_token = r.request.headers.get('Authorization', '')[len('Bearer '):]
+        token = self.token_manager.refresh(stale_token=sent_token)
+
+        # Release the connection before sending again
+        r.content
+        r.close()
+        prep = r.request.copy()
+        requests.cookies.extract_cookies_to_jar(prep._cookies, r.request, r.raw)
+        prep.prepare_cookies(prep._cookies)
+        prep.headers['Authorization'] = 'Bearer {}'.format(token)
+        prep._ts_token_resent = True
+
+        _r = r.connection.send(prep, **kwargs)
+        _r.history.append(r)
+        _r.request = prep
+        return _r
@@ -0,0 +1,129 @@
+#
+# Single-flight coalescing of identical read requests, for TSRestApiV2.get_request() / post_request()
+#
+#   When many worker threads issue the same read at the same moment (system_config(), auth_session_user(),
+#   the same metadata_search() lookup), only the first one is sent. The others wait for it and are given
+#   the same parsed response. Nothing is cached: once the request completes, the next identical call is sent.
+#
+#   ts.set_request_coalescer(RequestCoalescer())
+#
+import asyncio
+import copy
+import json
+import threading
+from typing import Optional, Iterable, Callable, Any, Tuple
+
+# Read-only V2.0 endpoints (as passed to get_request() / post_request()) that are safe to share a response for
+COALESCED_ENDPOINTS = (
+    'system',
+    'system/config',
+    'system/config-overrides',
+    'auth/session/user',
+    'users/search',
+    'groups/search',
+    'orgs/search',
+    'tags/search',
+    'metadata/search',
+    'connection/search',
+    'roles/search',
+    'schedules/search',
+    'vcs/git/config/search',
+    'customization/custom-actions/search',
+)
+
+
+class _InFlight:
+    def __init__(self):
+        self.done = threading.Event()
+        self.result = None
+        self.error = None  # type: Optional[BaseException]
+
+
+class RequestCoalescer:
+    """
+    Lets identical concurrent requests to the endpoints listed share one round-trip. Requests are identical when
+    they have the same method, endpoint and request body (compared as canonical JSON, so key order does not matter).
+
+    Every caller receives the same parsed object, so results should not be modified in place. copy_results=True
+    gives each waiting caller its own deep copy instead.
+
+    Use one RequestCoalescer per TSRestApiV2 object: the bearer token is not part of the comparison.
+    """
+    def __init__(self, endpoints: Iterable[str] = COALESCED_ENDPOINTS, copy_results: bool = False):
+        self.endpoints = frozenset(endpoints)
+        self.copy_results = copy_results
+        self.coalesced_count = 0
+
+        self._lock = threading.Lock()
+        self._in_flight = {}
+        # Used by AsyncTSRestApiV2, from a single event loop
+        self._async_in_flight = {}
+
+    def get_key(self, method: str, endpoint: str, request=None) -> Optional[Tuple[str, str, str]]:
+        if endpoint not in self.endpoints:
+            return None
+        try:
+            body = json.dumps(request, sort_keys=True, separators=(',', ':'))
+        except (TypeError, ValueError):
+            # Not JSON serializable as is, so cannot be compared: send it on its own
+            return None
+        return method, endpoint, body
+
+    def _share(self, result):
+        return copy.deepcopy(result) if self.copy_results is True else result
+
+    def call(self, method: str, endpoint: str, request, send: Callable[[], Any]):
+        key = self.get_key(method, endpoint, request)
+        if key is None:
+            return send()
+
+        with self._lock:
+            in_flight = self._in_flight.get(key)
+            is_leader = in_flight is None
+            if is_leader:
+                in_flight = _InFlight()
+                self._in_flight[key] = in_flight
+            else:
+                self.coalesced_count += 1
+
+        if not is_leader:
+            in_flight.done.wait()
+            if in_flight.error is not None:
+                raise in_flight.error
+            return self._share(in_flight.result)
+
+        try:
+            in_flight.result = send()
+            return in_flight.result
+        except BaseException as e:
+            in_flight.error = e
+            raise
+        finally:
+            with self._lock:
+                del self._in_flight[key]
+            in_flight.done.set()
+
+    async def async_call(self, method: str, endpoint: str, request, send: Callable[[], Any]):
+        key = self.get_key(method, endpoint, request)
+        if key is None:
+            return await send()
+
+        task = self._async_in_flight.get(key)
+        if task is not None:
+            self.coalesced_count += 1
+            # shield() so that a waiting caller being cancelled does not cancel the shared request
+            return self._share(await asyncio.shield(task))
+
+        # The request runs as a task of its own, so the leader being cancelled does not cancel it for the callers
+        # waiting on it. It is no longer in flight (and the next identical call is sent) once it completes
+        task = asyncio.ensure_future(send())
+        self._async_in_flight[key] = task
+        task.add_done_callback(lambda t: self._async_request_done(key, t))
+        return await asyncio.shield(task)
+
+    def _async_request_done(self, key: Tuple[str, str, str], task: asyncio.Future):
+        if self._async_in_flight.get(key) is task:
+            del self._async_in_flight[key]
+        # Marks the exception as retrieved, for when every caller was cancelled before it completed
+        if not task.cancelled():
+            task.exception()
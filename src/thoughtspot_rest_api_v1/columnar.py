@@ -0,0 +1,274 @@
+#
+# Columnar conversion of COMPACT data pages into NumPy arrays or Arrow record batches
+#
+#   A COMPACT page is a list of rows (each a list of cells) plus the column names: V2.0 searchdata,
+#   metadata/answer/data and metadata/liveboard/data give {'column_names': [...], 'data_rows': [...]} in each
+#   'contents' entry, V1 searchdata and pinboarddata give {'columnNames': [...], 'data': [...]}.
+#   ColumnarConverter transposes the rows once, then builds a single typed buffer per column, so sums,
+#   group-bys and filters run on int64 / float64 / datetime64 arrays rather than on Python objects per cell:
+#
+#   converter = ColumnarConverter(column_types={'Revenue': 'DOUBLE', 'Order Date': 'DATE'})
+#   for page in ts.metadata_answer_data_batches(request=request):
+#       record_batch = converter.to_arrow(page)
+#
+#   Both numpy and pyarrow are optional: pip install thoughtspot_rest_api_v1[numpy] or [arrow]
+#
+from collections import OrderedDict
+from typing import Optional, Dict, List, Iterable, Iterator, Sequence, Tuple, Any
+
+try:
+    import numpy
+except ImportError:  # pragma: no cover - optional dependency, see the 'numpy' extra
+    numpy = None
+
+try:
+    import pyarrow
+except ImportError:  # pragma: no cover - optional dependency, see the 'arrow' extra
+    pyarrow = None
+
+
+# ThoughtSpot column data types (as in TML and metadata details) that have a typed column buffer.
+# Anything else (VARCHAR, TIME...) is kept as strings
+INTEGER_TYPES = ('INT32', 'INT64')
+FLOAT_TYPES = ('FLOAT', 'DOUBLE')
+DATE_TYPES = ('DATE', 'DATE_TIME')
+BOOL_TYPES = ('BOOL',)
+
+NUMPY_DTYPES = {
+    'INT32': 'int32',
+    'INT64': 'int64',
+    'FLOAT': 'float32',
+    'DOUBLE': 'float64',
+    'BOOL': 'bool',
+}
+
+
+def compact_page_columns(page: Dict) -> Tuple[List[str], List[List]]:
+    """
+    (column_names, rows) of one COMPACT page, in either the V2.0 or the V1 form
+    """
+    if 'column_names' in page or 'data_rows' in page:
+        return page.get('column_names', []), page.get('data_rows', [])
+    return page.get('columnNames', []), page.get('data', [])
+
+
+def _values_type(values: Sequence) -> Optional[str]:
+    # BOOL, INT64, DOUBLE or VARCHAR for the non-null values, None when there are none
+    inferred = None
+    for value in values:
+        if value is None:
+            continue
+        # bool is a subclass of int, so must be checked first
+        if isinstance(value, bool):
+            value_type = 'BOOL'
+        elif isinstance(value, int):
+            value_type = 'INT64'
+        elif isinstance(value, float):
+            value_type = 'DOUBLE'
+        else:
+            return 'VARCHAR'
+        inferred = widen_column_type(inferred, value_type)
+        if inferred == 'VARCHAR':
+            return inferred
+    return inferred
+
+
+def widen_column_type(column_type: Optional[str], values_type: Optional[str]) -> Optional[str]:
+    """
+    The narrowest of BOOL, INT64, DOUBLE and VARCHAR that holds the values of both types (None for no values)
+    """
+    if column_type is None or column_type == values_type:
+        return values_type
+    if values_type is None:
+        return column_type
+    if {column_type, values_type} == {'INT64', 'DOUBLE'}:
+        return 'DOUBLE'
+    return 'VARCHAR'
+
+
+def infer_column_type(values: Sequence) -> str:
+    """
+    ThoughtSpot data type that fits every non-null value: BOOL, INT64, DOUBLE, or VARCHAR
+    """
+    inferred = _values_type(values)
+    return inferred if inferred is not None else 'VARCHAR'
+
+
+def _is_epoch_column(values: Sequence) -> bool:
+    return all(value is None or (isinstance(value, (int, float)) and not isinstance(value, bool))
+               for value in values)
+
+
+def _is_integral(values: Sequence) -> bool:
+    return all(value is None or float(value).is_integer() for value in values)
+
+
+class ColumnarConverter:
+    """
+    Converts COMPACT pages to one typed array per column. column_types maps column names to ThoughtSpot data
+    types (INT64, DOUBLE, DATE, DATE_TIME, BOOL, VARCHAR...), as listed in the column metadata of the data
+    source.
+
+    The type of any other column is inferred from its values, and widened (INT64 to DOUBLE, anything else to
+    VARCHAR) when a later page has values that do not fit, so the arrays of earlier pages can have a narrower
+    dtype than later ones. A page with values that do not fit a declared type (1.5 in an INT64 column, a string
+    in a DOUBLE column) raises ValueError rather than being truncated.
+
+    DATE / DATE_TIME values are epoch seconds or ISO 8601 strings, converted to datetime64[s] / timestamp[s].
+    In NumPy, a null in an integer column makes that page's array float64 with NaN, and a null in a BOOL column
+    makes it an object array. Arrow columns are nullable, so keep their type. A column that has only had nulls
+    so far is an object array of None, or an Arrow null array.
+    """
+    def __init__(self, column_types: Optional[Dict[str, str]] = None):
+        self.column_types = dict(column_types) if column_types is not None else {}
+        self.declared_columns = frozenset(self.column_types)
+
+    def _check_declared_type(self, column_name: str, values: Sequence):
+        column_type = self.column_types[column_name]
+        values_type = _values_type(values)
+        if values_type is None or column_type in DATE_TYPES:
+            return
+        if column_type in INTEGER_TYPES:
+            fits = values_type in ('INT64', 'BOOL') or (values_type == 'DOUBLE' and _is_integral(values))
+        elif column_type in FLOAT_TYPES:
+            fits = values_type in ('INT64', 'DOUBLE')
+        elif column_type in BOOL_TYPES:
+            fits = values_type == 'BOOL'
+        else:
+            fits = True
+        if not fits:
+            raise ValueError("Column '{}' has the type {} in column_types but a page has {} values that do not fit "
+                             "it".format(column_name, column_type, values_type))
+
+    def _resolve_types(self, column_names: List[str], columns: List[Sequence]):
+        for column_name, values in zip(column_names, columns):
+            if column_name in self.declared_columns:
+                self._check_declared_type(column_name, values)
+                continue
+            column_type = widen_column_type(self.column_types.get(column_name), _values_type(values))
+            if column_type is not None:
+                self.column_types[column_name] = column_type
+
+    def _transpose(self, page: Dict) -> Tuple[List[str], List[Sequence]]:
+        column_names, rows = compact_page_columns(page)
+        if len(rows) == 0:
+            columns = [() for _ in column_names]
+        else:
+            # zip() transposes in C, without a Python loop per cell
+            columns = list(zip(*rows))
+        self._resolve_types(column_names, columns)
+        return column_names, columns
+
+    def _numpy_dates(self, column_name: str, values: Sequence):
+        if _is_epoch_column(values):
+            epoch_seconds = numpy.array(values, dtype='float64')
+            nulls = numpy.isnan(epoch_seconds)
+            dates = numpy.where(nulls, 0, epoch_seconds).astype('int64').astype('datetime64[s]')
+            dates[nulls] = numpy.datetime64('NaT')
+            return dates
+        try:
+            return numpy.array(values, dtype='datetime64[s]')
+        except ValueError:
+            # Not a format NumPy can parse (a custom date format on the column): keep the strings from now on
+            self.column_types[column_name] = 'VARCHAR'
+            return numpy.array(values, dtype=object)
+
+    def _numpy_column(self, column_name: str, values: Sequence):
+        column_type = self.column_types.get(column_name)
+        if column_type in DATE_TYPES:
+            return self._numpy_dates(column_name, values)
+        has_nulls = any(value is None for value in values)
+        if column_type in INTEGER_TYPES:
+            return numpy.array(values, dtype='float64' if has_nulls else NUMPY_DTYPES[column_type])
+        if column_type in FLOAT_TYPES:
+            # None becomes NaN
+            return numpy.array(values, dtype=NUMPY_DTYPES[column_type])
+        if column_type in BOOL_TYPES and not has_nulls:
+            return numpy.array(values, dtype='bool')
+        return numpy.array(values, dtype=object)
+
+    def to_numpy(self, page: Dict) -> 'OrderedDict[str, Any]':
+        """
+        Ordered dict of column name: numpy.ndarray for one page
+        """
+        if numpy is None:
+            raise ImportError("ColumnarConverter.to_numpy() requires the numpy package: "
+                              "pip install thoughtspot_rest_api_v1[numpy]")
+        column_names, columns = self._transpose(page)
+        return OrderedDict((column_name, self._numpy_column(column_name, values))
+                           for column_name, values in zip(column_names, columns))
+
+    def _arrow_column(self, column_name: str, values: Sequence):
+        column_type = self.column_types.get(column_name)
+        if column_type is None:
+            return pyarrow.nulls(len(values))
+        if column_type in DATE_TYPES:
+            try:
+                if _is_epoch_column(values):
+                    return pyarrow.array(values, type=pyarrow.int64()).cast(pyarrow.timestamp('s'))
+                return pyarrow.array(values, type=pyarrow.string()).cast(pyarrow.timestamp('s'))
+            except (pyarrow.ArrowInvalid, pyarrow.ArrowNotImplementedError, TypeError):
+                self.column_types[column_name] = 'VARCHAR'
+                column_type = 'VARCHAR'
+        if column_type in INTEGER_TYPES:
+            arrow_type = pyarrow.int32() if column_type == 'INT32' else pyarrow.int64()
+        elif column_type in FLOAT_TYPES:
+            arrow_type = pyarrow.float32() if column_type == 'FLOAT' else pyarrow.float64()
+        elif column_type in BOOL_TYPES:
+            arrow_type = pyarrow.bool_()
+        else:
+            try:
+                return pyarrow.array(values, type=pyarrow.string())
+            except (pyarrow.ArrowInvalid, pyarrow.ArrowTypeError):
+                # Numbers in a column of strings
+                return pyarrow.array([None if value is None else str(value) for value in values],
+                                     type=pyarrow.string())
+        return pyarrow.array(values, type=arrow_type)
+
+    def to_arrow(self, page: Dict):
+        """
+        pyarrow.RecordBatch of one page
+        """
+        if pyarrow is None:
+            raise ImportError("ColumnarConverter.to_arrow() requires the pyarrow package: "
+                              "pip install thoughtspot_rest_api_v1[arrow]")
+        column_names, columns = self._transpose(page)
+        arrays = [self._arrow_column(column_name, values) for column_name, values in zip(column_names, columns)]
+        return pyarrow.RecordBatch.from_arrays(arrays, names=list(column_names))
+
+
+# Pages of a Liveboard have different columns for each visualization, so each one needs its own converter
+def _page_key(page: Dict) -> Optional[str]:
+    return page.get('visualization_id')
+
+
+def _iter_converted(pages: Iterable, convert_method: str,
+                    column_types: Optional[Dict[str, str]] = None) -> Iterator:
+    converters = {}
+
+    def convert(key, page):
+        if key not in converters:
+            converters[key] = ColumnarConverter(column_types=column_types)
+        return getattr(converters[key], convert_method)(page)
+
+    for page in pages:
+        # V1 pinboarddata_batches() yields (vizid, batch) tuples
+        if isinstance(page, tuple):
+            vizid, batch = page
+            yield vizid, convert(vizid, batch)
+        else:
+            yield convert(_page_key(page), page)
+
+
+def iter_numpy_batches(pages: Iterable, column_types: Optional[Dict[str, str]] = None) -> Iterator:
+    """
+    Converts each page from one of the *_batches() methods with ColumnarConverter.to_numpy()
+    """
+    return _iter_converted(pages, 'to_numpy', column_types=column_types)
+
+
+def iter_arrow_batches(pages: Iterable, column_types: Optional[Dict[str, str]] = None) -> Iterator:
+    """
+    Converts each page from one of the *_batches() methods with ColumnarConverter.to_arrow()
+    """
+    return _iter_converted(pages, 'to_arrow', column_types=column_types)
@@ -0,0 +1,118 @@
+#
+# Opt-in compression of large request bodies (TML import in particular), applied by TSHTTPAdapter
+#
+#   Not every ThoughtSpot release (or proxy in front of it) accepts a Content-Encoding on requests, and one that
+#   does not may answer 415, 400 or 500. A failed TML import cannot safely be sent twice, so whether compression
+#   works is found out with a capability probe before the first large body is compressed: a small compressed
+#   request to a read-only endpoint (metadata/search), sent again uncompressed if it fails. Compression is used
+#   only once the compressed probe has succeeded. If the uncompressed probe succeeds where the compressed one
+#   failed, request bodies are sent uncompressed for the rest of the session. If both fail (not logged in yet,
+#   server unavailable), the request is sent uncompressed and the next large request probes again.
+#
+import gzip
+import json
+import threading
+import zlib
+from typing import Optional, Iterable
+from urllib.parse import urlparse
+
+import requests
+
+# Where the API paths start in a request URL, so the probe goes to the same server (and path prefix)
+API_PATH_STARTS = ('/api/rest/', '/callosum/')
+
+
+class RequestCompression:
+    """
+    Compresses request bodies of at least min_size bytes with 'gzip' or 'deflate'.
+
+    supported is None until the capability probe (a POST of probe_request to probe_path) is conclusive: True if
+    the compressed probe succeeded, False if only the uncompressed one did. It can be set directly if the answer is already known, which
+    skips the probe. A 415 (one of rejection_statuses) to a compressed request later on still sends that request
+    again uncompressed and sets supported to False.
+    """
+    ENCODINGS = ('gzip', 'deflate')
+
+    def __init__(self, encoding: str = 'gzip', min_size: int = 256 * 1024, compress_level: int = 6,
+                 rejection_statuses: Iterable[int] = (415,), probe_path: str = '/api/rest/2.0/metadata/search',
+                 probe_request: Optional[dict] = None):
+        encoding = encoding.lower()
+        if encoding not in self.ENCODINGS:
+            raise ValueError("encoding must be one of {}".format(self.ENCODINGS))
+        self.encoding = encoding
+        self.min_size = min_size
+        self.compress_level = compress_level
+        self.rejection_statuses = frozenset(rejection_statuses)
+        self.probe_path = probe_path
+        self.probe_request = probe_request if probe_request is not None else {'record_size': 1}
+        self.supported = None
+        self._lock = threading.Lock()
+        # Held while probing, so concurrent requests wait for one probe rather than each sending their own
+        self.probe_lock = threading.Lock()
+
+    def compress_request(self, request: requests.PreparedRequest) -> Optional[requests.PreparedRequest]:
+        """
+        Returns a compressed copy of the request, or None if it should be sent as is
+        """
+        if self.supported is False or 'Content-Encoding' in request.headers:
+            return None
+        body = request.body
+        if isinstance(body, str):
+            body = body.encode('utf-8')
+        if not isinstance(body, bytes) or len(body) < self.min_size:
+            return None
+
+        return self.compress(request)
+
+    # Compressed copy of the request, whatever its size
+    def compress(self, request: requests.PreparedRequest) -> requests.PreparedRequest:
+        body = request.body
+        if isinstance(body, str):
+            body = body.encode('utf-8')
+        if self.encoding == 'gzip':
+            compressed_body = gzip.compress(body, compresslevel=self.compress_level)
+        else:
+            compressed_body = zlib.compress(body, self.compress_level)
+
+        compressed_request = request.copy()
+        compressed_request.body = compressed_body
+        compressed_request.headers['Content-Encoding'] = self.encoding
+        compressed_request.headers['Content-Length'] = str(len(compressed_body))
+        return compressed_request
+
+    # The (uncompressed) probe for the server of request, with its authentication headers and cookies
+    def build_probe(self, request: requests.PreparedRequest) -> requests.PreparedRequest:
+        url = urlparse(request.url)
+        path_prefix = ''
+        for path_start in API_PATH_STARTS:
+            if path_start in url.path:
+                path_prefix = url.path[:url.path.index(path_start)]
+                break
+        headers = {k: v for k, v in request.headers.items()
+                   if k.lower() not in ('content-type', 'content-length', 'content-encoding', 'accept')}
+        headers['Content-Type'] = 'application/json'
+        headers['Accept'] = 'application/json'
+        probe = requests.PreparedRequest()
+        probe.prepare(method='POST', url='{}://{}{}{}'.format(url.scheme, url.netloc, path_prefix, self.probe_path),
+                      headers=headers, data=json.dumps(self.probe_request))
+        return probe
+
+    # uncompressed_status is the status of the probe sent again uncompressed, after the compressed probe failed.
+    # If that fails as well, the probe says nothing about compression and supported stays None, to probe again
+    def record_probe(self, compressed_status: int, uncompressed_status: Optional[int] = None):
+        with self._lock:
+            if compressed_status < 400:
+                self.supported = True
+            elif uncompressed_status is not None and uncompressed_status < 400:
+                self.supported = False
+
+    # A rejected request was not processed, so it is safe to send again uncompressed
+    def is_rejection(self, response: requests.Response) -> bool:
+        return response.status_code in self.rejection_statuses
+
+    def record_compressed_result(self, response: requests.Response):
+        with self._lock:
+            if self.is_rejection(response):
+                self.supported = False
+            elif response.status_code < 400 and self.supported is None:
+                self.supported = True
@@ -0,0 +1,175 @@
+#
+# pandas DataFrames from COMPACT data pages
+#
+#   pd.DataFrame(rows) on the data_rows inspects every cell and leaves most columns as object dtype.
+#   DataFrameBuilder collects the pages column by column with a ColumnarConverter, joins each column once,
+#   and maps the ThoughtSpot column types to pandas dtypes: int64 (Int64 when there are nulls), float64,
+#   datetime64 for dates, boolean, and category for attribute columns with few distinct values:
+#
+#   df = ts.metadata_answer_data_dataframe(request={'metadata_identifier': answer_guid})
+#   frames = ts.metadata_liveboard_data_dataframes(request={'metadata_identifier': liveboard_guid})
+#
+#   pandas is optional: pip install thoughtspot_rest_api_v1[pandas]
+#
+from collections import OrderedDict
+from typing import Optional, Dict, List, Iterable, Union
+
+from .columnar import (
+    ColumnarConverter, compact_page_columns, INTEGER_TYPES, FLOAT_TYPES, DATE_TYPES, BOOL_TYPES, NUMPY_DTYPES
+)
+
+try:
+    import numpy
+    import pandas
+except ImportError:  # pragma: no cover - optional dependency, see the 'pandas' extra
+    pandas = None
+
+# An attribute column becomes a category when it has at most this fraction of distinct values, below which
+# the category codes take less memory than the strings
+DEFAULT_CATEGORICAL_MAX_UNIQUE_RATIO = 0.5
+
+DataResponse = Union[Dict, Iterable[Dict]]
+
+
+class DataFrameBuilder:
+    """
+    Builds one DataFrame from the pages of a single result (an Answer, search, or one Liveboard visualization).
+    add_page() converts each page to column arrays straight away, so the JSON rows can be released as pages
+    arrive, and build() joins them. column_types is as for ColumnarConverter.
+
+    Attribute (VARCHAR) columns with at most categorical_max_unique_ratio distinct values per row become
+    category dtype, unless categorical_max_unique_ratio is None. categorical_columns lists columns that are
+    always made categories.
+    """
+    def __init__(self, column_types: Optional[Dict[str, str]] = None,
+                 categorical_max_unique_ratio: Optional[float] = DEFAULT_CATEGORICAL_MAX_UNIQUE_RATIO,
+                 categorical_columns: Optional[Iterable[str]] = None):
+        if pandas is None:
+            raise ImportError("DataFrameBuilder requires the pandas package: "
+                              "pip install thoughtspot_rest_api_v1[pandas]")
+        self.converter = ColumnarConverter(column_types=column_types)
+        self.categorical_max_unique_ratio = categorical_max_unique_ratio
+        self.categorical_columns = frozenset(categorical_columns) if categorical_columns is not None else frozenset()
+        self.column_names = None  # type: Optional[List[str]]
+        self._column_chunks = OrderedDict()
+
+    def add_page(self, page: Dict):
+        column_names, rows = compact_page_columns(page)
+        if self.column_names is None:
+            self.column_names = list(column_names)
+            self._column_chunks = OrderedDict((column_name, []) for column_name in column_names)
+        elif list(column_names) != self.column_names:
+            raise Exception("Page columns {} do not match the columns of the earlier pages {}".format(
+                column_names, self.column_names))
+        if len(rows) == 0:
+            return
+        for column_name, values in self.converter.to_numpy(page).items():
+            self._column_chunks[column_name].append(values)
+
+    def add_pages(self, pages: Iterable[Dict]):
+        for page in pages:
+            self.add_page(page)
+
+    def _is_categorical(self, column_name: str, values) -> bool:
+        if column_name in self.categorical_columns:
+            return True
+        if self.categorical_max_unique_ratio is None or len(values) == 0 or values.dtype != object:
+            return False
+        if self.converter.column_types.get(column_name) in BOOL_TYPES:
+            return False
+        return len(pandas.unique(values)) <= self.categorical_max_unique_ratio * len(values)
+
+    def _series(self, column_name: str, chunks: List):
+        if len(chunks) == 0:
+            return pandas.Series([], dtype=object)
+        column_type = self.converter.column_types.get(column_name)
+        # A page with nulls in an integer column is float64, which would make the whole column float64
+        if column_type in INTEGER_TYPES and any(chunk.dtype.kind != 'i' for chunk in chunks):
+            values = pandas.array(numpy.concatenate([chunk.astype('float64') for chunk in chunks]))
+            return pandas.Series(values).astype('Int64')
+        # Pages before the column was widened (INT64 to DOUBLE), or with only nulls, have other dtypes
+        if column_type in FLOAT_TYPES:
+            chunks = [chunk.astype(NUMPY_DTYPES[column_type]) for chunk in chunks]
+        elif column_type in DATE_TYPES:
+            chunks = [chunk.astype('datetime64[s]') for chunk in chunks]
+        values = chunks[0] if len(chunks) == 1 else numpy.concatenate(chunks)
+        if self._is_categorical(column_name, values):
+            return pandas.Series(pandas.Categorical(values))
+        if column_type in BOOL_TYPES and values.dtype == object:
+            return pandas.Series(values).astype('boolean')
+        return pandas.Series(values)
+
+    def build(self):
+        """
+        pandas.DataFrame of every page added
+        """
+        if self.column_names is None:
+            return pandas.DataFrame()
+        columns = [self._series(column_name, chunks) for column_name, chunks in self._column_chunks.items()]
+        return pandas.DataFrame(OrderedDict(zip(self.column_names, columns)))
+
+
+def _data_pages(data: DataResponse) -> Iterable[Dict]:
+    # A single response ({'contents': [...]}), a single page, or an iterable of pages from a *_batches() method
+    if isinstance(data, dict):
+        if 'contents' in data:
+            return data['contents']
+        return [data]
+    return data
+
+
+def data_to_dataframe(data: DataResponse, column_types: Optional[Dict[str, str]] = None,
+                      categorical_max_unique_ratio: Optional[float] = DEFAULT_CATEGORICAL_MAX_UNIQUE_RATIO,
+                      categorical_columns: Optional[Iterable[str]] = None):
+    """
+    DataFrame from a searchdata / metadata_answer_data response, or the pages of one result
+    """
+    builder = DataFrameBuilder(column_types=column_types, categorical_max_unique_ratio=categorical_max_unique_ratio,
+                               categorical_columns=categorical_columns)
+    builder.add_pages(_data_pages(data))
+    return builder.build()
+
+
+class LiveboardDataFrameBuilder:
+    """
+    One DataFrameBuilder per visualization of a Liveboard, for the pages of metadata_liveboard_data_batches().
+    build() returns an ordered dict of visualization_id: DataFrame, each frame with the visualization_name
+    in its attrs
+    """
+    def __init__(self, **builder_options):
+        self.builder_options = builder_options
+        self._builders = OrderedDict()
+        self._names = {}
+
+    def add_page(self, page: Dict):
+        visualization_id = page.get('visualization_id')
+        if visualization_id not in self._builders:
+            self._builders[visualization_id] = DataFrameBuilder(**self.builder_options)
+            self._names[visualization_id] = page.get('visualization_name')
+        self._builders[visualization_id].add_page(page)
+
+    def add_pages(self, pages: Iterable[Dict]):
+        for page in pages:
+            self.add_page(page)
+
+    def build(self) -> 'OrderedDict[str, object]':
+        frames = OrderedDict()
+        for visualization_id, builder in self._builders.items():
+            frame = builder.build()
+            frame.attrs['visualization_name'] = self._names[visualization_id]
+            frames[visualization_id] = frame
+        return frames
+
+
+def liveboard_data_to_dataframes(data: DataResponse, column_types: Optional[Dict[str, str]] = None,
+                                 categorical_max_unique_ratio: Optional[float] = DEFAULT_CATEGORICAL_MAX_UNIQUE_RATIO,
+                                 categorical_columns: Optional[Iterable[str]] = None) -> 'OrderedDict[str, object]':
+    """
+    Ordered dict of visualization_id: DataFrame from a metadata_liveboard_data response, or the pages from
+    metadata_liveboard_data_batches()
+    """
+    builder = LiveboardDataFrameBuilder(column_types=column_types,
+                                        categorical_max_unique_ratio=categorical_max_unique_ratio,
+                                        categorical_columns=categorical_columns)
+    builder.add_pages(_data_pages(data))
+    return builder.build()
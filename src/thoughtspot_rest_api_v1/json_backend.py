@@ -0,0 +1,63 @@
+#
+# JSON decoding / encoding for the TML methods of TSRestApiV1
+#
+#   TML export responses run to several MB, with every TML document inside as a JSON string of its own.
+#   The TML methods decode each response body once, check it for errors and read the documents from that one
+#   object. JSONBackend decides how. By default (ordered=None) each method decodes as it always has:
+#   metadata_tml_export() and metadata_tml_export_with_associations_map() read the response into OrderedDicts,
+#   everything else (the 'edoc' TML documents, the export_string and import responses) into plain dicts.
+#   ordered=True or ordered=False makes every method use OrderedDicts or plain dicts. orjson is several times
+#   faster again, and only gives plain dicts (ordered as in the document, as all dicts are since Python 3.7):
+#
+#   ts.set_tml_json_backend(backend='orjson')
+#
+#   orjson is optional: pip install thoughtspot_rest_api_v1[orjson]
+#
+import json
+from collections import OrderedDict
+from typing import Any, Optional, Union
+
+try:
+    import orjson
+except ImportError:  # pragma: no cover - optional dependency, see the 'orjson' extra
+    orjson = None
+
+JSON_BACKENDS = ('json', 'orjson')
+
+
+class JSONBackend:
+    """
+    loads() and dumps() for TML responses and documents. backend is 'json' or 'orjson'. ordered=None decodes
+    objects as each caller asks, ordered=True (only with 'json') always as OrderedDicts, ordered=False always as
+    plain dicts
+    """
+    def __init__(self, backend: str = 'json', ordered: Optional[bool] = None):
+        if backend not in JSON_BACKENDS:
+            raise ValueError("backend must be one of {}".format(JSON_BACKENDS))
+        if backend == 'orjson':
+            if orjson is None:
+                raise ImportError("JSONBackend(backend='orjson') requires the orjson package: "
+                                  "pip install thoughtspot_rest_api_v1[orjson]")
+            if ordered is True:
+                raise ValueError("JSONBackend(backend='orjson') only decodes into plain dicts, "
+                                 "use backend='json' for ordered=True")
+        self.backend = backend
+        self.ordered = ordered
+
+    # ordered is the caller's choice, used unless the backend was created with ordered=True or ordered=False
+    def loads(self, s: Union[str, bytes], ordered: bool = False) -> Any:
+        if self.backend == 'orjson':
+            return orjson.loads(s)
+        if self.ordered is not None:
+            ordered = self.ordered
+        if ordered is True:
+            return json.loads(s, object_pairs_hook=OrderedDict)
+        return json.loads(s)
+
+    def dumps(self, obj: Any) -> str:
+        if self.backend == 'orjson':
+            return orjson.dumps(obj).decode('utf-8')
+        return json.dumps(obj)
+
+
+DEFAULT_JSON_BACKEND = JSONBackend()
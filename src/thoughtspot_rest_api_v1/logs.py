@@ -0,0 +1,325 @@
+#
+# Fetching long ranges of the V2.0 /logs/fetch endpoint (SECURITY_AUDIT log), and tailing it (or V1 /logs/topics)
+#
+#   A single logs_fetch() call should cover at most 24 hours, and a busy day can still be slow enough to time
+#   out. logs_fetch_bulk() splits the requested range into windows, fetches them on several threads, and splits
+#   any window that returns too many events (or times out) in half again, down to min_window_millis.
+#   The results come back in time order, with events repeated on both sides of a window boundary only once.
+#
+import contextlib
+import datetime
+import json
+import os
+import sqlite3
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor, wait, FIRST_COMPLETED
+from typing import Callable, Dict, List, Optional, Tuple, Iterator
+
+import requests
+
+DAY_MILLIS = 24 * 60 * 60 * 1000
+# The longest range the endpoint accepts in a single request
+DEFAULT_WINDOW_MILLIS = DAY_MILLIS
+
+
+def split_time_range(start_epoch_time_in_millis: int, end_epoch_time_in_millis: int,
+                     window_millis: int) -> List[Tuple[int, int]]:
+    windows = []
+    window_start = start_epoch_time_in_millis
+    while window_start < end_epoch_time_in_millis:
+        window_end = min(window_start + window_millis, end_epoch_time_in_millis)
+        windows.append((window_start, window_end))
+        window_start = window_end
+    return windows
+
+
+# Each event is {'date': ..., 'log': '<JSON string>'}. Events repeated in adjacent windows are identical
+def log_event_key(event: Dict) -> Tuple:
+    return event.get('date'), event.get('log')
+
+
+class LogWindowSplitter:
+    """
+    Fetches [start, end] as windows of window_millis on max_workers threads. A window whose fetch returns
+    max_events_per_window or more events, or times out / fails with one of retry_statuses, is split in half and
+    both halves fetched instead, until windows reach min_window_millis.
+
+    windows_fetched and windows_split count what happened, for tuning window_millis.
+    """
+    def __init__(self, fetch_window: Callable[[int, int], List[Dict]], window_millis: int = DEFAULT_WINDOW_MILLIS,
+                 max_workers: int = 4, max_events_per_window: Optional[int] = 10000,
+                 min_window_millis: int = 60 * 1000, retry_statuses=(500, 502, 503, 504)):
+        self.fetch_window = fetch_window
+        self.window_millis = window_millis
+        self.max_workers = max_workers
+        self.max_events_per_window = max_events_per_window
+        self.min_window_millis = min_window_millis
+        self.retry_statuses = frozenset(retry_statuses)
+        self.windows_fetched = 0
+        self.windows_split = 0
+        self._lock = threading.Lock()
+
+    def _can_split(self, window: Tuple[int, int]) -> bool:
+        return window[1] - window[0] >= 2 * self.min_window_millis
+
+    # Returns the events of the window, or None if the window should be split rather than used
+    def _fetch_or_split(self, window: Tuple[int, int]) -> Optional[List[Dict]]:
+        try:
+            events = self.fetch_window(window[0], window[1])
+        except requests.exceptions.Timeout:
+            if self._can_split(window):
+                return None
+            raise
+        except requests.exceptions.HTTPError as e:
+            if e.response is not None and e.response.status_code in self.retry_statuses and self._can_split(window):
+                return None
+            raise
+        with self._lock:
+            self.windows_fetched += 1
+        if (self.max_events_per_window is not None and len(events) >= self.max_events_per_window
+                and self._can_split(window)):
+            return None
+        return events
+
+    def fetch(self, start_epoch_time_in_millis: int, end_epoch_time_in_millis: int) -> List[Dict]:
+        windows = split_time_range(start_epoch_time_in_millis, end_epoch_time_in_millis, self.window_millis)
+        events_by_window = {}
+        with ThreadPoolExecutor(max_workers=self.max_workers, thread_name_prefix='ts-logs-window') as executor:
+            futures = {executor.submit(self._fetch_or_split, window): window for window in windows}
+            try:
+                while futures:
+                    done, _ = wait(futures, return_when=FIRST_COMPLETED)
+                    for future in done:
+                        window = futures.pop(future)
+                        events = future.result()
+                        if events is not None:
+                            events_by_window[window] = events
+                            continue
+                        with self._lock:
+                            self.windows_split += 1
+                        middle = window[0] + (window[1] - window[0]) // 2
+                        for half in ((window[0], middle), (middle, window[1])):
+                            futures[executor.submit(self._fetch_or_split, half)] = half
+            finally:
+                for future in futures:
+                    future.cancel()
+
+        return merge_log_windows(events_by_window)
+
+
+# Windows never overlap, so putting them in start time order, each sorted by the time of the event 'date', puts all
+# of the events in time order. The dates are compared as times rather than strings, because the fraction of a
+# second is left out when it is zero ('...:22Z' is before '...:22.123Z'). Any event on a boundary, returned by both
+# windows, is kept once
+def merge_log_windows(events_by_window: Dict[Tuple[int, int], List[Dict]]) -> List[Dict]:
+    merged = []
+    previous_keys = set()
+    for window in sorted(events_by_window):
+        window_keys = set()
+        for event in sorted(events_by_window[window], key=lambda e: log_event_time_millis(e) or 0):
+            key = log_event_key(event)
+            if key in previous_keys or key in window_keys:
+                continue
+            window_keys.add(key)
+            merged.append(event)
+        previous_keys = window_keys
+    return merged
+
+
+#
+# Incremental tailing of the log, resuming from a checkpoint
+#
+#   LogTailer remembers how far it has read (the high-water mark) in a LogCheckpoint file or SQLite database,
+#   so each poll asks only for events since then. Events can be written to the log a little after their
+#   timestamp, so each poll reaches back overlap_millis before the high-water mark, and the ids of the events
+#   already delivered from that overlap are kept in the checkpoint so they are not delivered twice.
+#
+#   Events are delivered at least once: the checkpoint is only saved once every event of a poll has been handed
+#   over, so if the process stops part way through, the rest of that poll is delivered again on restart.
+#
+def log_event_id(event: Dict) -> str:
+    # 'log' is a JSON string, which has an 'id' for the event
+    try:
+        event_id = json.loads(event.get('log', '')).get('id')
+    except (ValueError, AttributeError):
+        event_id = None
+    if event_id is None:
+        return json.dumps(log_event_key(event))
+    return str(event_id)
+
+
+# 'date' is ISO 8601 UTC, like 2024-03-20T15:33:22.123Z
+def log_event_time_millis(event: Dict) -> Optional[int]:
+    date = event.get('date')
+    if not date:
+        return None
+    seconds_part, _, fraction = date.rstrip('Z').partition('.')
+    try:
+        dt = datetime.datetime.strptime(seconds_part[:19], '%Y-%m-%dT%H:%M:%S')
+    except ValueError:
+        return None
+    millis = int((fraction[:3] + '000')[:3]) if fraction[:3].isdigit() else 0
+    return int(dt.replace(tzinfo=datetime.timezone.utc).timestamp()) * 1000 + millis
+
+
+class LogCheckpoint:
+    """
+    Where a LogTailer keeps its high-water mark (epoch millis) and the ids of the events it delivered within
+    the overlap period. FileLogCheckpoint and SQLiteLogCheckpoint implement load() and save()
+    """
+    def load(self) -> Tuple[Optional[int], Dict[str, int]]:
+        raise NotImplementedError
+
+    def save(self, high_water_mark: int, recent_event_ids: Dict[str, int]):
+        raise NotImplementedError
+
+
+class FileLogCheckpoint(LogCheckpoint):
+    """
+    Checkpoint kept as a small JSON file, replaced atomically on each save
+    """
+    def __init__(self, path: str):
+        self.path = path
+
+    def load(self) -> Tuple[Optional[int], Dict[str, int]]:
+        if not os.path.exists(self.path):
+            return None, {}
+        with open(self.path, 'r', encoding='utf-8') as fh:
+            checkpoint = json.load(fh)
+        return checkpoint.get('high_water_mark'), checkpoint.get('recent_event_ids', {})
+
+    def save(self, high_water_mark: int, recent_event_ids: Dict[str, int]):
+        temp_path = self.path + '.tmp'
+        with open(temp_path, 'w', encoding='utf-8') as fh:
+            json.dump({'high_water_mark': high_water_mark, 'recent_event_ids': recent_event_ids}, fh)
+        os.replace(temp_path, self.path)
+
+
+class SQLiteLogCheckpoint(LogCheckpoint):
+    """
+    Checkpoint kept in a SQLite database, one row per name, so several tailers (log types, clusters) can share
+    one database file
+    """
+    def __init__(self, path: str, name: str = 'default'):
+        self.path = path
+        self.name = name
+        with self._connect() as conn:
+            conn.execute('CREATE TABLE IF NOT EXISTS log_checkpoint '
+                         '(name TEXT PRIMARY KEY, high_water_mark INTEGER, recent_event_ids TEXT)')
+
+    # Commits on success (rolls back on an exception) and closes the connection
+    @contextlib.contextmanager
+    def _connect(self):
+        conn = sqlite3.connect(self.path)
+        try:
+            with conn:
+                yield conn
+        finally:
+            conn.close()
+
+    def load(self) -> Tuple[Optional[int], Dict[str, int]]:
+        with self._connect() as conn:
+            row = conn.execute('SELECT high_water_mark, recent_event_ids FROM log_checkpoint WHERE name = ?',
+                               (self.name,)).fetchone()
+        if row is None:
+            return None, {}
+        return row[0], json.loads(row[1])
+
+    def save(self, high_water_mark: int, recent_event_ids: Dict[str, int]):
+        with self._connect() as conn:
+            conn.execute('INSERT OR REPLACE INTO log_checkpoint (name, high_water_mark, recent_event_ids) '
+                         'VALUES (?, ?, ?)', (self.name, high_water_mark, json.dumps(recent_event_ids)))
+
+
+class LogTailer:
+    """
+    Polls fetch_range(start_millis, end_millis) for the events since the checkpoint's high-water mark, delivering
+    each event once. With no checkpoint saved yet, starts from start_epoch_time_in_millis (default: 24 hours ago).
+
+    poll() fetches and returns the new events, commit() then saves the checkpoint. tail() is a generator doing
+    both every poll_interval_sec, and run() passes each event to a callback.
+    """
+    def __init__(self, fetch_range: Callable[[int, int], List[Dict]], checkpoint: LogCheckpoint,
+                 start_epoch_time_in_millis: Optional[int] = None, overlap_millis: int = 5 * 60 * 1000,
+                 poll_interval_sec: float = 60, window_millis: int = DEFAULT_WINDOW_MILLIS):
+        self.fetch_range = fetch_range
+        self.checkpoint = checkpoint
+        self.overlap_millis = overlap_millis
+        self.poll_interval_sec = poll_interval_sec
+        self.window_millis = window_millis
+
+        high_water_mark, recent_event_ids = checkpoint.load()
+        if high_water_mark is None:
+            if start_epoch_time_in_millis is None:
+                start_epoch_time_in_millis = int(time.time() * 1000) - DAY_MILLIS
+            high_water_mark = start_epoch_time_in_millis
+            # Nothing before the starting point is wanted, so there is no overlap to look back into
+            recent_event_ids = {}
+            self._first_poll_from = start_epoch_time_in_millis
+        else:
+            self._first_poll_from = None
+        self.high_water_mark = high_water_mark
+        self.recent_event_ids = recent_event_ids
+        self._pending = None  # type: Optional[Tuple[int, Dict[str, int]]]
+
+    def poll(self) -> List[Dict]:
+        """
+        Returns the events not delivered before, in time order. Call commit() once they have been handled
+        """
+        end = int(time.time() * 1000)
+        if self._first_poll_from is not None:
+            start = self._first_poll_from
+        else:
+            start = self.high_water_mark - self.overlap_millis
+
+        # Ranges longer than the endpoint allows (after the tailer was stopped for a while) are fetched in windows
+        splitter = LogWindowSplitter(self.fetch_range, window_millis=self.window_millis, max_workers=1,
+                                     max_events_per_window=None)
+        events = splitter.fetch(start, end)
+
+        new_events = []
+        recent_event_ids = {}
+        # Only the ids that the next poll's overlap can return again need to be remembered
+        keep_ids_from = end - self.overlap_millis
+        for event_id, event_time in self.recent_event_ids.items():
+            if event_time >= keep_ids_from:
+                recent_event_ids[event_id] = event_time
+        for event in events:
+            event_id = log_event_id(event)
+            if event_id in self.recent_event_ids or event_id in recent_event_ids:
+                continue
+            event_time = log_event_time_millis(event)
+            if event_time is None:
+                event_time = end
+            if event_time >= keep_ids_from:
+                recent_event_ids[event_id] = event_time
+            new_events.append(event)
+
+        self._pending = (end, recent_event_ids)
+        return new_events
+
+    def commit(self):
+        if self._pending is None:
+            return
+        self.high_water_mark, self.recent_event_ids = self._pending
+        self.checkpoint.save(self.high_water_mark, self.recent_event_ids)
+        self._first_poll_from = None
+        self._pending = None
+
+    def tail(self, stop_event: Optional[threading.Event] = None) -> Iterator[Dict]:
+        """
+        Yields new events as they are written to the log, polling every poll_interval_sec until stop_event is set
+        """
+        while stop_event is None or not stop_event.is_set():
+            for event in self.poll():
+                yield event
+            self.commit()
+            if stop_event is not None:
+                stop_event.wait(self.poll_interval_sec)
+            else:
+                time.sleep(self.poll_interval_sec)
+
+    def run(self, callback: Callable[[Dict], None], stop_event: Optional[threading.Event] = None):
+        for event in self.tail(stop_event=stop_event):
+            callback(event)
@@ -0,0 +1,150 @@
+#
+# TSRestApiV2 objects for many Orgs, sharing one connection pool
+#
+#   Running the same operation against every Org (deploys to single-tenant prod Orgs, migrations) otherwise
+#   means a new TSRestApiV2 object, new connections and a new auth_token_full() call for each Org.
+#   OrgClientPool resolves Org names once, keeps one managed bearer token per Org (see BearerTokenManager),
+#   and mounts one TSHTTPAdapter on every Org's session, so connections are reused across Orgs:
+#
+#   org_pool = OrgClientPool(server_url=server, username=username, secret_key=secret_key)
+#   for org_id, deploy_resp, error in org_pool.fanout(deploy, orgs=['cust_a', 'cust_b'], max_workers=16):
+#       ...
+#
+import threading
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from typing import Optional, Dict, List, Union, Iterable, Iterator, Callable, Tuple, Any
+
+from .tsrestapiv2 import TSRestApiV2
+from .transport import TSHTTPAdapter
+from .retry import RetryPolicy
+from .rate_limit import RateLimiter
+from .compression import RequestCompression
+
+OrgIdentifier = Union[int, str]
+
+
+class OrgClientPool:
+    """
+    Hands out a TSRestApiV2 object per Org, by org_id or Org name. Each object is created (and its token minted)
+    the first time the Org is requested, then reused. All of them send through the same TSHTTPAdapter, so
+    pool_maxsize is the total number of connections kept open to the server across every Org.
+
+    Org names are resolved with orgs_search() on the Primary Org (org_id 0), so username must be able to see all
+    of the Orgs.
+    """
+    PRIMARY_ORG_ID = 0
+
+    def __init__(self, server_url: str, username: str, password: Optional[str] = None,
+                 secret_key: Optional[str] = None, validity_time_in_sec: int = 3000,
+                 refresh_margin_sec: Optional[float] = None, pool_maxsize: int = 32, pool_block: bool = True,
+                 pool_timeout: Optional[float] = None):
+        self.server_url = server_url
+        self.username = username
+        self.password = password
+        self.secret_key = secret_key
+        self.validity_time_in_sec = validity_time_in_sec
+        self.refresh_margin_sec = refresh_margin_sec
+
+        self.transport_adaptor = TSHTTPAdapter(pool_maxsize=pool_maxsize, pool_block=pool_block,
+                                               pool_timeout=pool_timeout)
+        self._clients = {}  # type: Dict[int, TSRestApiV2]
+        self._org_locks = {}  # type: Dict[int, threading.Lock]
+        self._lock = threading.Lock()
+        self._org_ids_by_name = None  # type: Optional[Dict[str, int]]
+
+    # Retries, rate limiting etc. set on the shared adapter apply to every Org
+    def set_retry_policy(self, retry_policy: Optional[RetryPolicy]):
+        self.transport_adaptor.retry_policy = retry_policy
+
+    def set_rate_limiter(self, rate_limiter: Optional[RateLimiter]):
+        self.transport_adaptor.rate_limiter = rate_limiter
+
+    def set_request_compression(self, request_compression: Optional[RequestCompression]):
+        self.transport_adaptor.request_compression = request_compression
+
+    @property
+    def primary(self) -> TSRestApiV2:
+        return self.get_client(self.PRIMARY_ORG_ID)
+
+    # Org name -> org_id for every Org, from a single orgs_search() call (cached, refresh=True to reload)
+    def get_org_ids_by_name(self, refresh: bool = False) -> Dict[str, int]:
+        with self._lock:
+            org_ids_by_name = self._org_ids_by_name
+        if org_ids_by_name is None or refresh is True:
+            orgs = self.primary.orgs_search(request={})
+            org_ids_by_name = {org['name']: org['id'] for org in orgs}
+            with self._lock:
+                self._org_ids_by_name = org_ids_by_name
+        return org_ids_by_name
+
+    def get_org_id(self, org: OrgIdentifier) -> int:
+        if isinstance(org, int):
+            return org
+        org_ids_by_name = self.get_org_ids_by_name()
+        if org not in org_ids_by_name:
+            # A new Org may have been created since the names were loaded
+            org_ids_by_name = self.get_org_ids_by_name(refresh=True)
+        if org not in org_ids_by_name:
+            raise Exception("No Org named '{}' is visible to user {}".format(org, self.username))
+        return org_ids_by_name[org]
+
+    def get_client(self, org: OrgIdentifier) -> TSRestApiV2:
+        org_id = self.get_org_id(org)
+        with self._lock:
+            client = self._clients.get(org_id)
+            if client is not None:
+                return client
+            org_lock = self._org_locks.setdefault(org_id, threading.Lock())
+
+        # Tokens for different Orgs are minted in parallel, only callers for the same Org wait on each other
+        with org_lock:
+            with self._lock:
+                client = self._clients.get(org_id)
+            if client is None:
+                client = TSRestApiV2(server_url=self.server_url)
+                client.set_tcp_keep_alive_adaptor(self.transport_adaptor)
+                client.set_managed_bearer_token(username=self.username, password=self.password,
+                                                secret_key=self.secret_key, org_id=org_id,
+                                                validity_time_in_sec=self.validity_time_in_sec,
+                                                refresh_margin_sec=self.refresh_margin_sec)
+                with self._lock:
+                    self._clients[org_id] = client
+        return client
+
+    def fanout(self, fn: Callable[[TSRestApiV2], Any], orgs: Optional[Iterable[OrgIdentifier]] = None,
+               max_workers: int = 8) -> Iterator[Tuple[int, Any, Optional[Exception]]]:
+        """
+        Calls fn(ts) with the TSRestApiV2 object of each Org (every Org other than the Primary if orgs is None)
+        on max_workers threads. Yields (org_id, result, None), or (org_id, None, exception) if the call failed,
+        in the order the Orgs finish, so one failing Org does not stop the others.
+        """
+        if orgs is None:
+            org_ids = [org_id for org_id in self.get_org_ids_by_name().values() if org_id != self.PRIMARY_ORG_ID]
+        else:
+            org_ids = [self.get_org_id(org) for org in orgs]
+
+        def call_for_org(org_id: int):
+            return fn(self.get_client(org_id))
+
+        with ThreadPoolExecutor(max_workers=max_workers) as executor:
+            futures = {executor.submit(call_for_org, org_id): org_id for org_id in org_ids}
+            try:
+                for future in as_completed(futures):
+                    error = future.exception()
+                    yield futures[future], (future.result() if error is None else None), error
+            finally:
+                # The caller stopped iterating early: don't start the Orgs that have not been started yet
+                for future in futures:
+                    future.cancel()
+
+    @property
+    def org_ids(self) -> List[int]:
+        with self._lock:
+            return list(self._clients.keys())
+
+    def close(self):
+        with self._lock:
+            for client in self._clients.values():
+                client.requests_session.close()
+            self._clients = {}
+        self.transport_adaptor.close()
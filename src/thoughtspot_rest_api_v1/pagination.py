@@ -0,0 +1,237 @@
+#
+# Paging through the V2.0 search endpoints that take record_offset / record_size
+#
+#   Rather than requesting everything at once with record_size: -1, pages of record_size are requested one
+#   after the other, and only read_ahead pages beyond the one being processed are ever held in memory.
+#   The read-ahead pages are requested on a background thread while the caller works through the current one,
+#   so network time overlaps with processing. With max_workers > 1, several read-ahead pages are requested at
+#   once, which is what makes enumerating every user or group of a large cluster fast. Pages are still yielded
+#   in offset order, whichever request finishes first.
+#
+import asyncio
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+from typing import Callable, Dict, List, Optional, Iterable, Iterator, AsyncIterator, Awaitable, Any
+
+DEFAULT_PAGE_SIZE = 500
+# Rows per page for the data endpoints (searchdata, metadata/answer/data, metadata/liveboard/data)
+DEFAULT_DATA_PAGE_SIZE = 5000
+
+
+# Copy of a search request asking for one page
+def page_request(request: Dict, record_offset: int, record_size: int) -> Dict:
+    paged_request = dict(request)
+    paged_request['record_offset'] = record_offset
+    paged_request['record_size'] = record_size
+    return paged_request
+
+
+# The data endpoints return {'contents': [{'column_names': [...], 'data_rows': [...], ...}]}, with one entry in
+# 'contents' per visualization for a Liveboard. A page of data is one of those entries
+def data_page_contents(data_response: Dict) -> Dict:
+    contents = data_response.get('contents', [])
+    if len(contents) == 0:
+        return {'column_names': [], 'data_rows': []}
+    return contents[0]
+
+
+def data_page_length(contents: Dict) -> int:
+    return len(contents.get('data_rows', []))
+
+
+def iter_data_rows(data_pages: Iterable[Dict]) -> Iterator:
+    for contents in data_pages:
+        for row in contents.get('data_rows', []):
+            yield row
+
+
+# Copy of the item with only the listed keys (those it has), or the item itself if fields is None
+def project_fields(item: Dict, fields: Optional[Iterable[str]] = None) -> Dict:
+    if fields is None:
+        return item
+    return {field: item[field] for field in fields if field in item}
+
+
+def iter_pages(fetch_page: Callable[[int, int], List], record_size: int = DEFAULT_PAGE_SIZE,
+               record_offset: int = 0, read_ahead: int = 1, max_workers: int = 1, overlap: int = 0,
+               page_length: Callable[[Any], int] = len) -> Iterator[List]:
+    """
+    Yields the pages returned by fetch_page(record_offset, record_size) in offset order, until a page comes back
+    shorter than record_size. With read_ahead > 0 the following pages are requested in the background, on up to
+    max_workers threads at once. With max_workers > 1 the first page is requested on its own, so that a search
+    with only one page of results is a single request.
+
+    overlap > 0 requests each page that many records longer, so it repeats the first records of the next page.
+    page_length gives the number of records in a page, for pages that are not simply a list of records.
+    """
+    if record_size <= 0:
+        raise ValueError("record_size must be a positive number of records per page")
+    page_size = record_size + overlap
+
+    if read_ahead <= 0:
+        while True:
+            page = fetch_page(record_offset, page_size)
+            yield page
+            if page_length(page) < page_size:
+                return
+            record_offset += record_size
+
+    if max_workers > 1:
+        page = fetch_page(record_offset, page_size)
+        yield page
+        if page_length(page) < page_size:
+            return
+        record_offset += record_size
+
+    executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix='ts-page-read-ahead')
+    pending = deque()
+    try:
+        next_offset = record_offset
+        while True:
+            while len(pending) <= read_ahead:
+                pending.append(executor.submit(fetch_page, next_offset, page_size))
+                next_offset += record_size
+            page = pending.popleft().result()
+            yield page
+            if page_length(page) < page_size:
+                return
+    finally:
+        # Pages requested past the end (or after the caller stopped iterating) are discarded
+        for future in pending:
+            future.cancel()
+        executor.shutdown(wait=False)
+
+
+async def aiter_pages(fetch_page: Callable[[int, int], Awaitable[List]], record_size: int = DEFAULT_PAGE_SIZE,
+                      record_offset: int = 0, read_ahead: int = 1, max_workers: int = 1,
+                      overlap: int = 0, page_length: Callable[[Any], int] = len) -> AsyncIterator[List]:
+    """
+    asyncio version of iter_pages(), with the read-ahead pages requested concurrently as tasks on the running
+    event loop. max_workers > 1 only means the first page is requested on its own
+    """
+    if record_size <= 0:
+        raise ValueError("record_size must be a positive number of records per page")
+    page_size = record_size + overlap
+
+    if max_workers > 1:
+        page = await fetch_page(record_offset, page_size)
+        yield page
+        if page_length(page) < page_size:
+            return
+        record_offset += record_size
+
+    pending = deque()
+    try:
+        next_offset = record_offset
+        while True:
+            while len(pending) <= read_ahead:
+                pending.append(asyncio.ensure_future(fetch_page(next_offset, page_size)))
+                next_offset += record_size
+            page = await pending.popleft()
+            yield page
+            if page_length(page) < page_size:
+                return
+    finally:
+        for task in pending:
+            task.cancel()
+
+
+class UniqueItemsMerge:
+    """
+    Merges overlapping pages (see iter_pages() overlap) into a single sequence of items, each yielded once in
+    page order, identified by key.
+
+    Records created or deleted on the server during a scan move every later record up or down, so pages requested
+    before and after the change are offset from each other. Records created earlier in the order only repeat
+    records already seen, which are skipped. Records deleted earlier in the order move unseen records back
+    before the start of the next page: check_page() spots this, as the start of the page overlaps nothing
+    already seen, and the records in between are requested again from an earlier offset (further back each time,
+    see recovery_page_request()) until the request reaches records already seen.
+    """
+    def __init__(self, key: str = 'id', overlap: int = 1):
+        self.key = key
+        self.overlap = overlap
+        self.pages_requested_again = 0
+        self._seen = set()
+        self._pages_merged = 0
+
+    # True if the page appears misaligned with the previous page, with records possibly missed before it
+    def check_page(self, page: List) -> bool:
+        if self._pages_merged == 0 or self.overlap <= 0 or len(page) == 0:
+            return False
+        return not any(item.get(self.key) in self._seen for item in page[:self.overlap])
+
+    def overlaps_seen(self, page: List) -> bool:
+        return any(item.get(self.key) in self._seen for item in page)
+
+    # (record_offset, record_size) of the records before a misaligned page at page_offset, going back record_size
+    # records on the first attempt and twice as far on each following one, but not before first_offset
+    def recovery_page_request(self, page_offset: int, first_offset: int, record_size: int, attempt: int):
+        recovery_offset = max(first_offset, page_offset - record_size * (2 ** attempt))
+        return recovery_offset, page_offset - recovery_offset + self.overlap
+
+    def merge_page(self, page: List) -> Iterator[Dict]:
+        self._pages_merged += 1
+        for item in page:
+            item_key = item.get(self.key)
+            if item_key is not None:
+                if item_key in self._seen:
+                    continue
+                self._seen.add(item_key)
+            yield item
+
+
+def iter_unique_items(fetch_page: Callable[[int, int], List], record_size: int = DEFAULT_PAGE_SIZE,
+                      record_offset: int = 0, max_workers: int = 1, key: str = 'id',
+                      overlap: int = 1) -> Iterator[Dict]:
+    """
+    Yields every item of a paged search once each, with up to max_workers pages requested at once,
+    merged by UniqueItemsMerge
+    """
+    merge = UniqueItemsMerge(key=key, overlap=overlap)
+    pages = iter_pages(fetch_page, record_size=record_size, record_offset=record_offset,
+                       read_ahead=max_workers, max_workers=max_workers, overlap=overlap)
+    for page_number, page in enumerate(pages):
+        if merge.check_page(page):
+            page_offset = record_offset + page_number * record_size
+            attempt = 0
+            while True:
+                recovery_offset, recovery_size = merge.recovery_page_request(page_offset, record_offset,
+                                                                             record_size, attempt)
+                recovery_page = fetch_page(recovery_offset, recovery_size)
+                merge.pages_requested_again += 1
+                if recovery_offset == record_offset or merge.overlaps_seen(recovery_page):
+                    break
+                attempt += 1
+            for item in merge.merge_page(recovery_page):
+                yield item
+        for item in merge.merge_page(page):
+            yield item
+
+
+async def aiter_unique_items(fetch_page: Callable[[int, int], Awaitable[List]], record_size: int = DEFAULT_PAGE_SIZE,
+                             record_offset: int = 0, max_workers: int = 1, key: str = 'id',
+                             overlap: int = 1) -> AsyncIterator[Dict]:
+    """
+    asyncio version of iter_unique_items()
+    """
+    merge = UniqueItemsMerge(key=key, overlap=overlap)
+    page_number = 0
+    async for page in aiter_pages(fetch_page, record_size=record_size, record_offset=record_offset,
+                                  read_ahead=max_workers, max_workers=max_workers, overlap=overlap):
+        if merge.check_page(page):
+            page_offset = record_offset + page_number * record_size
+            attempt = 0
+            while True:
+                recovery_offset, recovery_size = merge.recovery_page_request(page_offset, record_offset,
+                                                                             record_size, attempt)
+                recovery_page = await fetch_page(recovery_offset, recovery_size)
+                merge.pages_requested_again += 1
+                if recovery_offset == record_offset or merge.overlaps_seen(recovery_page):
+                    break
+                attempt += 1
+            for item in merge.merge_page(recovery_page):
+                yield item
+        for item in merge.merge_page(page):
+            yield item
+        page_number += 1
@@ -0,0 +1,138 @@
+#
+# Client-side rate limiting, applied by TSHTTPAdapter to every request of TSRestApiV1 / TSRestApiV2, and by
+# AsyncTSRestApiV2 to each of its requests
+#
+#   ThoughtSpot throttles expensive endpoints (report/, metadata/tml/import, searchdata) much harder than
+#   cheap ones. Giving each endpoint family its own budget keeps parallel jobs under the server's limits
+#   without slowing down the cheap calls:
+#
+#   rate_limiter = RateLimiter(budgets={
+#       'report/': RateLimit(requests_per_second=0.5, max_in_flight=2),
+#       'metadata/tml/import': RateLimit(requests_per_second=1, max_in_flight=1),
+#       'searchdata': RateLimit(requests_per_second=2, max_in_flight=4)
+#   }, default=RateLimit(requests_per_second=20, max_in_flight=16))
+#   ts.set_rate_limiter(rate_limiter)
+#
+import asyncio
+import threading
+import time
+from contextlib import contextmanager, asynccontextmanager
+from typing import Optional, Dict
+from urllib.parse import urlparse
+
+# URL paths the endpoints of each API follow, longest first so '/callosum/v1/tspublic/v1/' wins over '/callosum/v1/'
+API_BASE_PATHS = ('/callosum/v1/tspublic/v1/', '/tspublic/rest/v2/', '/api/rest/2.0/', '/callosum/v1/')
+
+
+def endpoint_path(url: str) -> str:
+    """
+    The part of the URL path after the API base path ('metadata/search' for .../api/rest/2.0/metadata/search)
+    """
+    path = urlparse(url).path
+    for base_path in API_BASE_PATHS:
+        position = path.find(base_path)
+        if position >= 0:
+            return path[position + len(base_path):]
+    return path.lstrip('/')
+
+
+class RateLimit:
+    """
+    Budget for one endpoint family: a token bucket refilling at requests_per_second (None for no limit),
+    holding up to burst tokens, plus a cap on the number of requests in flight at once (None for no cap)
+    """
+    def __init__(self, requests_per_second: Optional[float] = None, max_in_flight: Optional[int] = None,
+                 burst: Optional[float] = None):
+        self.requests_per_second = requests_per_second
+        self.max_in_flight = max_in_flight
+        if burst is None and requests_per_second is not None:
+            burst = max(1.0, float(requests_per_second))
+        self.burst = burst
+
+        self._lock = threading.Lock()
+        self._tokens = burst
+        self._last_refill = time.monotonic()
+        self._in_flight = threading.BoundedSemaphore(max_in_flight) if max_in_flight is not None else None
+        # Created on first use by async_acquire(), within the running event loop
+        self._async_in_flight = None  # type: Optional[asyncio.Semaphore]
+
+    # Takes a token, returning how long the caller must wait before sending. Tokens can go negative, so
+    # callers arriving together are each given a later slot rather than all waking at once
+    def _reserve(self) -> float:
+        if self.requests_per_second is None:
+            return 0.0
+        with self._lock:
+            now = time.monotonic()
+            self._tokens = min(self.burst, self._tokens + (now - self._last_refill) * self.requests_per_second)
+            self._last_refill = now
+            self._tokens -= 1
+            if self._tokens >= 0:
+                return 0.0
+            return -self._tokens / self.requests_per_second
+
+    @contextmanager
+    def acquire(self):
+        if self._in_flight is not None:
+            self._in_flight.acquire()
+        try:
+            wait = self._reserve()
+            if wait > 0:
+                time.sleep(wait)
+            yield
+        finally:
+            if self._in_flight is not None:
+                self._in_flight.release()
+
+    # The token bucket is shared with acquire(), but the async requests in flight are counted separately
+    @asynccontextmanager
+    async def async_acquire(self):
+        if self.max_in_flight is not None and self._async_in_flight is None:
+            self._async_in_flight = asyncio.Semaphore(self.max_in_flight)
+        if self._async_in_flight is not None:
+            await self._async_in_flight.acquire()
+        try:
+            wait = self._reserve()
+            if wait > 0:
+                await asyncio.sleep(wait)
+            yield
+        finally:
+            if self._async_in_flight is not None:
+                self._async_in_flight.release()
+
+
+class RateLimiter:
+    """
+    Maps endpoint prefixes (the part of the URL after the API base, like 'report/' or 'metadata/tml/import')
+    to a RateLimit. A request uses the budget of the longest prefix its endpoint starts with, or default if none
+    match: 'search' is not a prefix of 'metadata/search'. Every endpoint matching a prefix shares that one budget.
+    """
+    def __init__(self, budgets: Optional[Dict[str, RateLimit]] = None, default: Optional[RateLimit] = None):
+        self.budgets = dict(budgets) if budgets is not None else {}
+        self.default = default
+        # Longest first, so 'metadata/tml/import' wins over 'metadata/'
+        self._prefixes = sorted(self.budgets.keys(), key=lambda prefix: len(prefix.lstrip('/')), reverse=True)
+
+    def get_rate_limit(self, url: str) -> Optional[RateLimit]:
+        endpoint = endpoint_path(url)
+        for prefix in self._prefixes:
+            if endpoint.startswith(prefix.lstrip('/')):
+                return self.budgets[prefix]
+        return self.default
+
+    @contextmanager
+    def limit(self, url: str):
+        rate_limit = self.get_rate_limit(url)
+        if rate_limit is None:
+            yield
+        else:
+            with rate_limit.acquire():
+                yield
+
+    @asynccontextmanager
+    async def async_limit(self, url: str):
+        rate_limit = self.get_rate_limit(url)
+        if rate_limit is None:
+            yield
+        else:
+            async with rate_limit.async_acquire():
+                yield
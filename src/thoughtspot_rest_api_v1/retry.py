@@ -0,0 +1,167 @@
+#
+# Retry policy used by TSHTTPAdapter (TSRestApiV1 / TSRestApiV2) and by AsyncTSRestApiV2
+#
+#   The V2 REST API uses POST for almost every call, including ones that only read (metadata/search),
+#   so whether a request is safe to repeat depends on the endpoint, not just the HTTP verb:
+#
+#   - GET / PUT / DELETE and POSTs to read-only endpoints (IDEMPOTENT_POST_ENDPOINTS) are retried on
+#     any of idempotent_statuses, or when the connection fails or times out
+#   - Any other POST (TML import, share, create...) may have been processed already, so is only retried on
+#     non_idempotent_statuses (throttled or unavailable, nothing was done) or when it could not connect
+#
+import email.utils
+import random
+import threading
+import time
+from collections import Counter
+from typing import Optional, Dict, Iterable
+from urllib.parse import urlparse
+
+
+# Endings of the URL path of endpoints that are called with POST but do not change anything
+IDEMPOTENT_POST_ENDPOINTS = (
+    # V2.0
+    '/search',
+    'searchdata',
+    '/fetch-permissions',
+    'metadata/liveboard/data',
+    'metadata/answer/data',
+    'metadata/liveboard/sql',
+    'metadata/answer/sql',
+    'metadata/tml/export',
+    'metadata/tml/export/batch',
+    'metadata/tml/async/status',
+    'report/liveboard',
+    'report/answer',
+    'logs/fetch',
+    # V1 (metadata/tml/export is the same path as V2.0)
+    'pinboarddata',
+    'export/pinboard/pdf',
+    'dependency/listdependents',
+    'security/effectivepermissionbulk',
+)
+
+IDEMPOTENT_METHODS = ('GET', 'HEAD', 'OPTIONS', 'PUT', 'DELETE')
+
+
+class RetryPolicy:
+    """
+    Exponential backoff with full jitter: the wait before retry n is a random time between 0 and
+    backoff_factor * 2^n seconds, capped at backoff_max. A Retry-After header on a 429 / 503 response is
+    used instead when respect_retry_after is True (capped at retry_after_max).
+
+    The counters property returns how many requests were sent and how many were retried, so a long
+    running job can report how hard it is being throttled.
+    """
+    def __init__(self, max_retries: int = 5, backoff_factor: float = 0.5, backoff_max: float = 60.0,
+                 jitter: bool = True, respect_retry_after: bool = True, retry_after_max: float = 300.0,
+                 idempotent_statuses: Iterable[int] = (429, 502, 503, 504),
+                 non_idempotent_statuses: Iterable[int] = (429, 503),
+                 idempotent_post_endpoints: Iterable[str] = IDEMPOTENT_POST_ENDPOINTS):
+        self.max_retries = max_retries
+        self.backoff_factor = backoff_factor
+        self.backoff_max = backoff_max
+        self.jitter = jitter
+        self.respect_retry_after = respect_retry_after
+        self.retry_after_max = retry_after_max
+        self.idempotent_statuses = frozenset(idempotent_statuses)
+        self.non_idempotent_statuses = frozenset(non_idempotent_statuses)
+        self.idempotent_post_endpoints = tuple(idempotent_post_endpoints)
+
+        self._lock = threading.Lock()
+        self._requests = 0
+        self._retries = 0
+        self._retries_by_status = Counter()
+        self._connection_error_retries = 0
+        self._gave_up = 0
+
+    def is_idempotent(self, method: str, url: str) -> bool:
+        method = method.upper()
+        if method in IDEMPOTENT_METHODS:
+            return True
+        if method == 'POST':
+            path = urlparse(url).path.rstrip('/')
+            return path.endswith(self.idempotent_post_endpoints)
+        return False
+
+    def should_retry_status(self, method: str, url: str, status_code: int, attempt: int) -> bool:
+        if self.is_idempotent(method, url):
+            retryable = status_code in self.idempotent_statuses
+        else:
+            retryable = status_code in self.non_idempotent_statuses
+        if not retryable:
+            return False
+        if attempt >= self.max_retries:
+            self._count(gave_up=True)
+            return False
+        self._count(status_code=status_code)
+        return True
+
+    # Connection failures and timeouts. request_sent=False when the connection was never established
+    # (so nothing reached the server), which is safe to retry for any endpoint
+    def should_retry_connection_failure(self, method: str, url: str, request_sent: bool, attempt: int) -> bool:
+        if request_sent is True and not self.is_idempotent(method, url):
+            return False
+        if attempt >= self.max_retries:
+            self._count(gave_up=True)
+            return False
+        self._count(connection_error=True)
+        return True
+
+    def get_backoff(self, attempt: int, retry_after: Optional[str] = None) -> float:
+        if self.respect_retry_after is True and retry_after is not None:
+            retry_after_seconds = self.parse_retry_after(retry_after)
+            if retry_after_seconds is not None:
+                return min(retry_after_seconds, self.retry_after_max)
+        backoff = min(self.backoff_max, self.backoff_factor * (2 ** attempt))
+        if self.jitter is True:
+            return random.uniform(0, backoff)
+        return backoff
+
+    # Retry-After is either a number of seconds or an HTTP date
+    @staticmethod
+    def parse_retry_after(retry_after: str) -> Optional[float]:
+        retry_after = retry_after.strip()
+        if retry_after.isdigit():
+            return float(retry_after)
+        try:
+            retry_at = email.utils.parsedate_to_datetime(retry_after)
+        except (TypeError, ValueError, IndexError):
+            return None
+        if retry_at is None:
+            return None
+        return max(0.0, retry_at.timestamp() - time.time())
+
+    def count_request(self):
+        with self._lock:
+            self._requests += 1
+
+    def _count(self, status_code: Optional[int] = None, connection_error: bool = False, gave_up: bool = False):
+        with self._lock:
+            if gave_up is True:
+                self._gave_up += 1
+                return
+            self._retries += 1
+            if status_code is not None:
+                self._retries_by_status[status_code] += 1
+            if connection_error is True:
+                self._connection_error_retries += 1
+
+    @property
+    def counters(self) -> Dict:
+        with self._lock:
+            return {
+                'requests': self._requests,
+                'retries': self._retries,
+                'retries_by_status': dict(self._retries_by_status),
+                'connection_error_retries': self._connection_error_retries,
+                'gave_up': self._gave_up
+            }
+
+    def reset_counters(self):
+        with self._lock:
+            self._requests = 0
+            self._retries = 0
+            self._retries_by_status = Counter()
+            self._connection_error_retries = 0
+            self._gave_up = 0
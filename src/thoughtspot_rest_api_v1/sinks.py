@@ -0,0 +1,254 @@
+#
+# Writing paged data results to CSV or Parquet files as they arrive
+#
+#   The *_batches() methods hold only the page being processed (and the read-ahead page) in memory. A sink
+#   writes each page out as it comes, buffering at most row_group_size rows, so an extract of tens of millions
+#   of rows never needs more memory than a few pages:
+#
+#   with ParquetSink('answer.parquet', row_group_size=100000, compression='zstd') as sink:
+#       sink.write_pages(ts.metadata_answer_data_batches(request=request))
+#
+#   ParquetSink requires the optional pyarrow package: pip install thoughtspot_rest_api_v1[arrow]
+#
+import bz2
+import csv
+import gzip
+import io
+import lzma
+from typing import Optional, Dict, List, Iterable, Union, TextIO
+
+from .columnar import ColumnarConverter, compact_page_columns
+
+try:
+    import pyarrow
+    import pyarrow.parquet
+except ImportError:  # pragma: no cover - optional dependency, see the 'arrow' extra
+    pyarrow = None
+
+DEFAULT_ROW_GROUP_SIZE = 100000
+
+# Compression codecs for CSVSink, each opening a path for writing text
+CSV_COMPRESSION_OPENERS = {
+    'gzip': gzip.open,
+    'bz2': bz2.open,
+    'xz': lzma.open,
+}
+
+
+class DataSink:
+    """
+    Base for the sinks: pages are COMPACT pages from the *_batches() methods, in the V2.0 or V1 form.
+    All pages must have the same columns, so for a Liveboard write each visualization to its own sink.
+    """
+    def __init__(self, row_group_size: int = DEFAULT_ROW_GROUP_SIZE):
+        if row_group_size <= 0:
+            raise ValueError("row_group_size must be a positive number of rows")
+        self.row_group_size = row_group_size
+        self.column_names = None  # type: Optional[List[str]]
+        self.rows_written = 0
+        self.row_groups_written = 0
+
+    def _check_columns(self, column_names: List[str]):
+        if self.column_names is None:
+            self.column_names = list(column_names)
+        elif list(column_names) != self.column_names:
+            raise Exception("Page columns {} do not match the columns already written {}".format(
+                column_names, self.column_names))
+
+    def write_page(self, page: Dict):
+        raise NotImplementedError
+
+    def write_pages(self, pages: Iterable[Dict]) -> int:
+        """
+        Writes every page, returning the total number of rows written so far
+        """
+        for page in pages:
+            self.write_page(page)
+        return self.rows_written
+
+    def flush(self):
+        pass
+
+    def close(self):
+        pass
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_val, exc_tb):
+        self.close()
+
+
+class CSVSink(DataSink):
+    """
+    Writes pages to a CSV file (path or open text file), with a header row of the column names. The file is
+    flushed every row_group_size rows. compression is None, 'gzip', 'bz2' or 'xz' when destination is a path
+    """
+    def __init__(self, destination: Union[str, TextIO], row_group_size: int = DEFAULT_ROW_GROUP_SIZE,
+                 compression: Optional[str] = None, write_header: bool = True, encoding: str = 'utf-8',
+                 **csv_writer_options):
+        super().__init__(row_group_size=row_group_size)
+        self.write_header = write_header
+        if isinstance(destination, str):
+            if compression is None:
+                self._file = open(destination, 'w', encoding=encoding, newline='')
+            elif compression in CSV_COMPRESSION_OPENERS:
+                self._file = CSV_COMPRESSION_OPENERS[compression](destination, 'wt', encoding=encoding, newline='')
+            else:
+                raise ValueError("compression must be one of {}".format(sorted(CSV_COMPRESSION_OPENERS)))
+            self._owns_file = True
+        else:
+            if compression is not None:
+                raise ValueError("compression is only available when destination is a path")
+            self._file = destination
+            self._owns_file = False
+        self._writer = csv.writer(self._file, **csv_writer_options)
+        self._rows_in_group = 0
+
+    def write_page(self, page: Dict):
+        column_names, rows = compact_page_columns(page)
+        if self.column_names is None and self.write_header is True:
+            self._writer.writerow(column_names)
+        self._check_columns(column_names)
+        self._writer.writerows(rows)
+        self.rows_written += len(rows)
+        self._rows_in_group += len(rows)
+        if self._rows_in_group >= self.row_group_size:
+            self.flush()
+
+    def flush(self):
+        self._file.flush()
+        if self._rows_in_group > 0:
+            self.row_groups_written += 1
+            self._rows_in_group = 0
+
+    def close(self):
+        if self._file is None:
+            return
+        self.flush()
+        if self._owns_file:
+            self._file.close()
+        self._file = None
+
+
+class ParquetSink(DataSink):
+    """
+    Writes pages to a Parquet file as row groups of row_group_size rows, converting each page to Arrow with a
+    ColumnarConverter (see column_types there). Only the rows of the row group being filled are buffered.
+    compression is any codec pyarrow supports: 'snappy' (default), 'zstd', 'gzip', 'brotli', 'lz4' or 'none'
+    """
+    def __init__(self, destination: Union[str, io.IOBase], row_group_size: int = DEFAULT_ROW_GROUP_SIZE,
+                 compression: Optional[str] = 'snappy', column_types: Optional[Dict[str, str]] = None,
+                 **parquet_writer_options):
+        if pyarrow is None:
+            raise ImportError("ParquetSink requires the pyarrow package: pip install thoughtspot_rest_api_v1[arrow]")
+        super().__init__(row_group_size=row_group_size)
+        self.destination = destination
+        self.compression = compression
+        self.parquet_writer_options = parquet_writer_options
+        self.converter = ColumnarConverter(column_types=column_types)
+        self._writer = None
+        self._buffered_batches = []
+        self._buffered_rows = 0
+        self._empty_page = None
+
+    @property
+    def schema(self):
+        return self._writer.schema if self._writer is not None else None
+
+    def write_page(self, page: Dict):
+        column_names, rows = compact_page_columns(page)
+        self._check_columns(column_names)
+        # Empty pages would type every column as a string
+        if len(rows) == 0:
+            self._empty_page = page
+            return
+        record_batch = self.converter.to_arrow(page)
+        self._buffered_batches.append(record_batch)
+        self._buffered_rows += record_batch.num_rows
+        while self._buffered_rows >= self.row_group_size:
+            self._write_row_group(self.row_group_size)
+
+    def _open_writer(self, schema):
+        self._writer = pyarrow.parquet.ParquetWriter(self.destination, schema, compression=self.compression,
+                                                     **self.parquet_writer_options)
+
+    def _cast(self, table):
+        # Values that do not fit the file's types (1.5 in an int64 column) raise rather than being truncated
+        try:
+            return table.cast(self._writer.schema, safe=True)
+        except (pyarrow.ArrowInvalid, pyarrow.ArrowNotImplementedError) as e:
+            raise ValueError("A page does not fit the schema of the row groups already written ({}): {}. Set the "
+                             "column_types of the columns, or a larger row_group_size".format(self._writer.schema, e))
+
+    def _write_row_group(self, num_rows: int):
+        if self._writer is None:
+            # The schema of the file is the widest of the pages in the first row group
+            self._open_writer(widen_arrow_schemas([batch.schema for batch in self._buffered_batches]))
+        buffered = pyarrow.concat_tables([self._cast(pyarrow.Table.from_batches([batch]))
+                                          for batch in self._buffered_batches])
+        self._writer.write_table(buffered.slice(0, num_rows), row_group_size=num_rows)
+        remainder = buffered.slice(num_rows)
+        self._buffered_batches = remainder.to_batches()
+        self._buffered_rows = remainder.num_rows
+        self.rows_written += num_rows
+        self.row_groups_written += 1
+
+    def flush(self):
+        # Writes the rows buffered so far as a (shorter) row group
+        if self._buffered_rows > 0:
+            self._write_row_group(self._buffered_rows)
+
+    def close(self):
+        self.flush()
+        if self._writer is None:
+            if self._empty_page is None:
+                return
+            # Every page was empty: still write a file with the columns
+            record_batch = self.converter.to_arrow(self._empty_page)
+            self._open_writer(record_batch.schema)
+        self._writer.close()
+        self._writer = None
+
+
+def _widen_arrow_type(arrow_types: List):
+    arrow_types = [arrow_type for arrow_type in arrow_types if arrow_type != pyarrow.null()]
+    if len(arrow_types) == 0:
+        # Null in every row so far (columns in column_types always have their declared type). The writer's schema
+        # is fixed from the first row group, so the column is opened as a string, which later values can be cast to
+        return pyarrow.string()
+    if all(arrow_type == arrow_types[0] for arrow_type in arrow_types):
+        return arrow_types[0]
+    if all(pyarrow.types.is_integer(t) or pyarrow.types.is_floating(t) for t in arrow_types):
+        return pyarrow.float64()
+    return pyarrow.string()
+
+
+def widen_arrow_schemas(schemas: List):
+    """
+    Schema with the type of each column widened as ColumnarConverter widens inferred types: integers and floats
+    to float64, anything else mixed (or entirely null) to string
+    """
+    fields = [pyarrow.field(field.name, _widen_arrow_type([schema.field(i).type for schema in schemas]))
+              for i, field in enumerate(schemas[0])]
+    return pyarrow.schema(fields)
+
+
+def write_data_pages(pages: Iterable[Dict], destination: Union[str, TextIO, io.IOBase], file_format: str = 'csv',
+                     row_group_size: int = DEFAULT_ROW_GROUP_SIZE, compression: Optional[str] = None,
+                     **sink_options) -> int:
+    """
+    Writes the pages from one of the *_batches() methods to destination as 'csv' or 'parquet',
+    returning the number of rows written
+    """
+    if file_format == 'csv':
+        sink = CSVSink(destination, row_group_size=row_group_size, compression=compression, **sink_options)
+    elif file_format == 'parquet':
+        sink = ParquetSink(destination, row_group_size=row_group_size,
+                           compression=compression if compression is not None else 'snappy', **sink_options)
+    else:
+        raise ValueError("file_format must be 'csv' or 'parquet'")
+    with sink:
+        sink.write_pages(pages)
+    # Closing writes the last, partly filled row group
+    return sink.rows_written
@@ -0,0 +1,39 @@
+#
+# Helpers for the *_stream() and *_to_file() export methods of TSRestApiV1 / TSRestApiV2
+#
+#   The response is read in chunks of chunk_size bytes as it arrives, so memory use stays flat
+#   no matter how large the exported PDF / XLSX / CSV file is
+#
+from typing import Iterator, Union, BinaryIO
+
+import requests
+
+DEFAULT_CHUNK_SIZE = 1024 * 1024
+
+Destination = Union[str, BinaryIO]
+
+
+# Yields the body of a response opened with stream=True, closing it (returning the connection to the pool)
+# once fully read or when the caller stops iterating
+def iter_response_content(response: requests.Response, chunk_size: int = DEFAULT_CHUNK_SIZE) -> Iterator[bytes]:
+    try:
+        for chunk in response.iter_content(chunk_size=chunk_size):
+            if chunk:
+                yield chunk
+    finally:
+        response.close()
+
+
+# Writes chunks to a file path or to an already open binary file object, returning the number of bytes written
+def write_chunks(chunks: Iterator[bytes], destination: Destination) -> int:
+    bytes_written = 0
+    if isinstance(destination, str):
+        with open(destination, 'wb') as fh:
+            for chunk in chunks:
+                fh.write(chunk)
+                bytes_written += len(chunk)
+    else:
+        for chunk in chunks:
+            destination.write(chunk)
+            bytes_written += len(chunk)
+    return bytes_written
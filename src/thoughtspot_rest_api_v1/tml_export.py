@@ -0,0 +1,294 @@
+#
+# Exporting the TML of many objects at once
+#
+#   metadata_tml_export() one GUID at a time spends almost all of its time waiting on round-trips.
+#   BulkTMLExporter sends the GUIDs batch_size at a time, with max_workers requests in flight, and yields each
+#   object's TML as its request completes:
+#
+#   search_request = {'metadata': [{'type': 'LIVEBOARD'}]}
+#   for guid, edoc, error in ts.metadata_tml_export_bulk(metadata_search_request=search_request, max_workers=8):
+#       ...
+#
+#   A request that fails as a whole (an invalid GUID can fail every object in it, a large batch can time out) is
+#   split in half and both halves sent again, down to single objects, so only the objects that really cannot be
+#   exported are reported as failed.
+#
+import json
+import os
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor, wait, FIRST_COMPLETED
+from typing import Callable, Dict, List, Optional, Iterable, Iterator, Tuple
+
+import requests
+
+DEFAULT_TML_EXPORT_BATCH_SIZE = 20
+
+# (guid, edoc, None) for an exported object, (guid, None, exception) for one that failed
+TMLExportResult = Tuple[str, Optional[str], Optional[Exception]]
+
+
+class TMLExportError(Exception):
+    """
+    An object the TML export response reported as an error, with the response's 'info' for it
+    """
+    def __init__(self, guid: str, message: str, info: Optional[Dict] = None):
+        super().__init__("TML export of {} failed: {}".format(guid, message))
+        self.guid = guid
+        self.info = info
+
+
+def _object_status(exported_object: Dict) -> Dict:
+    # V2.0 and V1 give the status in 'info', some V1 versions in 'response'
+    for section in ('info', 'response'):
+        if section in exported_object and 'status' in exported_object[section]:
+            return exported_object[section]['status']
+    return {}
+
+
+def _object_guid(exported_object: Dict) -> Optional[str]:
+    info = exported_object.get('info', {})
+    return info.get('id')
+
+
+def match_exported_objects(guids: List[str], exported_objects: List[Dict]) -> Iterator[TMLExportResult]:
+    """
+    Pairs each requested GUID with its object from an export response (export_associated=False), by the id in
+    its 'info', or by position when the response has no ids
+    """
+    if not isinstance(exported_objects, list):
+        exported_objects = []
+    by_guid = {}
+    for exported_object in exported_objects:
+        guid = _object_guid(exported_object)
+        if guid is not None:
+            by_guid[guid] = exported_object
+    for position, guid in enumerate(guids):
+        exported_object = by_guid.get(guid)
+        if exported_object is None and len(by_guid) == 0 and len(exported_objects) == len(guids):
+            exported_object = exported_objects[position]
+        if exported_object is None:
+            yield guid, None, TMLExportError(guid, "not in the export response")
+            continue
+        status = _object_status(exported_object)
+        if status.get('status_code') == 'ERROR':
+            yield guid, None, TMLExportError(guid, status.get('error_message', 'ERROR'), exported_object.get('info'))
+            continue
+        yield guid, exported_object.get('edoc'), None
+
+
+class BulkTMLExporter:
+    """
+    Exports GUIDs in requests of batch_size objects on max_workers threads. export_objects(guids) sends one
+    request and returns the list of exported objects ({'info': ..., 'edoc': ...}) in the response.
+
+    A request that fails with any requests exception other than 401 / 403 is split in half and retried, so
+    one bad GUID costs a few extra requests rather than its whole batch. requests_sent and batches_split
+    count what happened, for tuning batch_size.
+    """
+    NOT_SPLIT_STATUSES = (401, 403)
+
+    def __init__(self, export_objects: Callable[[List[str]], List[Dict]],
+                 batch_size: int = DEFAULT_TML_EXPORT_BATCH_SIZE, max_workers: int = 4):
+        if batch_size <= 0:
+            raise ValueError("batch_size must be a positive number of objects per request")
+        self.export_objects = export_objects
+        self.batch_size = batch_size
+        self.max_workers = max_workers
+        self.requests_sent = 0
+        self.batches_split = 0
+
+    def _should_split(self, batch: List[str], error: Exception) -> bool:
+        if len(batch) <= 1 or not isinstance(error, requests.exceptions.RequestException):
+            return False
+        response = getattr(error, 'response', None)
+        return response is None or response.status_code not in self.NOT_SPLIT_STATUSES
+
+    def _batches(self, guids: Iterable[str]) -> Iterator[List[str]]:
+        seen = set()
+        batch = []
+        for guid in guids:
+            if guid in seen:
+                continue
+            seen.add(guid)
+            batch.append(guid)
+            if len(batch) == self.batch_size:
+                yield batch
+                batch = []
+        if len(batch) > 0:
+            yield batch
+
+    def export(self, guids: Iterable[str]) -> Iterator[TMLExportResult]:
+        """
+        Yields (guid, edoc, error) for every GUID, in the order the requests complete. guids can be a generator
+        (of metadata_search_iter() results, say): it is read only as requests are sent
+        """
+        batches = self._batches(guids)
+        # Batches split after failing are sent before any new ones
+        retry_batches = deque()
+        executor = ThreadPoolExecutor(max_workers=self.max_workers, thread_name_prefix='ts-tml-export')
+        in_flight = {}
+        try:
+            while True:
+                while len(in_flight) < self.max_workers:
+                    if len(retry_batches) > 0:
+                        batch = retry_batches.popleft()
+                    else:
+                        batch = next(batches, None)
+                        if batch is None:
+                            break
+                    in_flight[executor.submit(self.export_objects, batch)] = batch
+                    self.requests_sent += 1
+                if len(in_flight) == 0:
+                    return
+
+                done, _ = wait(in_flight, return_when=FIRST_COMPLETED)
+                for future in done:
+                    batch = in_flight.pop(future)
+                    error = future.exception()
+                    if error is None:
+                        for result in match_exported_objects(batch, future.result()):
+                            yield result
+                    elif self._should_split(batch, error):
+                        self.batches_split += 1
+                        middle = len(batch) // 2
+                        retry_batches.append(batch[:middle])
+                        retry_batches.append(batch[middle:])
+                    else:
+                        for guid in batch:
+                            yield guid, None, error
+        finally:
+            for future in in_flight:
+                future.cancel()
+            executor.shutdown(wait=False)
+
+
+#
+# Resumable export through the V2.0 /metadata/tml/export/batch endpoint
+#
+#   The batch endpoint pages through every object of a type by batch_offset / batch_size. TMLExportBatchJob
+#   requests max_workers batches at once and records each batch in a journal file (JSON Lines) once the caller
+#   has handled it. Run again with the same journal, the job skips the batches already recorded, so an
+#   interrupted export carries on where it stopped:
+#
+#   job = ts.metadata_tml_export_batch_job(request={'metadata_type': 'USER'}, journal_path='users_export.jsonl')
+#   for batch_offset, exported_objects in job.batches():
+#       ...
+#
+class TMLExportBatchJob:
+    """
+    Drives export_batch(request) (a copy of request with 'batch_offset' and 'batch_size' set, returning the list of
+    exported objects) from batch_offset 0 until a batch comes back shorter than batch_size.
+
+    Batches are yielded in the order they complete, and each is recorded in the journal when the caller asks for
+    the next one, so a batch is only skipped on resume once it has been handled. complete is True once every
+    batch has been recorded.
+    """
+    def __init__(self, export_batch: Callable[[Dict], List[Dict]], request: Dict, journal_path: str,
+                 batch_size: int = DEFAULT_TML_EXPORT_BATCH_SIZE, max_workers: int = 4):
+        if batch_size <= 0:
+            raise ValueError("batch_size must be a positive number of objects per batch")
+        self.export_batch = export_batch
+        self.request = request
+        self.journal_path = journal_path
+        self.batch_size = batch_size
+        self.max_workers = max_workers
+
+        self.completed_offsets = set()
+        # Offset of the first object past the end, once a short batch has shown where the end is
+        self.end_offset = None  # type: Optional[int]
+        self._load_journal()
+
+    @property
+    def complete(self) -> bool:
+        if self.end_offset is None:
+            return False
+        return all(offset in self.completed_offsets for offset in range(0, self.end_offset, self.batch_size))
+
+    def _job_description(self) -> Dict:
+        return {'request': self.request, 'batch_size': self.batch_size}
+
+    def _load_journal(self):
+        if not os.path.exists(self.journal_path):
+            with open(self.journal_path, 'w', encoding='utf-8') as fh:
+                fh.write(json.dumps({'job': self._job_description()}) + '\n')
+            return
+        with open(self.journal_path, 'r', encoding='utf-8') as fh:
+            for line_number, line in enumerate(fh):
+                if not line.strip():
+                    continue
+                try:
+                    entry = json.loads(line)
+                except ValueError:
+                    # A line cut short when the process stopped mid-write: that batch was not recorded
+                    continue
+                if line_number == 0:
+                    if entry.get('job') != json.loads(json.dumps(self._job_description())):
+                        raise Exception("Journal {} belongs to a different export (request or batch_size differ)"
+                                        .format(self.journal_path))
+                    continue
+                self._record(entry['batch_offset'], entry['count'])
+
+    def _record(self, batch_offset: int, count: int):
+        self.completed_offsets.add(batch_offset)
+        if count < self.batch_size:
+            end_offset = batch_offset + count
+            if self.end_offset is None or end_offset < self.end_offset:
+                self.end_offset = end_offset
+
+    def _write_journal(self, batch_offset: int, count: int):
+        with open(self.journal_path, 'a', encoding='utf-8') as fh:
+            fh.write(json.dumps({'batch_offset': batch_offset, 'count': count}) + '\n')
+            fh.flush()
+            os.fsync(fh.fileno())
+        self._record(batch_offset, count)
+
+    def _fetch(self, batch_offset: int) -> List[Dict]:
+        batch_request = dict(self.request)
+        batch_request['batch_offset'] = batch_offset
+        batch_request['batch_size'] = self.batch_size
+        exported_objects = self.export_batch(batch_request)
+        # An empty response body comes back as True from post_request()
+        return exported_objects if isinstance(exported_objects, list) else []
+
+    def _pending_offsets(self) -> Iterator[int]:
+        batch_offset = 0
+        while self.end_offset is None or batch_offset < self.end_offset:
+            if batch_offset not in self.completed_offsets:
+                yield batch_offset
+            batch_offset += self.batch_size
+
+    def batches(self) -> Iterator[Tuple[int, List[Dict]]]:
+        """
+        Yields (batch_offset, exported_objects) for every batch not yet in the journal
+        """
+        offsets = self._pending_offsets()
+        executor = ThreadPoolExecutor(max_workers=self.max_workers, thread_name_prefix='ts-tml-export-batch')
+        in_flight = {}
+        try:
+            while True:
+                while len(in_flight) < self.max_workers:
+                    batch_offset = next(offsets, None)
+                    if batch_offset is None:
+                        break
+                    in_flight[executor.submit(self._fetch, batch_offset)] = batch_offset
+                if len(in_flight) == 0:
+                    return
+
+                done, _ = wait(in_flight, return_when=FIRST_COMPLETED)
+                for future in sorted(done, key=lambda f: in_flight[f]):
+                    batch_offset = in_flight.pop(future)
+                    # Batches requested past the end, before the end was known, come back empty
+                    if self.end_offset is not None and batch_offset >= self.end_offset:
+                        continue
+                    exported_objects = future.result()
+                    if len(exported_objects) > 0:
+                        yield batch_offset, exported_objects
+                    self._write_journal(batch_offset, len(exported_objects))
+        finally:
+            for future in in_flight:
+                future.cancel()
+            executor.shutdown(wait=False)
+
+    def run(self, callback: Callable[[int, List[Dict]], None]):
+        for batch_offset, exported_objects in self.batches():
+            callback(batch_offset, exported_objects)
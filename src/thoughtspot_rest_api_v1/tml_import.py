@@ -0,0 +1,655 @@
+#
+# Importing many TML documents in dependency order
+#
+#   A single metadata_tml_import() of hundreds of documents can time out, and with ALL_OR_NONE one Liveboard
+#   whose Worksheet has not been created yet fails the whole request. WaveTMLImporter reads the references of
+#   each document (the 'tables' of Worksheets, Views, Answers and the visualizations of Liveboards...)
+#   and imports in waves: Tables first, then the Worksheets / Views built on them, then Answers, then Liveboards.
+#   The documents of a wave do not depend on each other, so they are sent as chunks of chunk_size documents on
+#   max_workers threads. The GUIDs each wave creates are written into the 'fqn' of the references to them in
+#   later waves, so new objects are connected to each other rather than to existing objects with the same name:
+#
+#   results = ts.metadata_tml_import_waves(tml_strings, create_new=True, chunk_size=10, max_workers=4)
+#
+import asyncio
+import copy
+import json
+import re
+import threading
+import time
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor, Future, as_completed, wait
+from typing import Callable, Dict, List, Optional, Iterable, Iterator, Tuple, Union, Any
+
+import yaml
+
+DEFAULT_TML_IMPORT_CHUNK_SIZE = 10
+
+# Keys under which a TML document refers to other objects, each as {'name': ..., 'fqn': <GUID>} ('id' in Answers
+# is the local name used within the document, not a GUID)
+TML_REFERENCE_KEYS = ('tables', 'model_tables', 'connection')
+
+# Earliest wave for each type, so that the waves follow table -> worksheet / view -> answer -> liveboard even where
+# the references do not say so (Liveboard visualizations refer to Worksheets, not to the Answers of the set)
+TML_TYPE_FIRST_WAVE = {
+    'connection': 0,
+    'table': 0,
+    'sql_view': 1,
+    'view': 1,
+    'worksheet': 1,
+    'model': 1,
+    'answer': 2,
+    'liveboard': 3,
+    'pinboard': 3,
+}
+
+# Types a 'tables' / 'model_tables' reference can be to
+TML_DATA_SOURCE_TYPES = ('table', 'sql_view', 'view', 'worksheet', 'model')
+
+TMLDocumentSource = Union[str, Dict]
+
+
+class TMLLoader(yaml.SafeLoader):
+    """
+    SafeLoader resolving plain scalars as YAML 1.2 / JSON would: only true / false are booleans, and dates stay
+    strings. With the YAML 1.1 rules of SafeLoader, an unquoted 2024-01-31 becomes a datetime.date (which
+    json.dumps cannot write), yes / no / on / off become booleans, and 0123 an octal number, all of which would
+    change the TML sent back in the import
+    """
+    yaml_implicit_resolvers = {}
+
+
+TMLLoader.add_implicit_resolver('tag:yaml.org,2002:null', re.compile(r'^(?:~|null|Null|NULL|)$'), ['~', 'n', 'N', ''])
+TMLLoader.add_implicit_resolver('tag:yaml.org,2002:bool', re.compile(r'^(?:true|True|TRUE|false|False|FALSE)$'),
+                                list('tTfF'))
+TMLLoader.add_implicit_resolver('tag:yaml.org,2002:int', re.compile(r'^[-+]?[0-9]+$'), list('-+0123456789'))
+TMLLoader.add_implicit_resolver('tag:yaml.org,2002:float', re.compile(
+    r'^(?:[-+]?(?:\.[0-9]+|[0-9]+(?:\.[0-9]*)?)(?:[eE][-+]?[0-9]+)?|[-+]?\.(?:inf|Inf|INF)|\.(?:nan|NaN|NAN))$'),
+    list('-+0123456789.'))
+TMLLoader.add_implicit_resolver('tag:yaml.org,2002:merge', re.compile(r'^(?:<<)$'), ['<'])
+# Always base 10: a leading 0 is not octal
+TMLLoader.add_constructor('tag:yaml.org,2002:int', lambda loader, node: int(loader.construct_scalar(node), 10))
+
+
+class TMLDocument:
+    """
+    One TML document to import: the parsed TML, its type (the top-level key: table, worksheet, answer...),
+    its guid and name if it has them, and the references found within it as (key, reference dict). plan_tml_waves()
+    sets reference_targets: the index of the document each reference is to, or None for objects outside the set
+    """
+    def __init__(self, index: int, source: TMLDocumentSource):
+        self.index = index
+        self.source = source
+        if isinstance(source, str):
+            # YAML is a superset of JSON, so this reads either form of TML
+            self.tml = yaml.load(source, Loader=TMLLoader)
+        else:
+            # References are updated in place, so work on a copy rather than the caller's dict
+            self.tml = copy.deepcopy(source)
+        self.guid = self.tml.get('guid')
+        self.tml_type = next((key for key in self.tml if key != 'guid'), None)
+        body = self.tml.get(self.tml_type, {}) if self.tml_type is not None else {}
+        self.name = body.get('name') if isinstance(body, dict) else None
+        self.references = list(find_tml_references(body))
+        self.reference_targets = [None] * len(self.references)  # type: List[Optional[int]]
+        self.dependencies = set()  # indexes of the documents this one refers to
+        self.wave = 0
+        self.modified = False
+
+    # new_guids holds the GUID each imported document (by index) was given
+    def set_reference_guids(self, new_guids: Dict[int, str]):
+        for (key, reference), target in zip(self.references, self.reference_targets):
+            new_guid = new_guids.get(target) if target is not None else None
+            if new_guid is not None and reference.get('fqn') != new_guid:
+                reference['fqn'] = new_guid
+                self.modified = True
+
+    # The document as sent in the import request: as given, unless references have been updated
+    def to_import_string(self) -> str:
+        if isinstance(self.source, str) and self.modified is False:
+            return self.source
+        return json.dumps(self.tml)
+
+
+def find_tml_references(node: Any) -> Iterable[Tuple[str, Dict]]:
+    if isinstance(node, dict):
+        for key, value in node.items():
+            if key in TML_REFERENCE_KEYS:
+                candidates = value if isinstance(value, list) else [value]
+                for candidate in candidates:
+                    if isinstance(candidate, dict) and ('name' in candidate or 'fqn' in candidate):
+                        yield key, candidate
+            if isinstance(value, (dict, list)):
+                for reference in find_tml_references(value):
+                    yield reference
+    elif isinstance(node, list):
+        for item in node:
+            for reference in find_tml_references(item):
+                yield reference
+
+
+def _reference_target(document: TMLDocument, key: str, reference: Dict, by_guid: Dict[str, TMLDocument],
+                      by_type_name: Dict[Tuple[str, str], TMLDocument]) -> Optional[TMLDocument]:
+    if 'fqn' in reference:
+        return by_guid.get(reference['fqn'])
+    name = reference.get('name')
+    if key == 'connection':
+        return by_type_name.get(('connection', name))
+    # A Table and a Worksheet can share a name: prefer the data source types that come before the referring
+    # document's own type (the latest of them first), then the others
+    own_wave = TML_TYPE_FIRST_WAVE.get(document.tml_type, 0)
+    candidates = [by_type_name[(tml_type, name)] for tml_type in TML_DATA_SOURCE_TYPES
+                  if (tml_type, name) in by_type_name and by_type_name[(tml_type, name)] is not document]
+    if len(candidates) == 0:
+        return None
+    return min(candidates, key=lambda candidate: (TML_TYPE_FIRST_WAVE[candidate.tml_type] >= own_wave,
+                                                  -TML_TYPE_FIRST_WAVE[candidate.tml_type], candidate.index))
+
+
+def plan_tml_waves(documents: List[TMLDocument]) -> List[List[TMLDocument]]:
+    """
+    Sets the reference targets, dependencies and wave of each document, returning the documents grouped by wave.
+    A reference is to another document of the set when its fqn is that document's guid, or, without an fqn, when
+    the name and type match (see _reference_target()). A document's wave is one past the latest wave of anything
+    it refers to, and no earlier than TML_TYPE_FIRST_WAVE for its type. Waves with no documents are left out
+    """
+    by_guid = {document.guid: document for document in documents if document.guid is not None}
+    by_type_name = OrderedDict()
+    for document in documents:
+        if document.name is not None:
+            by_type_name.setdefault((document.tml_type, document.name), document)
+
+    for document in documents:
+        for position, (key, reference) in enumerate(document.references):
+            target = _reference_target(document, key, reference, by_guid, by_type_name)
+            if target is not None and target is not document:
+                document.reference_targets[position] = target.index
+                document.dependencies.add(target.index)
+
+    by_index = {document.index: document for document in documents}
+    resolved = {}
+
+    def resolve_wave(document: TMLDocument, visiting: set) -> int:
+        if document.index in resolved:
+            return resolved[document.index]
+        # A reference cycle cannot be ordered: the edge that closes it is ignored
+        visiting.add(document.index)
+        wave = TML_TYPE_FIRST_WAVE.get(document.tml_type, 0)
+        for dependency in document.dependencies:
+            if dependency not in visiting:
+                wave = max(wave, resolve_wave(by_index[dependency], visiting) + 1)
+        visiting.discard(document.index)
+        resolved[document.index] = wave
+        return wave
+
+    waves = OrderedDict()
+    for document in documents:
+        document.wave = resolve_wave(document, set())
+    for document in sorted(documents, key=lambda d: (d.wave, d.index)):
+        waves.setdefault(document.wave, []).append(document)
+    return list(waves.values())
+
+
+# Each imported object in a response is {'response': {'status': {...}, 'header': {'id_guid': ...}}}
+def imported_object_result(imported_object: Dict) -> Dict:
+    response = imported_object.get('response', imported_object)
+    status = response.get('status', {})
+    header = response.get('header', {})
+    return {
+        'status_code': status.get('status_code'),
+        'error_message': status.get('error_message'),
+        'guid': header.get('id_guid'),
+    }
+
+
+class WaveTMLImporter:
+    """
+    Imports TML documents (YAML / JSON strings, or parsed dicts) in dependency waves. import_chunk(tml_strings)
+    sends one import request and returns the list of imported objects in the response, in the order sent.
+
+    import_documents() returns one result per document, in the order given: the document's 'name', 'type',
+    original 'guid' and 'wave', and the 'status_code', 'error_message' and new 'guid' from the import
+    ('new_guid'). With skip_dependents_of_failed=True, documents that refer to one that failed are not sent
+    and get status_code 'SKIPPED'.
+    """
+    def __init__(self, import_chunk: Callable[[List[str]], List[Dict]],
+                 chunk_size: int = DEFAULT_TML_IMPORT_CHUNK_SIZE, max_workers: int = 4,
+                 skip_dependents_of_failed: bool = True):
+        if chunk_size <= 0:
+            raise ValueError("chunk_size must be a positive number of documents per request")
+        self.import_chunk = import_chunk
+        self.chunk_size = chunk_size
+        self.max_workers = max_workers
+        self.skip_dependents_of_failed = skip_dependents_of_failed
+        self.waves = []  # type: List[List[TMLDocument]]
+
+    def _import_chunk_results(self, chunk: List[TMLDocument]) -> List[Dict]:
+        try:
+            imported_objects = self.import_chunk([document.to_import_string() for document in chunk])
+        except Exception as e:
+            return [{'status_code': 'ERROR', 'error_message': str(e), 'guid': None} for _ in chunk]
+        results = [imported_object_result(imported_object) for imported_object in imported_objects]
+        if len(results) != len(chunk):
+            return [{'status_code': 'ERROR', 'guid': None,
+                     'error_message': 'Import response has {} objects for {} documents'.format(len(results),
+                                                                                             len(chunk))}
+                    for _ in chunk]
+        return results
+
+    def import_documents(self, tml_documents: Iterable[TMLDocumentSource]) -> List[Dict]:
+        documents = [TMLDocument(index, source) for index, source in enumerate(tml_documents)]
+        self.waves = plan_tml_waves(documents)
+
+        results = {}
+        failed = set()
+        new_guids = {}
+        with ThreadPoolExecutor(max_workers=self.max_workers, thread_name_prefix='ts-tml-import') as executor:
+            for wave in self.waves:
+                to_send = []
+                for document in wave:
+                    if self.skip_dependents_of_failed and len(document.dependencies & failed) > 0:
+                        failed.add(document.index)
+                        results[document.index] = {'status_code': 'SKIPPED', 'guid': None,
+                                                   'error_message': 'A document it depends on failed to import'}
+                        continue
+                    document.set_reference_guids(new_guids)
+                    to_send.append(document)
+
+                chunks = [to_send[i:i + self.chunk_size] for i in range(0, len(to_send), self.chunk_size)]
+                for chunk, chunk_results in zip(chunks, executor.map(self._import_chunk_results, chunks)):
+                    for document, result in zip(chunk, chunk_results):
+                        results[document.index] = result
+                        if result['status_code'] not in ('OK', 'WARNING') or result['guid'] is None:
+                            failed.add(document.index)
+                            continue
+                        # Feed the new GUID forward to the references of the following waves
+                        new_guids[document.index] = result['guid']
+
+        return [{
+            'name': document.name,
+            'type': document.tml_type,
+            'guid': document.guid,
+            'wave': document.wave,
+            'status_code': results[document.index]['status_code'],
+            'error_message': results[document.index]['error_message'],
+            'new_guid': results[document.index]['guid'],
+        } for document in documents]
+
+
+#
+# Managing many /metadata/tml/async/import tasks
+#
+#   Each async import returns a task_id straight away, and the import runs in the server's queue.
+#   TMLImportJobManager submits any number of imports, then checks on all of the unfinished tasks with a single
+#   metadata_tml_async_status() call per poll. Polls start poll_interval_sec apart, and the interval grows by
+#   backoff_factor (up to max_poll_interval_sec) for as long as nothing finishes, returning to poll_interval_sec
+#   when a task finishes or a new one is submitted. A submit() can bring the next poll forward but never puts it
+#   off, so a steady stream of submits still has the status polled. After max_poll_failures status calls in a
+#   row fail, every unfinished future fails with the last error. Each submit() returns a Future for the task's
+#   status:
+#
+#   with ts.metadata_tml_async_import_manager() as manager:
+#       futures = [manager.submit(metadata_tmls=chunk, import_policy='ALL_OR_NONE') for chunk in chunks]
+#       for future in manager.as_completed():
+#           print(future.task_id, future.result()['task_status'])
+#
+TML_IMPORT_TASK_COMPLETED_STATUSES = ('COMPLETED',)
+TML_IMPORT_TASK_FAILED_STATUSES = ('FAILED',)
+
+
+class TMLImportTaskError(Exception):
+    """
+    An async TML import task that finished with a failed status, with the task's entry from the status response
+    """
+    def __init__(self, task_id: str, task_status: Dict):
+        super().__init__("TML import task {} ended with status {}".format(task_id, task_status.get('task_status')))
+        self.task_id = task_id
+        self.task_status = task_status
+
+
+def tml_import_task_statuses(status_response: Union[Dict, List]) -> List[Dict]:
+    # The task entries are under 'status_list', or the response may be the list itself
+    if isinstance(status_response, list):
+        return status_response
+    if isinstance(status_response, dict):
+        return status_response.get('status_list', [])
+    return []
+
+
+def tml_import_task_id(import_response: Dict) -> str:
+    task_id = import_response.get('task_id') if isinstance(import_response, dict) else None
+    if task_id is None:
+        raise Exception("No task_id in the async TML import response: {}".format(import_response))
+    return task_id
+
+
+class AdaptivePollInterval:
+    """
+    Seconds to wait before the next poll: reset() to min_interval after progress, grow() by factor otherwise
+    """
+    def __init__(self, min_interval: float, max_interval: float, factor: float):
+        self.min_interval = min_interval
+        self.max_interval = max_interval
+        self.factor = factor
+        self.interval = min_interval
+
+    def reset(self):
+        self.interval = self.min_interval
+
+    def grow(self):
+        self.interval = min(self.max_interval, self.interval * self.factor)
+
+
+def _resolve_future(future, result=None, exception: Optional[Exception] = None):
+    # A future the caller has cancelled is left as it is
+    if future.done():
+        return
+    if exception is not None:
+        future.set_exception(exception)
+    else:
+        future.set_result(result)
+
+
+class _TMLImportTaskTracker:
+    # Shared by the threaded and asyncio managers: the unfinished tasks, what each status entry means for them,
+    # and when the next poll is due (a time.monotonic() value, None while there is nothing to poll)
+    def __init__(self, poll_interval_sec: float, max_poll_interval_sec: float, backoff_factor: float,
+                 include_import_response: bool, status_page_size: int, max_poll_failures: int):
+        if max_poll_failures <= 0:
+            raise ValueError("max_poll_failures must be a positive number of status calls")
+        self.poll_interval = AdaptivePollInterval(poll_interval_sec, max_poll_interval_sec, backoff_factor)
+        self.include_import_response = include_import_response
+        self.status_page_size = status_page_size
+        self.max_poll_failures = max_poll_failures
+        self.pending = OrderedDict()  # task_id: future
+        self.status_calls = 0
+        self.poll_failures = 0
+        self.last_poll_error = None  # type: Optional[Exception]
+        self.next_poll_time = None  # type: Optional[float]
+
+    def submitted(self, task_id: str, future):
+        self.pending[task_id] = future
+        self.poll_interval.reset()
+        # Brings the next poll forward to the reset interval, but never later than it already was
+        due = time.monotonic() + self.poll_interval.interval
+        if self.next_poll_time is None or due < self.next_poll_time:
+            self.next_poll_time = due
+
+    def seconds_to_next_poll(self) -> float:
+        if self.next_poll_time is None:
+            return 0
+        return self.next_poll_time - time.monotonic()
+
+    def polled(self, finished: bool, error: Optional[Exception] = None):
+        if error is None:
+            self.poll_failures = 0
+            self.last_poll_error = None
+        else:
+            self.poll_failures += 1
+            self.last_poll_error = error
+            if self.poll_failures >= self.max_poll_failures:
+                # Status polling is not recovering (expired token, server down): stop waiting on the server
+                for future in self.pending.values():
+                    _resolve_future(future, exception=error)
+                self.pending.clear()
+                self.poll_failures = 0
+        if finished:
+            self.poll_interval.reset()
+        else:
+            self.poll_interval.grow()
+        self.next_poll_time = time.monotonic() + self.poll_interval.interval if len(self.pending) > 0 else None
+
+    def status_request(self, task_ids: List[str], record_offset: int) -> Dict:
+        return {
+            'task_ids': task_ids,
+            'include_import_response': self.include_import_response,
+            'record_offset': record_offset,
+            'record_size': self.status_page_size
+        }
+
+    @staticmethod
+    def is_last_page(status_response, entries: List[Dict], page_size: int) -> bool:
+        if isinstance(status_response, dict) and 'last_batch' in status_response:
+            return status_response['last_batch'] is True
+        return len(entries) < page_size
+
+    # Resolves the futures of the finished tasks, returning True if any finished
+    def apply(self, entries: List[Dict]) -> bool:
+        finished = False
+        for entry in entries:
+            task_id = entry.get('task_id')
+            status = entry.get('task_status')
+            if task_id not in self.pending:
+                continue
+            if status in TML_IMPORT_TASK_COMPLETED_STATUSES:
+                _resolve_future(self.pending.pop(task_id), result=entry)
+                finished = True
+            elif status in TML_IMPORT_TASK_FAILED_STATUSES:
+                _resolve_future(self.pending.pop(task_id), exception=TMLImportTaskError(task_id, entry))
+                finished = True
+        return finished
+
+
+class TMLImportJobManager:
+    """
+    Submits async TML imports through a TSRestApiV2 object and polls their status on a background thread.
+    submit() returns a concurrent.futures.Future (with a task_id attribute) that resolves to the task's entry
+    from the status response (including its 'import_response'), or raises TMLImportTaskError if the task failed.
+
+    A failed status call is retried at the next poll, with the interval growing as when nothing has finished.
+    After max_poll_failures failed calls in a row, the futures of all unfinished tasks fail with the last error,
+    so wait() and leaving a with block do not hang on a server that cannot be reached. last_poll_error holds the
+    exception of a failed call, and status_calls counts the calls made.
+    """
+    def __init__(self, ts, poll_interval_sec: float = 1.0, max_poll_interval_sec: float = 30.0,
+                 backoff_factor: float = 2.0, include_import_response: bool = True, status_page_size: int = 100,
+                 max_poll_failures: int = 5):
+        self.ts = ts
+        self._tracker = _TMLImportTaskTracker(poll_interval_sec, max_poll_interval_sec, backoff_factor,
+                                              include_import_response, status_page_size, max_poll_failures)
+        self._lock = threading.Lock()
+        self._wake = threading.Event()
+        self._closed = False
+        self._futures = []  # type: List[Future]
+        self._poller = threading.Thread(target=self._poll_loop, daemon=True, name='ts-tml-import-poller')
+        self._poller.start()
+
+    @property
+    def status_calls(self) -> int:
+        return self._tracker.status_calls
+
+    @property
+    def last_poll_error(self) -> Optional[Exception]:
+        return self._tracker.last_poll_error
+
+    @property
+    def pending_task_ids(self) -> List[str]:
+        with self._lock:
+            return list(self._tracker.pending.keys())
+
+    def submit(self, metadata_tmls: List[str], import_policy: str = 'PARTIAL', create_new: bool = False,
+               all_orgs_context: bool = False, skip_cdw_validation_for_tables: bool = False) -> Future:
+        if self._closed:
+            raise Exception("TMLImportJobManager has been closed")
+        import_response = self.ts.metadata_tml_async_import(
+            metadata_tmls=metadata_tmls, import_policy=import_policy, create_new=create_new,
+            all_orgs_context=all_orgs_context, skip_cdw_validation_for_tables=skip_cdw_validation_for_tables
+        )
+        future = Future()
+        future.task_id = tml_import_task_id(import_response)
+        future.set_running_or_notify_cancel()
+        with self._lock:
+            self._tracker.submitted(future.task_id, future)
+            self._futures.append(future)
+        self._wake.set()
+        return future
+
+    def _poll_once(self) -> bool:
+        with self._lock:
+            task_ids = list(self._tracker.pending.keys())
+        record_offset = 0
+        finished = False
+        while True:
+            status_response = self.ts.metadata_tml_async_status(
+                request=self._tracker.status_request(task_ids, record_offset))
+            entries = tml_import_task_statuses(status_response)
+            with self._lock:
+                self._tracker.status_calls += 1
+                finished = self._tracker.apply(entries) or finished
+            if self._tracker.is_last_page(status_response, entries, self._tracker.status_page_size):
+                return finished
+            record_offset += self._tracker.status_page_size
+
+    def _poll_loop(self):
+        while not self._closed:
+            with self._lock:
+                has_pending = len(self._tracker.pending) > 0
+                delay = self._tracker.seconds_to_next_poll()
+            if not has_pending:
+                # Nothing to poll until the next submit()
+                self._wake.wait()
+                self._wake.clear()
+                continue
+            if delay > 0:
+                # A submit() while waiting may have brought the next poll forward
+                if self._wake.wait(timeout=delay):
+                    self._wake.clear()
+                continue
+            error = None
+            finished = False
+            try:
+                finished = self._poll_once()
+            except Exception as e:
+                error = e
+            with self._lock:
+                self._tracker.polled(finished, error)
+
+    def as_completed(self, timeout: Optional[float] = None) -> Iterator[Future]:
+        """
+        Yields the futures of every task submitted so far as they finish
+        """
+        with self._lock:
+            futures = list(self._futures)
+        return as_completed(futures, timeout=timeout)
+
+    def wait(self, timeout: Optional[float] = None):
+        with self._lock:
+            futures = list(self._futures)
+        wait(futures, timeout=timeout)
+
+    def close(self):
+        # Stops polling: the futures of tasks still running on the server are cancelled
+        self._closed = True
+        self._wake.set()
+        with self._lock:
+            for future in self._tracker.pending.values():
+                future.cancel()
+            self._tracker.pending.clear()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_val, exc_tb):
+        if exc_type is None:
+            self.wait()
+        self.close()
+
+
+class AsyncTMLImportJobManager:
+    """
+    asyncio version of TMLImportJobManager for an AsyncTSRestApiV2 object: submit() is awaited and returns an
+    asyncio.Future, and polling runs as a task on the event loop
+    """
+    def __init__(self, ts, poll_interval_sec: float = 1.0, max_poll_interval_sec: float = 30.0,
+                 backoff_factor: float = 2.0, include_import_response: bool = True, status_page_size: int = 100,
+                 max_poll_failures: int = 5):
+        self.ts = ts
+        self._tracker = _TMLImportTaskTracker(poll_interval_sec, max_poll_interval_sec, backoff_factor,
+                                              include_import_response, status_page_size, max_poll_failures)
+        self._futures = []
+        self._wake = None  # type: Optional[asyncio.Event]
+        self._poller = None  # type: Optional[asyncio.Task]
+
+    @property
+    def status_calls(self) -> int:
+        return self._tracker.status_calls
+
+    @property
+    def last_poll_error(self) -> Optional[Exception]:
+        return self._tracker.last_poll_error
+
+    async def submit(self, metadata_tmls: List[str], import_policy: str = 'PARTIAL', create_new: bool = False,
+                     all_orgs_context: bool = False, skip_cdw_validation_for_tables: bool = False):
+        import_response = await self.ts.metadata_tml_async_import(
+            metadata_tmls=metadata_tmls, import_policy=import_policy, create_new=create_new,
+            all_orgs_context=all_orgs_context, skip_cdw_validation_for_tables=skip_cdw_validation_for_tables
+        )
+        future = asyncio.get_running_loop().create_future()
+        future.task_id = tml_import_task_id(import_response)
+        self._tracker.submitted(future.task_id, future)
+        self._futures.append(future)
+        if self._poller is None or self._poller.done():
+            self._wake = asyncio.Event()
+            self._poller = asyncio.ensure_future(self._poll_loop())
+        self._wake.set()
+        return future
+
+    async def _poll_once(self) -> bool:
+        task_ids = list(self._tracker.pending.keys())
+        record_offset = 0
+        finished = False
+        while True:
+            status_response = await self.ts.metadata_tml_async_status(
+                request=self._tracker.status_request(task_ids, record_offset))
+            entries = tml_import_task_statuses(status_response)
+            # The tracker is only used from the event loop, so it needs no lock between awaits
+            self._tracker.status_calls += 1
+            finished = self._tracker.apply(entries) or finished
+            if self._tracker.is_last_page(status_response, entries, self._tracker.status_page_size):
+                return finished
+            record_offset += self._tracker.status_page_size
+
+    async def _poll_loop(self):
+        # Ends once no task is left unfinished; the next submit() starts it again
+        while len(self._tracker.pending) > 0:
+            delay = self._tracker.seconds_to_next_poll()
+            if delay > 0:
+                # A submit() while waiting may have brought the next poll forward
+                self._wake.clear()
+                try:
+                    await asyncio.wait_for(self._wake.wait(), timeout=delay)
+                except asyncio.TimeoutError:
+                    pass
+                continue
+            error = None
+            finished = False
+            try:
+                finished = await self._poll_once()
+            except Exception as e:
+                error = e
+            self._tracker.polled(finished, error)
+
+    def as_completed(self, timeout: Optional[float] = None):
+        """
+        Iterator of awaitables for the tasks submitted so far, in the order they finish (see asyncio.as_completed)
+        """
+        return asyncio.as_completed(list(self._futures), timeout=timeout)
+
+    async def wait(self, timeout: Optional[float] = None):
+        if len(self._futures) > 0:
+            await asyncio.wait(list(self._futures), timeout=timeout)
+
+    async def close(self):
+        if self._poller is not None:
+            self._poller.cancel()
+        for future in self._tracker.pending.values():
+            future.cancel()
+        self._tracker.pending.clear()
+
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, exc_type, exc_val, exc_tb):
+        if exc_type is None:
+            await self.wait()
+        await self.close()
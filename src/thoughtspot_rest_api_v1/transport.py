@@ -0,0 +1,386 @@
+#
+# Transport layer shared by TSRestApiV1 and TSRestApiV2
+#
+#   Everything here plugs in underneath the requests.Session object of either class, as a requests
+#   Transport Adapter, so it applies to every method without changing how any of the methods are written.
+#   Mount it with set_connection_pool(), set_http2_transport() or get_transport_adaptor() on either class.
+#
+import contextlib
+import http.client
+import os
+import ssl
+import threading
+import time
+import weakref
+from typing import Callable, Optional
+
+import requests
+import urllib3
+from requests.structures import CaseInsensitiveDict
+from requests.utils import get_encoding_from_headers
+from requests_toolbelt.adapters.socket_options import TCPKeepAliveAdapter
+
+try:
+    import httpx
+except ImportError:  # pragma: no cover - optional dependency, see the 'http2' extra
+    httpx = None
+
+from .retry import RetryPolicy
+from .rate_limit import RateLimiter
+from .compression import RequestCompression
+
+
+class ConnectionPoolExhausted(requests.exceptions.ConnectionError):
+    """
+    Raised when pool_block=True and no pooled connection became free within pool_timeout seconds
+    """
+
+
+# Calls release (once) when the response body gives back its connection: when urllib3 returns the connection to its
+# pool (the body was read to the end, or Response.close() was called), or failing that when the response is
+# garbage collected
+def release_with_connection(raw, release: Callable[[], None]):
+    if getattr(raw, 'connection', None) is None:
+        release()
+        return
+    release_conn = raw.release_conn
+    finalizer = weakref.finalize(raw, release)
+
+    def release_conn_and_release():
+        try:
+            release_conn()
+        finally:
+            finalizer()
+
+    raw.release_conn = release_conn_and_release
+
+
+class TransportPoliciesMixin:
+    """
+    The request policies shared by TSHTTPAdapter and TSHTTP2Adapter, wrapped around the adapter's _send_pooled()
+
+    When retry_policy is set, responses and connection failures the RetryPolicy considers retryable are
+    sent again after its backoff, so the calling method only sees the final outcome.
+
+    When rate_limiter is set, every attempt waits for the RateLimiter budget of its endpoint before sending.
+    A stream=True response counts as in flight until its body has been read or the response is closed.
+
+    When request_compression is set, large request bodies are sent compressed once a capability probe has shown
+    that the server accepts them, falling back to uncompressed if the server rejects them with 415
+    (see RequestCompression).
+    """
+    retry_policy = None  # type: Optional[RetryPolicy]
+    rate_limiter = None  # type: Optional[RateLimiter]
+    request_compression = None  # type: Optional[RequestCompression]
+
+    def send(self, request, **kwargs):
+        request_compression = self.request_compression
+        compressed_request = None
+        if request_compression is not None:
+            compressed_request = request_compression.compress_request(request)
+        if compressed_request is None:
+            return self._send_with_retries(request, **kwargs)
+        if request_compression.supported is None:
+            self._probe_compression(request, **kwargs)
+            if request_compression.supported is not True:
+                return self._send_with_retries(request, **kwargs)
+
+        response = self._send_with_retries(compressed_request, **kwargs)
+        request_compression.record_compressed_result(response)
+        if not request_compression.is_rejection(response):
+            return response
+
+        # The server does not accept the compressed body: send it again as it was originally
+        response.close()
+        return self._send_with_retries(request, **kwargs)
+
+    # Finds out whether the server accepts compressed bodies before a large (and perhaps not repeatable) request is
+    # sent compressed, see RequestCompression
+    def _probe_compression(self, request, **kwargs):
+        request_compression = self.request_compression
+        kwargs['stream'] = False
+        with request_compression.probe_lock:
+            # Another thread may have probed while this one waited
+            if request_compression.supported is not None:
+                return
+            probe = request_compression.build_probe(request)
+            try:
+                response = self._send_with_retries(request_compression.compress(probe), **kwargs)
+                response.close()
+                if response.status_code < 400:
+                    request_compression.record_probe(response.status_code)
+                    return
+                uncompressed_response = self._send_with_retries(probe, **kwargs)
+                uncompressed_response.close()
+            except requests.exceptions.RequestException:
+                # Inconclusive: the request itself is sent uncompressed
+                return
+            request_compression.record_probe(response.status_code, uncompressed_response.status_code)
+
+    def _send_with_retries(self, request, **kwargs):
+        retry_policy = self.retry_policy
+        if retry_policy is None:
+            return self._send_once(request, **kwargs)
+
+        attempt = 0
+        while True:
+            retry_policy.count_request()
+            try:
+                response = self._send_once(request, **kwargs)
+            except ConnectionPoolExhausted:
+                raise
+            except (requests.exceptions.ConnectionError, requests.exceptions.Timeout) as e:
+                request_sent = self._request_was_sent(e)
+                if not retry_policy.should_retry_connection_failure(request.method, request.url,
+                                                                    request_sent=request_sent, attempt=attempt):
+                    raise
+                time.sleep(retry_policy.get_backoff(attempt))
+                attempt += 1
+                continue
+
+            if not retry_policy.should_retry_status(request.method, request.url, response.status_code, attempt):
+                return response
+            delay = retry_policy.get_backoff(attempt, response.headers.get('Retry-After'))
+            # Read the (small) error body so the connection goes back to the pool for the next attempt
+            try:
+                response.content
+            except requests.exceptions.RequestException:
+                pass
+            response.close()
+            time.sleep(delay)
+            attempt += 1
+
+    # Carries the policies (retries etc.) of a previously mounted adapter over to this one
+    def inherit_policies(self, adaptor: requests.adapters.BaseAdapter):
+        if isinstance(adaptor, TransportPoliciesMixin):
+            self.retry_policy = adaptor.retry_policy
+            self.rate_limiter = adaptor.rate_limiter
+            self.request_compression = adaptor.request_compression
+
+    # A failure to connect means nothing reached the server, so any request can be sent again
+    @staticmethod
+    def _request_was_sent(exception: Exception) -> bool:
+        if isinstance(exception, requests.exceptions.ConnectTimeout):
+            return False
+        reason = getattr(exception.args[0], 'reason', None) if exception.args else None
+        return not isinstance(reason, urllib3.exceptions.NewConnectionError)
+
+    def _send_once(self, request, **kwargs):
+        if self.rate_limiter is None:
+            return self._send_pooled(request, **kwargs)
+        if kwargs.get('stream') is not True:
+            with self.rate_limiter.limit(request.url):
+                return self._send_pooled(request, **kwargs)
+
+        # A streamed response is still in flight until the body is read or the response is closed
+        limit = contextlib.ExitStack()
+        limit.enter_context(self.rate_limiter.limit(request.url))
+        try:
+            response = self._send_pooled(request, **kwargs)
+        except BaseException:
+            limit.close()
+            raise
+        release_with_connection(response.raw, limit.close)
+        return response
+
+    def _send_pooled(self, request, **kwargs):
+        raise NotImplementedError
+
+
+class TSHTTPAdapter(TransportPoliciesMixin, TCPKeepAliveAdapter):
+    """
+    TCPKeepAliveAdapter with the connection pool sized for sharing a single TSRestApiV1 / TSRestApiV2
+    object across many worker threads, plus the policies of TransportPoliciesMixin.
+
+    pool_maxsize is the number of connections kept open to the ThoughtSpot server. Set it to at least the
+    number of worker threads, otherwise connections above the limit are closed after each request
+    and every call pays for a new TCP + TLS handshake.
+
+    pool_block=False is the requests default: when every pooled connection is in use, a temporary extra
+    connection is opened. pool_block=True caps connections at pool_maxsize: callers wait up to pool_timeout
+    seconds (None waits indefinitely) for a free connection, then ConnectionPoolExhausted is raised.
+    pool_timeout=0 fails fast. A stream=True response holds its connection until the body has been read or the
+    response is closed.
+    """
+    def __init__(self, pool_connections: int = 10, pool_maxsize: int = 10, pool_block: bool = False,
+                 pool_timeout: Optional[float] = None, retry_policy: Optional[RetryPolicy] = None,
+                 rate_limiter: Optional[RateLimiter] = None,
+                 request_compression: Optional[RequestCompression] = None,
+                 idle: int = 120, count: int = 20, interval: int = 30, **kwargs):
+        self.pool_timeout = pool_timeout
+        self.retry_policy = retry_policy
+        self.rate_limiter = rate_limiter
+        self.request_compression = request_compression
+        self._pool_slots = threading.BoundedSemaphore(pool_maxsize) if pool_block is True else None
+        super().__init__(idle=idle, count=count, interval=interval, pool_connections=pool_connections,
+                         pool_maxsize=pool_maxsize, pool_block=pool_block, **kwargs)
+
+    # TCPKeepAliveAdapter.send(), skipping over TransportPoliciesMixin.send() in the method resolution order
+    def _send_pooled(self, request, **kwargs):
+        if self._pool_slots is None:
+            return super(TransportPoliciesMixin, self).send(request, **kwargs)
+
+        # urllib3 itself would wait forever for a connection when the pool is blocking,
+        # so the wait (and the decision to fail) happens here instead
+        if self.pool_timeout is None:
+            self._pool_slots.acquire()
+        elif not self._pool_slots.acquire(timeout=self.pool_timeout):
+            raise ConnectionPoolExhausted('All {} pooled connections in use after waiting {} seconds'.format(
+                self._pool_maxsize, self.pool_timeout), request=request)
+        try:
+            response = super(TransportPoliciesMixin, self).send(request, **kwargs)
+        except BaseException:
+            self._pool_slots.release()
+            raise
+        if kwargs.get('stream') is True:
+            # The connection stays in use until the streamed body is read or the response is closed
+            release_with_connection(response.raw, self._pool_slots.release)
+        else:
+            self._pool_slots.release()
+        return response
+
+
+# Headers that only apply to a single HTTP/1.1 connection, which HTTP/2 does not allow
+HOP_BY_HOP_HEADERS = frozenset(['connection', 'keep-alive', 'proxy-connection', 'transfer-encoding', 'upgrade',
+                                'te', 'host'])
+
+
+class _HTTP2ResponseBody:
+    """
+    Stands in for the urllib3 response as requests.Response.raw, reading the httpx response body on demand
+    (so stream=True works), and carrying the Set-Cookie headers for requests' cookie handling
+    """
+    def __init__(self, httpx_response):
+        self._httpx_response = httpx_response
+        self._chunks = httpx_response.iter_bytes()
+        self._buffer = b''
+        # requests.cookies.extract_cookies_to_jar() reads the cookies from _original_response.msg
+        msg = http.client.HTTPMessage()
+        for name, value in httpx_response.headers.multi_items():
+            if name.lower() in ('set-cookie', 'set-cookie2'):
+                msg[name] = value
+        self._original_response = self
+        self.msg = msg
+
+    # The httpx response until its body has been read or it is closed, as with urllib3's HTTPResponse.connection
+    @property
+    def connection(self):
+        return None if self._httpx_response.is_closed else self._httpx_response
+
+    def read(self, amt: Optional[int] = None, **kwargs) -> bytes:
+        if amt is None:
+            data = self._buffer + b''.join(self._chunks)
+            self._buffer = b''
+            self.release_conn()
+            return data
+        while len(self._buffer) < amt:
+            try:
+                self._buffer += next(self._chunks)
+            except StopIteration:
+                self.release_conn()
+                break
+        data, self._buffer = self._buffer[:amt], self._buffer[amt:]
+        return data
+
+    def close(self):
+        self._httpx_response.close()
+
+    def release_conn(self):
+        self._httpx_response.close()
+
+
+class TSHTTP2Adapter(TransportPoliciesMixin, requests.adapters.BaseAdapter):
+    """
+    Sends requests over HTTP/2 using an httpx.Client, so many concurrent calls from worker threads are multiplexed
+    over a few connections rather than each needing its own TCP + TLS connection. Has the same policies
+    (retries, rate limiting, compression) as TSHTTPAdapter.
+
+    HTTP/2 is negotiated during the TLS handshake, falling back to HTTP/1.1 if the server does not offer it.
+    prior_knowledge=True speaks HTTP/2 without negotiating, which is needed for plain http:// servers.
+
+    Requires the optional httpx and h2 packages: pip install thoughtspot_rest_api_v1[http2]
+    """
+    def __init__(self, max_connections: int = 10, prior_knowledge: bool = False,
+                 retry_policy: Optional[RetryPolicy] = None, rate_limiter: Optional[RateLimiter] = None,
+                 request_compression: Optional[RequestCompression] = None):
+        if httpx is None:
+            raise ImportError("TSHTTP2Adapter requires the httpx and h2 packages: "
+                              "pip install thoughtspot_rest_api_v1[http2]")
+        super().__init__()
+        self.max_connections = max_connections
+        self.prior_knowledge = prior_knowledge
+        self.retry_policy = retry_policy
+        self.rate_limiter = rate_limiter
+        self.request_compression = request_compression
+        # httpx sets verify / cert on the client, so there is one client per combination requested
+        self._clients = {}
+        self._clients_lock = threading.Lock()
+
+    def _get_client(self, verify, cert):
+        key = (verify, cert if not isinstance(cert, list) else tuple(cert))
+        with self._clients_lock:
+            client = self._clients.get(key)
+            if client is None:
+                limits = httpx.Limits(max_connections=self.max_connections,
+                                      max_keepalive_connections=self.max_connections)
+                client = httpx.Client(http2=True, http1=not self.prior_knowledge,
+                                      verify=self._get_ssl_verify(verify), cert=cert, limits=limits, timeout=None,
+                                      follow_redirects=False)
+                self._clients[key] = client
+        return client
+
+    # requests gives verify as a CA bundle file or directory path (REQUESTS_CA_BUNDLE), httpx as an SSLContext
+    @staticmethod
+    def _get_ssl_verify(verify):
+        if not isinstance(verify, str):
+            return verify
+        if os.path.isdir(verify):
+            return ssl.create_default_context(capath=verify)
+        return ssl.create_default_context(cafile=verify)
+
+    @staticmethod
+    def _get_timeout(timeout):
+        if isinstance(timeout, tuple):
+            connect, read = timeout
+            return httpx.Timeout(read, connect=connect)
+        return httpx.Timeout(timeout)
+
+    def _send_pooled(self, request, stream=False, timeout=None, verify=True, cert=None, proxies=None):
+        client = self._get_client(verify, cert)
+        headers = [(k, v) for k, v in request.headers.items() if k.lower() not in HOP_BY_HOP_HEADERS]
+        httpx_request = client.build_request(request.method, request.url, headers=headers, content=request.body,
+                                             timeout=self._get_timeout(timeout))
+        try:
+            httpx_response = client.send(httpx_request, stream=True)
+        except httpx.ConnectTimeout as e:
+            raise requests.exceptions.ConnectTimeout(e, request=request) from e
+        except httpx.TimeoutException as e:
+            raise requests.exceptions.ReadTimeout(e, request=request) from e
+        except httpx.TransportError as e:
+            raise requests.exceptions.ConnectionError(e, request=request) from e
+
+        response = requests.Response()
+        response.status_code = httpx_response.status_code
+        response.reason = httpx_response.reason_phrase
+        # httpx has already decoded any Content-Encoding when reading the body
+        response.headers = CaseInsensitiveDict((k, v) for k, v in httpx_response.headers.items()
+                                               if k.lower() != 'content-encoding')
+        response.encoding = get_encoding_from_headers(response.headers)
+        response.raw = _HTTP2ResponseBody(httpx_response)
+        response.url = request.url
+        response.request = request
+        response.connection = self
+        requests.cookies.extract_cookies_to_jar(response.cookies, request, response.raw)
+        if stream is False:
+            response.content
+        return response
+
+    @staticmethod
+    def _request_was_sent(exception: Exception) -> bool:
+        return not isinstance(exception.__cause__, (httpx.ConnectError, httpx.ConnectTimeout))
+
+    def close(self):
+        with self._clients_lock:
+            for client in self._clients.values():
+                client.close()
+            self._clients = {}
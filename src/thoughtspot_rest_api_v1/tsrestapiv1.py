@@ -12,12 +12,25 @@
 #   and notes written throughout to help the reader understand more.
 #
 from collections import OrderedDict
-from typing import Optional, Dict, List, Union
+from typing import Optional, Dict, List, Union, Iterator, Iterable
 import json
+import threading
 
 import requests
+from requests.structures import CaseInsensitiveDict
 from requests_toolbelt.adapters.socket_options import TCPKeepAliveAdapter
 
+from .transport import TSHTTPAdapter, TSHTTP2Adapter, TransportPoliciesMixin
+from .retry import RetryPolicy
+from .rate_limit import RateLimiter
+from .compression import RequestCompression
+from .streaming import iter_response_content, write_chunks, Destination, DEFAULT_CHUNK_SIZE
+from .pagination import iter_pages, project_fields, DEFAULT_DATA_PAGE_SIZE
+from .tml_export import BulkTMLExporter, TMLExportResult, DEFAULT_TML_EXPORT_BATCH_SIZE
+from .tml_import import WaveTMLImporter, DEFAULT_TML_IMPORT_CHUNK_SIZE
+from .logs import LogTailer, LogCheckpoint, FileLogCheckpoint
+from .json_backend import JSONBackend, DEFAULT_JSON_BACKEND
+
 
 class MetadataTypes:
     """
@@ -180,9 +193,14 @@ class TSRestApiV1:
         # Flag for whether the version implements the export_fqn option of metadata/tml/export
         self.can_export_fqn = True
 
+        # Decodes the TML method responses and the TML documents in them, see set_tml_json_backend()
+        self.tml_json_backend = DEFAULT_JSON_BACKEND
+
         # Can be set after initial request
         # V1 API can use bearer auth in headers just like V2.0
         self.__bearer_token = None
+        # Guards replacing the headers when the bearer token changes while other threads are issuing calls
+        self._headers_lock = threading.Lock()
 
     # The following two methods allow for modifying the session for long-lived purposes, particularly TML import
     @staticmethod
@@ -193,6 +211,53 @@ class TSRestApiV1:
         self.requests_session.mount('http://', tcp_keep_alive_adaptor)
         self.requests_session.mount('https://', tcp_keep_alive_adaptor)
 
+    # For sharing one object across many worker threads: keeps pool_maxsize connections open to the server
+    # pool_block=True waits up to pool_timeout seconds for a free connection (pool_timeout=0 fails fast)
+    def set_connection_pool(self, pool_maxsize: int = 32, pool_block: bool = True,
+                            pool_timeout: Optional[float] = None, pool_connections: int = 10) -> TSHTTPAdapter:
+        adaptor = TSHTTPAdapter(pool_connections=pool_connections, pool_maxsize=pool_maxsize,
+                                pool_block=pool_block, pool_timeout=pool_timeout)
+        adaptor.inherit_policies(self.requests_session.get_adapter(self.server))
+        self.set_tcp_keep_alive_adaptor(adaptor)
+        return adaptor
+
+    # Retries throttled / unavailable responses on every method, see RetryPolicy for which calls are retried
+    # retry_policy.counters reports how many retries have happened
+    def set_retry_policy(self, retry_policy: Optional[RetryPolicy]):
+        self.get_transport_adaptor().retry_policy = retry_policy
+
+    # Per endpoint-family budgets of requests per second and requests in flight, see RateLimiter
+    def set_rate_limiter(self, rate_limiter: Optional[RateLimiter]):
+        self.get_transport_adaptor().rate_limiter = rate_limiter
+
+    # Sends large request bodies (TML import) gzip / deflate compressed, see RequestCompression
+    def set_request_compression(self, request_compression: Optional[RequestCompression]):
+        self.get_transport_adaptor().request_compression = request_compression
+
+    # Sends all calls over HTTP/2, multiplexing concurrent calls over max_connections connections (requires httpx)
+    # prior_knowledge=True is needed for a plain http:// server
+    def set_http2_transport(self, max_connections: int = 10, prior_knowledge: bool = False) -> TSHTTP2Adapter:
+        adaptor = TSHTTP2Adapter(max_connections=max_connections, prior_knowledge=prior_knowledge)
+        adaptor.inherit_policies(self.requests_session.get_adapter(self.server))
+        self.set_tcp_keep_alive_adaptor(adaptor)
+        return adaptor
+
+    # How the TML methods decode responses and TML documents: backend='json' or 'orjson' (requires orjson)
+    # ordered=None keeps each method's own decoding (OrderedDicts from metadata_tml_export(), plain dicts elsewhere),
+    # ordered=True gives OrderedDicts everywhere, ordered=False plain dicts everywhere (the only choice with 'orjson')
+    def set_tml_json_backend(self, backend: str = 'json', ordered: Optional[bool] = None) -> JSONBackend:
+        self.tml_json_backend = JSONBackend(backend=backend, ordered=ordered)
+        return self.tml_json_backend
+
+    # Returns the TSHTTPAdapter (or TSHTTP2Adapter) mounted for the server, mounting a TSHTTPAdapter with the
+    # default settings if necessary
+    def get_transport_adaptor(self) -> Union[TSHTTPAdapter, TSHTTP2Adapter]:
+        adaptor = self.requests_session.get_adapter(self.server)
+        if not isinstance(adaptor, TransportPoliciesMixin):
+            adaptor = TSHTTPAdapter()
+            self.set_tcp_keep_alive_adaptor(adaptor)
+        return adaptor
+
     #
     # Session management calls
     # - up here vs. in the SESSION section below (because these two are required)
@@ -224,9 +289,16 @@ class TSRestApiV1:
 
     @bearer_token.setter
     def bearer_token(self, bearer_token):
-        self.__bearer_token = bearer_token
-        self.api_headers['Authorization'] = 'Bearer {}'.format(bearer_token)
-        self.requests_session.headers.update(self.api_headers)
+        # Other threads may be merging the session headers into a request at this moment, so new header
+        # objects are built and swapped in, rather than modifying the ones that are in use
+        with self._headers_lock:
+            self.__bearer_token = bearer_token
+            api_headers = dict(self.api_headers)
+            api_headers['Authorization'] = 'Bearer {}'.format(bearer_token)
+            session_headers = CaseInsensitiveDict(self.requests_session.headers)
+            session_headers.update(api_headers)
+            self.api_headers = api_headers
+            self.requests_session.headers = session_headers
 
     #
     # Root level API methods found below, divided into logical separations
@@ -286,6 +358,86 @@ class TSRestApiV1:
         response.raise_for_status()
         return response.json()
 
+    #
+    # Paged versions of pinboarddata and searchdata
+    # Rather than batch_size=-1 (everything in one response), batch_size rows are requested at a time, using offset,
+    # until a page comes back with fewer rows. With read_ahead > 0, the request for the next page is sent (and
+    # its JSON decoded) on a background thread while the current page is being processed
+    #
+    # Each batch is one response: {'columnNames': [...], 'data': [[...], ...], 'totalRowCount': ...}
+    def searchdata_batches(
+        self,
+        query_string: str,
+        data_source_guid: str,
+        format_type: str='COMPACT',
+        batch_size: int=DEFAULT_DATA_PAGE_SIZE,
+        read_ahead: int=1
+    ) -> Iterator[Dict]:
+        def fetch_page(offset: int, page_size: int) -> Dict:
+            return self.searchdata(query_string=query_string, data_source_guid=data_source_guid,
+                                   format_type=format_type, batch_size=page_size, offset=offset)
+
+        return iter_pages(fetch_page, record_size=batch_size, read_ahead=read_ahead,
+                          page_length=lambda page: len(page.get('data', [])))
+
+    def searchdata_rows(
+        self,
+        query_string: str,
+        data_source_guid: str,
+        format_type: str='COMPACT',
+        batch_size: int=DEFAULT_DATA_PAGE_SIZE,
+        read_ahead: int=1
+    ) -> Iterator:
+        for batch in self.searchdata_batches(query_string=query_string, data_source_guid=data_source_guid,
+                                             format_type=format_type, batch_size=batch_size, read_ahead=read_ahead):
+            for row in batch.get('data', []):
+                yield row
+
+    # The first page of every viz comes from one request, then each viz that has more rows is paged on its own
+    # Yields (vizid, batch) tuples, with the batch in the same form as a single viz of the pinboarddata response
+    def pinboarddata_batches(
+        self,
+        pinboard_guid: str,
+        vizids: List[str],
+        format_type: str='COMPACT',
+        batch_size: int=DEFAULT_DATA_PAGE_SIZE,
+        read_ahead: int=1
+    ) -> Iterator[tuple]:
+        def page_length(page: Dict) -> int:
+            return len(page.get('data', []))
+
+        first_pages = self.pinboarddata(pinboard_guid=pinboard_guid, vizids=vizids, format_type=format_type,
+                                        batch_size=batch_size, offset=0)
+        for vizid in first_pages:
+            first_page = first_pages[vizid]
+            yield vizid, first_page
+            if page_length(first_page) < batch_size:
+                continue
+
+            def fetch_page(offset: int, page_size: int, vizid=vizid) -> Dict:
+                response = self.pinboarddata(pinboard_guid=pinboard_guid, vizids=[vizid], format_type=format_type,
+                                             batch_size=page_size, offset=offset)
+                return response.get(vizid, {})
+
+            for page in iter_pages(fetch_page, record_size=batch_size, record_offset=batch_size,
+                                   read_ahead=read_ahead, page_length=page_length):
+                yield vizid, page
+
+    # Rows of a single viz on the pinboard
+    def pinboarddata_rows(
+        self,
+        pinboard_guid: str,
+        vizid: str,
+        format_type: str='COMPACT',
+        batch_size: int=DEFAULT_DATA_PAGE_SIZE,
+        read_ahead: int=1
+    ) -> Iterator:
+        for batch_vizid, batch in self.pinboarddata_batches(pinboard_guid=pinboard_guid, vizids=[vizid],
+                                                            format_type=format_type, batch_size=batch_size,
+                                                            read_ahead=read_ahead):
+            for row in batch.get('data', []):
+                yield row
+
     #
     # ADMIN Methods
     #
@@ -487,24 +639,20 @@ class TSRestApiV1:
     #
     # EXPORT METHODS
     #
-    def export_pinboard_pdf(
-        self,
-        pinboard_id: str,
-        one_visualization_per_page: bool=False,
-        landscape_or_portrait: str='LANDSCAPE',
-        cover_page: bool=True,
-        logo: bool=True,
-        page_numbers: bool=False,
-        filter_page: bool=True,
-        truncate_tables: bool=False,
-        footer_text: str=None,
-        visualization_ids: List[str]=None
-    ) -> bytes:
-        endpoint = 'export/pinboard/pdf'
-
-        # NOTE: there is a 'transient_pinboard_content' option but it would only make sense within the browser
-        # NOTE: it's unclear how to use visualization_ids, so not implemented yet
 
+    # URL parameters of export/pinboard/pdf, shared by export_pinboard_pdf() and export_pinboard_pdf_stream()
+    @staticmethod
+    def _pinboard_pdf_url_params(
+        pinboard_id: str,
+        one_visualization_per_page: bool,
+        landscape_or_portrait: str,
+        cover_page: bool,
+        logo: bool,
+        page_numbers: bool,
+        filter_page: bool,
+        truncate_tables: bool,
+        footer_text: Optional[str]
+    ) -> Dict:
         layout_type = 'PINBOARD'
 
         if one_visualization_per_page is True:
@@ -523,6 +671,32 @@ class TSRestApiV1:
 
         if footer_text is not None:
             url_params['footer_text'] = footer_text
+        return url_params
+
+    def export_pinboard_pdf(
+        self,
+        pinboard_id: str,
+        one_visualization_per_page: bool=False,
+        landscape_or_portrait: str='LANDSCAPE',
+        cover_page: bool=True,
+        logo: bool=True,
+        page_numbers: bool=False,
+        filter_page: bool=True,
+        truncate_tables: bool=False,
+        footer_text: str=None,
+        visualization_ids: List[str]=None
+    ) -> bytes:
+        endpoint = 'export/pinboard/pdf'
+
+        # NOTE: there is a 'transient_pinboard_content' option but it would only make sense within the browser
+        # NOTE: it's unclear how to use visualization_ids, so not implemented yet
+
+        url_params = self._pinboard_pdf_url_params(pinboard_id=pinboard_id,
+                                                   one_visualization_per_page=one_visualization_per_page,
+                                                   landscape_or_portrait=landscape_or_portrait,
+                                                   cover_page=cover_page, logo=logo, page_numbers=page_numbers,
+                                                   filter_page=filter_page, truncate_tables=truncate_tables,
+                                                   footer_text=footer_text)
 
         url = self.base_url + endpoint
 
@@ -534,6 +708,63 @@ class TSRestApiV1:
         # Return value is in Bytes format, so other methods can do what they want with it
         return response.content
 
+    # Same as export_pinboard_pdf, but yields the PDF in chunks as it arrives rather than holding it all in memory
+    def export_pinboard_pdf_stream(
+        self,
+        pinboard_id: str,
+        one_visualization_per_page: bool=False,
+        landscape_or_portrait: str='LANDSCAPE',
+        cover_page: bool=True,
+        logo: bool=True,
+        page_numbers: bool=False,
+        filter_page: bool=True,
+        truncate_tables: bool=False,
+        footer_text: str=None,
+        chunk_size: int=DEFAULT_CHUNK_SIZE
+    ) -> Iterator[bytes]:
+        endpoint = 'export/pinboard/pdf'
+
+        url_params = self._pinboard_pdf_url_params(pinboard_id=pinboard_id,
+                                                   one_visualization_per_page=one_visualization_per_page,
+                                                   landscape_or_portrait=landscape_or_portrait,
+                                                   cover_page=cover_page, logo=logo, page_numbers=page_numbers,
+                                                   filter_page=filter_page, truncate_tables=truncate_tables,
+                                                   footer_text=footer_text)
+
+        url = self.base_url + endpoint
+
+        # stream=True returns once the headers arrive, leaving the body to be read in chunks
+        response = self.requests_session.post(url=url, params=url_params,
+                                              headers={'Accept': 'application/octet-stream'}, stream=True)
+        # Error responses are small, so read in full to be available on the raised HTTPError
+        if not response.ok:
+            response.content
+        response.raise_for_status()
+        return iter_response_content(response, chunk_size=chunk_size)
+
+    # Writes the PDF directly to a file path or open binary file object, returning the number of bytes written
+    def export_pinboard_pdf_to_file(
+        self,
+        destination: Destination,
+        pinboard_id: str,
+        one_visualization_per_page: bool=False,
+        landscape_or_portrait: str='LANDSCAPE',
+        cover_page: bool=True,
+        logo: bool=True,
+        page_numbers: bool=False,
+        filter_page: bool=True,
+        truncate_tables: bool=False,
+        footer_text: str=None,
+        chunk_size: int=DEFAULT_CHUNK_SIZE
+    ) -> int:
+        chunks = self.export_pinboard_pdf_stream(pinboard_id=pinboard_id,
+                                                 one_visualization_per_page=one_visualization_per_page,
+                                                 landscape_or_portrait=landscape_or_portrait,
+                                                 cover_page=cover_page, logo=logo, page_numbers=page_numbers,
+                                                 filter_page=filter_page, truncate_tables=truncate_tables,
+                                                 footer_text=footer_text, chunk_size=chunk_size)
+        return write_chunks(chunks, destination)
+
     #
     # GROUP METHODS
     #
@@ -871,6 +1102,58 @@ class TSRestApiV1:
         response.raise_for_status()
         return response.json()
 
+    #
+    # Generator versions of metadata_list and metadata_listobjectheaders
+    # Headers are requested batchsize at a time rather than all in one response (batchsize=-1), and yielded one by
+    # one. fields projects each header down to just the listed keys (e.g. ['id', 'name', 'modified', 'owner'])
+    # so that only what is needed is kept in memory. The next batch is requested on a background thread while the
+    # current one is processed, unless read_ahead=0
+    #
+
+    # Stops on the isLastBatch marker of the /metadata/list response
+    def metadata_list_iter(self, object_type: str, subtypes: Optional[List[str]] = None,
+                           owner_types: Optional[List[str]] = None, category: Optional[str] = None,
+                           sort: str = 'DEFAULT', sort_ascending: bool = True, filter: Optional[str] = None,
+                           fetchids: Optional[List[str]] = None, skipids: Optional[List[str]] = None,
+                           tagname: Optional[List[str]] = None, batchsize: int = 500,
+                           auto_created: Optional[bool] = None, show_hidden: Optional[bool] = False,
+                           author_guid: Optional[str] = None, fields: Optional[List[str]] = None,
+                           read_ahead: int = 1) -> Iterator[Dict]:
+        def fetch_page(offset: int, page_size: int) -> Dict:
+            return self.metadata_list(object_type=object_type, subtypes=subtypes, owner_types=owner_types,
+                                      category=category, sort=sort, sort_ascending=sort_ascending, filter=filter,
+                                      fetchids=fetchids, skipids=skipids, tagname=tagname, batchsize=page_size,
+                                      offset=offset, auto_created=auto_created, show_hidden=show_hidden,
+                                      author_guid=author_guid)
+
+        # isLastBatch decides whether there is another page, rather than the number of headers returned
+        def page_length(page: Dict) -> int:
+            if 'isLastBatch' in page:
+                return 0 if page['isLastBatch'] is True else batchsize
+            return len(page.get('headers', []))
+
+        for page in iter_pages(fetch_page, record_size=batchsize, read_ahead=read_ahead, page_length=page_length):
+            for header in page.get('headers', []):
+                yield project_fields(header, fields)
+
+    # /metadata/listobjectheaders returns only a list, so stops on the first batch with fewer than batchsize headers
+    def metadata_listobjectheaders_iter(self, object_type: str, subtypes: Optional[List[str]] = None,
+                                        sort: str = 'DEFAULT', sort_ascending: bool = True,
+                                        filter: Optional[str] = None, fetchids: Optional[List[str]] = None,
+                                        skipids: Optional[List[str]] = None, tagname: Optional[List[str]] = None,
+                                        category: Optional[str] = None, batchsize: int = 500,
+                                        auto_created: Optional[bool] = None, fields: Optional[List[str]] = None,
+                                        read_ahead: int = 1) -> Iterator[Dict]:
+        def fetch_page(offset: int, page_size: int) -> List:
+            return self.metadata_listobjectheaders(object_type=object_type, subtypes=subtypes, sort=sort,
+                                                   sort_ascending=sort_ascending, filter=filter, fetchids=fetchids,
+                                                   skipids=skipids, tagname=tagname, category=category,
+                                                   batchsize=page_size, offset=offset, auto_created=auto_created)
+
+        for page in iter_pages(fetch_page, record_size=batchsize, read_ahead=read_ahead):
+            for header in page:
+                yield project_fields(header, fields)
+
     # Helper method to find a GUID from a name
     def metadata_list_find_guid(self, object_type: str, name: str):
         objects = self.metadata_list(object_type=object_type, filter=name)
@@ -915,32 +1198,40 @@ class TSRestApiV1:
     #
 
     # Some errors come through as part of a HTTP 200 response, just listed in the JSON
+    # Takes the already decoded response, returning it if there are no errors
     @staticmethod
-    def raise_tml_errors(response: requests.Response) -> Dict:
+    def check_tml_errors(tml_json_response: Dict) -> Dict:
+        # It is possible in a multiple file upload that some validated and others have errors
+        if 'object' in tml_json_response:
+            for k in tml_json_response['object']:
+                if 'info' in k:
+                    # Older versions wrapped the errors in 'info'
+                    if k['info']['status']['status_code'] == 'ERROR':
+                        raise SyntaxError(tml_json_response['object'])
+                # Recent versions return as 'response'
+                elif 'response' in k:
+                    if k['response']['status']['status_code'] == 'ERROR':
+                        raise SyntaxError(tml_json_response['object'])
+        return tml_json_response
+
+    # Decodes the response once (with json_backend if given, otherwise the json module) and checks it for errors
+    @staticmethod
+    def raise_tml_errors(response: requests.Response, json_backend: Optional[JSONBackend] = None,
+                         ordered: bool = False) -> Dict:
         if len(response.content) == 0:
             raise Exception('No response returned at all with status code {}'.format(response.status_code))
-        else:
-            j = response.json()
-            # JSON error response checking
-
-            # It is possible in a multiple file upload that some validated and others have errors
-
-            if 'object' in j:
-                for k in j['object']:
-                    if 'info' in k:
-                        # Older versions wrapped the errors in 'info'
-                        if k['info']['status']['status_code'] == 'ERROR':
-                            # print(k['info']['status']['error_message'])
-                            raise SyntaxError(j['object'])
-                    # Recent versions return as 'response'
-                    elif 'response' in k:
-                        if k['response']['status']['status_code'] == 'ERROR':
-                            # print(k['info']['status']['error_message'])
-                            raise SyntaxError(j['object'])
-                # If no errors are raised, just return the regular response
-                return response.json()
-            else:
-                return response.json()
+        if json_backend is None:
+            json_backend = DEFAULT_JSON_BACKEND
+        return TSRestApiV1.check_tml_errors(json_backend.loads(response.content, ordered=ordered))
+
+    # Decodes a TML response once with the tml_json_backend, checking the decoded object for errors
+    def _tml_response_json(self, response: requests.Response, ordered: bool = False,
+                           check_errors: bool = True) -> Dict:
+        if check_errors is True:
+            return self.raise_tml_errors(response, json_backend=self.tml_json_backend, ordered=ordered)
+        if len(response.content) == 0:
+            raise Exception('No response returned at all with status code {}'.format(response.status_code))
+        return self.tml_json_backend.loads(response.content, ordered=ordered)
 
     def metadata_tml_export(self, guid: str, export_associated=False, export_fqn=True) -> OrderedDict:
         # Always returns a Python Dict, converted from a request to the API to receive in JSON
@@ -959,18 +1250,16 @@ class TSRestApiV1:
         # TML import is distinguished by having an {'Accept': 'text/plain'} header on the POST
         response = self.requests_session.post(url=url, data=post_data, headers={'Accept': 'text/plain'})
         response.raise_for_status()
-        # Extra parsing of some 'error responses' that come through in JSON response on HTTP 200
-        self.raise_tml_errors(response=response)
-
         # TML API returns a JSON response, with the TML document
-        # object_pairs_hook forces an OrderedDict
-        tml_json_response = response.json(object_pairs_hook=OrderedDict)
+        # Extra parsing of some 'error responses' that come through in JSON response on HTTP 200
+        # OrderedDicts unless set_tml_json_backend() asked for plain dicts
+        tml_json_response = self._tml_response_json(response, ordered=True)
         objs = tml_json_response['object']
 
         if len(objs) == 1 and export_associated is False:
             # The TML is there in full under the 'edoc' section of the API JSON response
             tml_str = objs[0]['edoc']
-            tml_obj = json.loads(tml_str)
+            tml_obj = self.tml_json_backend.loads(tml_str)
         else:
             if export_associated is True:
                 tml_obj = tml_json_response
@@ -996,17 +1285,15 @@ class TSRestApiV1:
         # TML import is distinguished by having an {'Accept': 'text/plain'} header on the POST
         response = self.requests_session.post(url=url, data=post_data, headers={'Accept': 'text/plain'})
         response.raise_for_status()
-        # Extra parsing of some 'error responses' that come through in JSON response on HTTP 200
-        self.raise_tml_errors(response=response)
-
         # TML API returns a JSON response, with the TML document
-        # object_pairs_hook forces an OrderedDict
-        tml_json_response = response.json(object_pairs_hook=OrderedDict)
+        # Extra parsing of some 'error responses' that come through in JSON response on HTTP 200
+        # OrderedDicts unless set_tml_json_backend() asked for plain dicts
+        tml_json_response = self._tml_response_json(response, ordered=True)
         objs = tml_json_response['object']
 
         # The first object will be the requested object
         tml_str = objs[0]['edoc']
-        tml_obj = json.loads(tml_str)
+        tml_obj = self.tml_json_backend.loads(tml_str)
 
         name_guid_map = {}
 
@@ -1034,11 +1321,9 @@ class TSRestApiV1:
         # TML import is distinguished by having an {'Accept': 'text/plain'} header on the POST
         response = self.requests_session.post(url=url, data=post_data, headers={'Accept': 'text/plain'})
         response.raise_for_status()
-        # Extra parsing of some 'error responses' that come through in JSON response on HTTP 200
-        self.raise_tml_errors(response=response)
-
         # TML API returns a JSON response, with the TML document
-        tml_json_response = response.json()
+        # Extra parsing of some 'error responses' that come through in JSON response on HTTP 200
+        tml_json_response = self._tml_response_json(response)
         objs = tml_json_response['object']
 
         if len(objs) == 1:
@@ -1070,11 +1355,9 @@ class TSRestApiV1:
         # TML import is distinguished by having an {'Accept': 'text/plain'} header on the POST
         response = self.requests_session.post(url=url, data=post_data, headers={'Accept': 'text/plain'})
         response.raise_for_status()
-        # Extra parsing of some 'error responses' that come through in JSON response on HTTP 200
-        self.raise_tml_errors(response=response)
-
         # TML API returns a JSON response, with the TML document
-        tml_json_response = response.json()
+        # Extra parsing of some 'error responses' that come through in JSON response on HTTP 200
+        tml_json_response = self._tml_response_json(response)
         objs = tml_json_response['object']
 
         # The TML is there in full under the 'edoc' section of the API JSON response
@@ -1087,6 +1370,41 @@ class TSRestApiV1:
 
         return response_str, name_guid_map
 
+    # Exports many GUIDs in one request, returning the 'object' list of the response, with the status of each
+    # object left in its 'info' rather than raised
+    def metadata_tml_export_objects(self, guids: List[str], formattype: str = 'YAML',
+                                    export_fqn=True) -> List[Dict]:
+        endpoint = 'metadata/tml/export'
+        post_data = {
+            'export_ids': json.dumps(guids),
+            'formattype': formattype.upper(),
+            'export_associated': 'false'
+        }
+        # Added in version 8.9, can be set to skip for older releases
+        if self.can_export_fqn is True:
+            post_data['export_fqn'] = str(export_fqn).lower()
+        url = self.base_url + endpoint
+
+        response = self.requests_session.post(url=url, data=post_data, headers={'Accept': 'text/plain'})
+        response.raise_for_status()
+        return self._tml_response_json(response, check_errors=False).get('object', [])
+
+    # Exports the TML string of every GUID, in requests of batch_size GUIDs on max_workers threads.
+    # Yields (guid, edoc, error) as each request completes, see BulkTMLExporter
+    def metadata_tml_export_string_bulk(
+        self,
+        guids: Iterable[str],
+        formattype: str = 'YAML',
+        export_fqn=True,
+        batch_size: int=DEFAULT_TML_EXPORT_BATCH_SIZE,
+        max_workers: int=4
+    ) -> Iterator[TMLExportResult]:
+        def export_objects(batch_guids: List[str]) -> List[Dict]:
+            return self.metadata_tml_export_objects(guids=batch_guids, formattype=formattype, export_fqn=export_fqn)
+
+        exporter = BulkTMLExporter(export_objects, batch_size=batch_size, max_workers=max_workers)
+        return exporter.export(guids)
+
     # TML import is distinguished by having an {'Accept': 'text/plain'} header on the POST
     # 'JSON' default actually takes a Python object representing JSON output
     # Use 'YAML' or 'JSON_STR' as formattype if you have already stringified the input (read from disk etc.)
@@ -1112,7 +1430,7 @@ class TSRestApiV1:
         # Assume JSON is Python object
         if formattype == 'JSON':
             for t in tml_list:
-                encoded_tmls.append(json.dumps(t))
+                encoded_tmls.append(self.tml_json_backend.dumps(t))
         # YAML or JSON_STR are already string when sent in
         elif formattype in ['YAML', 'JSON_STR']:
             for t in tml_list:
@@ -1120,7 +1438,7 @@ class TSRestApiV1:
         # Assume it's just a Python object which will dump to JSON matching the TML format
         else:
             for t in tml_list:
-                encoded_tmls.append(json.dumps(t))
+                encoded_tmls.append(self.tml_json_backend.dumps(t))
 
         import_policy = 'ALL_OR_NONE'
 
@@ -1141,8 +1459,27 @@ class TSRestApiV1:
         response = self.requests_session.post(url=url, data=post_data, headers={'Accept': 'text/plain'})
         response.raise_for_status()
         # Extra parsing of some 'error responses' that come through in JSON response on HTTP 200
-        self.raise_tml_errors(response=response)
-        return response.json()
+        return self._tml_response_json(response)
+
+    # Imports any number of TML documents (YAML / JSON strings or dicts) in dependency order, as chunks of
+    # chunk_size documents on max_workers threads per wave. Each chunk is imported ALL_OR_NONE, so one error
+    # fails the documents of its chunk. See WaveTMLImporter
+    def metadata_tml_import_waves(
+        self,
+        tml_documents: List[Union[str, Dict]],
+        create_new_on_server: bool = False,
+        chunk_size: int=DEFAULT_TML_IMPORT_CHUNK_SIZE,
+        max_workers: int=4,
+        skip_dependents_of_failed: bool = True
+    ) -> List[Dict]:
+        def import_chunk(tml_strings: List[str]) -> List[Dict]:
+            import_response = self.metadata_tml_import(tml=tml_strings, create_new_on_server=create_new_on_server,
+                                                       formattype='JSON_STR')
+            return import_response['object']
+
+        importer = WaveTMLImporter(import_chunk, chunk_size=chunk_size, max_workers=max_workers,
+                                   skip_dependents_of_failed=skip_dependents_of_failed)
+        return importer.import_documents(tml_documents)
 
     # Parse the TML response from import to get the GUIDs
     def guids_from_imported_tml(self, tml_import_response) -> List[str]:
@@ -1707,6 +2044,20 @@ class TSRestApiV1:
         response.raise_for_status()
         return response.json()
 
+    # LogTailer delivering new events of the topic, resuming from checkpoint (a LogCheckpoint or path of a JSON file)
+    def logs_topics_tailer(self, checkpoint: Union[LogCheckpoint, str], topic: str = 'security_logs',
+                           start_epoch_time_in_millis: Optional[int] = None, overlap_millis: int = 5 * 60 * 1000,
+                           poll_interval_sec: float = 60) -> LogTailer:
+        if isinstance(checkpoint, str):
+            checkpoint = FileLogCheckpoint(checkpoint)
+
+        def fetch_range(range_start: int, range_end: int) -> List[Dict]:
+            events = self.logs_topics(topic=topic, from_epoch=str(range_start), to_epoch=str(range_end))
+            return events if isinstance(events, list) else []
+
+        return LogTailer(fetch_range, checkpoint, start_epoch_time_in_millis=start_epoch_time_in_millis,
+                         overlap_millis=overlap_millis, poll_interval_sec=poll_interval_sec)
+
     #
     # ADMIN methods, many concerning Custom Actions
     #
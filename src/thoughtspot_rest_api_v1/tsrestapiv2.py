@@ -1,10 +1,27 @@
 from collections import OrderedDict
-from typing import Optional, Dict, List, Union
+from typing import Optional, Dict, List, Union, Iterator, Iterable
 import json
+import threading
+import time
 
 import requests
+from requests.structures import CaseInsensitiveDict
 from requests_toolbelt.adapters.socket_options import TCPKeepAliveAdapter
 
+from .transport import TSHTTPAdapter, TSHTTP2Adapter, TransportPoliciesMixin
+from .retry import RetryPolicy
+from .rate_limit import RateLimiter
+from .compression import RequestCompression
+from .streaming import iter_response_content, write_chunks, Destination, DEFAULT_CHUNK_SIZE
+from .auth import BearerTokenManager, ManagedBearerAuth
+from .coalesce import RequestCoalescer
+from .dataframes import DataFrameBuilder, liveboard_data_to_dataframes
+from .tml_export import BulkTMLExporter, TMLExportBatchJob, TMLExportResult, DEFAULT_TML_EXPORT_BATCH_SIZE
+from .tml_import import WaveTMLImporter, TMLImportJobManager, imported_object_result, DEFAULT_TML_IMPORT_CHUNK_SIZE
+from .logs import LogWindowSplitter, LogTailer, LogCheckpoint, FileLogCheckpoint, DEFAULT_WINDOW_MILLIS
+from .pagination import iter_pages, iter_unique_items, page_request, DEFAULT_PAGE_SIZE
+from .pagination import data_page_contents, data_page_length, iter_data_rows, DEFAULT_DATA_PAGE_SIZE
+
 class ReportTypes:
     PDF = 'PDF'
     XLSX = 'XLSX'
@@ -25,12 +42,12 @@ class TSTypesV2:
 # Only intended for features in V2 that are not in V1, while the V2 API is being finalized
 #
 
-class TSRestApiV2:
+class TSRestApiV2Base:
     """
-    The TSRestApiV2 implementation is a simple implementation to provide access to methods that
-    do not exist in V1 at this time, as well as providing a requests.Session object to issue any other
-    V2 call the user desires. It is meant as a bridge until the official V2 SDKs are available, and a companion
-    to the existing TSRestApiV1 library here
+    The endpoint methods shared by TSRestApiV2 and AsyncTSRestApiV2. Every endpoint method ends in
+    get_request() or post_request() (or post_request_binary()), so a subclass provides _get_request(),
+    _post_request(), post_request_binary() and post_request_binary_stream() for its HTTP client, along with
+    whatever transport settings and helpers that client supports
     """
     def __init__(self, server_url: str):
         # Protect from extra end slash on URL
@@ -40,31 +57,26 @@ class TSRestApiV2:
         self.server = server_url
         self.api_version = '2.0'
 
-        # REST API uses cookies to maintain the session, so you need to create an open Session
-        self.requests_session = requests.Session()
-
         # X-Requested-By             is necessary for all calls.
         # Accept: application/json   isn't necessary with requests (default: Accept: */*) but might be in other frameworks
         #
-        # This sets the header on any subsequent call
+        # The subclass sets these headers on every call
         self.api_headers = {'X-Requested-By': 'ThoughtSpot', 'Accept': 'application/json', 'Accept-Language': 'en_US'}
-        self.requests_session.headers.update(self.api_headers)
 
         # Will be set after initial request
         self.__bearer_token = None
+        # Guards replacing the headers when the bearer token changes while other threads are issuing calls
+        self._headers_lock = threading.Lock()
+        # Optional single-flight sharing of identical concurrent reads, see set_request_coalescer()
+        self.request_coalescer = None  # type: Optional[RequestCoalescer]
 
         # TS documentation shows the /tspublic/v2/ portion but it is always preceded by {server}/callosum/v2/
         self.base_url = '{server}/api/rest/{version}/'.format(server=self.server, version=self.api_version)
         # self.non_public_base_url = '{server}/callosum/v1/'.format(server=self.server)
 
-    # The following two methods allow for modifying the session for long-lived purposes, particularly TML import
-    @staticmethod
-    def get_default_tcp_keep_alive_adaptor() -> TCPKeepAliveAdapter:
-        return TCPKeepAliveAdapter(idle=120, count=20, interval=30)
-
-    def set_tcp_keep_alive_adaptor(self, tcp_keep_alive_adaptor: TCPKeepAliveAdapter):
-        self.requests_session.mount('http://', tcp_keep_alive_adaptor)
-        self.requests_session.mount('https://', tcp_keep_alive_adaptor)
+    # Identical concurrent calls to the read-only endpoints of the RequestCoalescer share one request and response
+    def set_request_coalescer(self, request_coalescer: Optional[RequestCoalescer]):
+        self.request_coalescer = request_coalescer
 
     @property
     def bearer_token(self):
@@ -72,51 +84,19 @@ class TSRestApiV2:
 
     @bearer_token.setter
     def bearer_token(self, bearer_token):
-        self.__bearer_token = bearer_token
-        self.api_headers['Authorization'] = 'Bearer {}'.format(bearer_token)
-        self.requests_session.headers.update(self.api_headers)
-
-    #
-    # Session management calls
-    # - up here vs. in the SESSION section below (because these two are required)
-    #
-    def auth_session_login(self,  username: Optional[str] = None, password: Optional[str] = None,
-                           remember_me: bool = True,
-                           bearer_token: Optional[str] = None,
-                           org_identifier: Optional[int] = None) -> requests.Session:
-        endpoint = 'auth/session/login'
-
-        url = self.base_url + endpoint
-
-        if bearer_token is not None:
-            response = self.requests_session.post(url=url,
-                                                  headers={"Authorization": "Bearer {}".format(bearer_token)},
-                                                  json={'remember_me': str(remember_me).lower()})
-        elif username is not None and password is not None:
-            json_post_data = {
-                'username': username,
-                'password': password,
-                'remember_me': str(remember_me).lower()
-            }
-            if org_identifier is not None:
-                json_post_data["org_identifier"] = org_identifier
-            response = self.requests_session.post(url=url, json=json_post_data)
-        else:
-            raise Exception("If using username/password, must include both")
-
-        # HTTP 204 - success, no content
-        response.raise_for_status()
-        return self.requests_session
-
-    def auth_session_logout(self) -> bool:
-        endpoint = 'auth/session/logout'
-
-        url = self.base_url + endpoint
-        response = self.requests_session.post(url=url)
-
-        # HTTP 204 - success, no content
-        response.raise_for_status()
-        return True
+        # Other threads may be merging the session headers into a request at this moment, so new header
+        # objects are built and swapped in, rather than modifying the ones that are in use
+        with self._headers_lock:
+            self.__bearer_token = bearer_token
+            api_headers = dict(self.api_headers)
+            api_headers['Authorization'] = 'Bearer {}'.format(bearer_token)
+            self._set_session_headers(api_headers)
+            self.api_headers = api_headers
+
+    # Called with the new headers (under _headers_lock) when the bearer token changes, for a subclass that keeps
+    # its own copy of them
+    def _set_session_headers(self, api_headers: Dict):
+        pass
 
     # V2 API Bearer token can be used with V1 /session/login/token for Trusted Auth flow
     # or used with each API call (no session object) or used with V2 /auth/session/login to create session
@@ -129,8 +109,6 @@ class TSRestApiV2:
                         additional_request_parameters: Optional[Dict] = None) -> Dict:
         endpoint = 'auth/token/full'
 
-        url = self.base_url + endpoint
-
         json_post_data = {
             'username': username,
             'validity_time_in_sec': validity_time_in_sec
@@ -162,10 +140,8 @@ class TSRestApiV2:
             for param in additional_request_parameters:
                 json_post_data[param] = additional_request_parameters[param]
 
-        response = self.requests_session.post(url=url, json=json_post_data)
-
-        response.raise_for_status()
-        return response.json()
+        # Issued through post_request so that subclasses (AsyncTSRestApiV2) share the same request building
+        return self.post_request(endpoint=endpoint, request=json_post_data)
 
     def auth_token_object(self, username: str, object_id: str, password: Optional[str] = None,
                           org_id: Optional[int] = None,
@@ -174,8 +150,6 @@ class TSRestApiV2:
                            email: Optional[str] = None, group_identifiers: Optional[List[str]] = None) -> Dict:
         endpoint = 'auth/token/object'
 
-        url = self.base_url + endpoint
-
         json_post_data = {
             'username': username,
             'object_id': object_id,
@@ -204,20 +178,7 @@ class TSRestApiV2:
             else:
                 raise Exception("If using auto_create=True, must include display_name and email")
 
-        response = self.requests_session.post(url=url, json=json_post_data)
-
-        response.raise_for_status()
-        return response.json()
-
-    def auth_token_revoke(self) -> bool:
-        endpoint = 'auth/token/revoke'
-
-        url = self.base_url + endpoint
-        response = self.requests_session.post(url=url)
-
-        # HTTP 204 - success, no content
-        response.raise_for_status()
-        return True
+        return self.post_request(endpoint=endpoint, request=json_post_data)
 
     #
     # Generic wrappers for the basic HTTP methods
@@ -225,35 +186,21 @@ class TSRestApiV2:
     # vs. using any of the other endpoint wrapper methods
     #
     def get_request(self, endpoint):
-        url = self.base_url + endpoint
-        response = self.requests_session.get(url=url)
-        response.raise_for_status()
-        return response.json()
+        if self.request_coalescer is not None:
+            return self.request_coalescer.call('GET', endpoint, None, lambda: self._get_request(endpoint))
+        return self._get_request(endpoint)
 
     def post_request(self, endpoint, request=None):
-        url = self.base_url + endpoint
-        if request is not None:
-            response = self.requests_session.post(url=url, json=request)
-        else:
-            response = self.requests_session.post(url=url)
+        if self.request_coalescer is not None:
+            return self.request_coalescer.call('POST', endpoint, request,
+                                               lambda: self._post_request(endpoint, request=request))
+        return self._post_request(endpoint, request=request)
 
-        response.raise_for_status()
-        # Most should return a JSON response, but things like deletes may just be 204s
-        try:
-            return response.json()
-        except requests.exceptions.JSONDecodeError:
-            return True
+    def _get_request(self, endpoint):
+        raise NotImplementedError
 
-    def post_request_binary(self, endpoint, request=None):
-        url = self.base_url + endpoint
-        if request is not None:
-            response = self.requests_session.post(url=url, json=request,
-                                                  headers={'Accept': 'application/octet-stream'})
-        else:
-            response = self.requests_session.post(url=url, headers={'Accept': 'application/octet-stream'})
-
-        response.raise_for_status()
-        return response.content
+    def _post_request(self, endpoint, request=None):
+        raise NotImplementedError
 
     #
     # Principles of individual endpoint implementations:
@@ -466,6 +413,11 @@ class TSRestApiV2:
         }
         return self.post_request(endpoint=endpoint, request=request)
 
+    # GUIDs of the imported objects, in the order the TML was sent (None for any that failed)
+    @staticmethod
+    def guids_from_imported_tml(tml_import_response: List[Dict]) -> List[Optional[str]]:
+        return [imported_object_result(imported_object)['guid'] for imported_object in tml_import_response]
+
     def metadata_tml_async_import(self, metadata_tmls: List[str], import_policy: str = 'PARTIAL',
                                   create_new: bool = False, all_orgs_context: bool = False,
                                   skip_cdw_validation_for_tables: bool = False):
@@ -473,7 +425,9 @@ class TSRestApiV2:
         request = {
             'metadata_tmls': metadata_tmls,
             'import_policy': import_policy,
-            'create_new': create_new
+            'create_new': create_new,
+            'all_orgs_context': all_orgs_context,
+            'skip_cdw_validation_for_tables': skip_cdw_validation_for_tables
         }
         return self.post_request(endpoint=endpoint, request=request)
 
@@ -540,6 +494,27 @@ class TSRestApiV2:
         endpoint = 'report/answer'
         return self.post_request_binary(endpoint=endpoint, request=request)
 
+    # Streaming versions of the /report/ endpoints, for exports too large to hold in memory
+    def report_liveboard_stream(self, request: Dict, chunk_size: int = DEFAULT_CHUNK_SIZE):
+        endpoint = 'report/liveboard'
+        return self.post_request_binary_stream(endpoint=endpoint, request=request, chunk_size=chunk_size)
+
+    def report_liveboard_to_file(self, request: Dict, destination: Destination,
+                                 chunk_size: int = DEFAULT_CHUNK_SIZE):
+        endpoint = 'report/liveboard'
+        return self.post_request_binary_to_file(endpoint=endpoint, destination=destination, request=request,
+                                                chunk_size=chunk_size)
+
+    def report_answer_stream(self, request: Dict, chunk_size: int = DEFAULT_CHUNK_SIZE):
+        endpoint = 'report/answer'
+        return self.post_request_binary_stream(endpoint=endpoint, request=request, chunk_size=chunk_size)
+
+    def report_answer_to_file(self, request: Dict, destination: Destination,
+                              chunk_size: int = DEFAULT_CHUNK_SIZE):
+        endpoint = 'report/answer'
+        return self.post_request_binary_to_file(endpoint=endpoint, destination=destination, request=request,
+                                                chunk_size=chunk_size)
+
 #
 # /security/ endpoints
 #
@@ -780,3 +755,412 @@ class TSRestApiV2:
 
         return self.post_request(endpoint=endpoint, request=request)
 
+
+class TSRestApiV2(TSRestApiV2Base):
+    """
+    The TSRestApiV2 implementation is a simple implementation to provide access to methods that
+    do not exist in V1 at this time, as well as providing a requests.Session object to issue any other
+    V2 call the user desires. It is meant as a bridge until the official V2 SDKs are available, and a companion
+    to the existing TSRestApiV1 library here
+    """
+    def __init__(self, server_url: str):
+        super().__init__(server_url=server_url)
+
+        # REST API uses cookies to maintain the session, so you need to create an open Session
+        self.requests_session = requests.Session()
+        # This sets the header on any subsequent call
+        self.requests_session.headers.update(self.api_headers)
+
+    # Other threads may be merging the session headers into a request at this moment, so a new header
+    # object is built and swapped in, rather than modifying the one that is in use
+    def _set_session_headers(self, api_headers: Dict):
+        session_headers = CaseInsensitiveDict(self.requests_session.headers)
+        session_headers.update(api_headers)
+        self.requests_session.headers = session_headers
+
+    # The following two methods allow for modifying the session for long-lived purposes, particularly TML import
+    @staticmethod
+    def get_default_tcp_keep_alive_adaptor() -> TCPKeepAliveAdapter:
+        return TCPKeepAliveAdapter(idle=120, count=20, interval=30)
+
+    def set_tcp_keep_alive_adaptor(self, tcp_keep_alive_adaptor: TCPKeepAliveAdapter):
+        self.requests_session.mount('http://', tcp_keep_alive_adaptor)
+        self.requests_session.mount('https://', tcp_keep_alive_adaptor)
+
+    # For sharing one object across many worker threads: keeps pool_maxsize connections open to the server
+    # pool_block=True waits up to pool_timeout seconds for a free connection (pool_timeout=0 fails fast)
+    def set_connection_pool(self, pool_maxsize: int = 32, pool_block: bool = True,
+                            pool_timeout: Optional[float] = None, pool_connections: int = 10) -> TSHTTPAdapter:
+        adaptor = TSHTTPAdapter(pool_connections=pool_connections, pool_maxsize=pool_maxsize,
+                                pool_block=pool_block, pool_timeout=pool_timeout)
+        adaptor.inherit_policies(self.requests_session.get_adapter(self.server))
+        self.set_tcp_keep_alive_adaptor(adaptor)
+        return adaptor
+
+    # Retries throttled / unavailable responses on every method, see RetryPolicy for which calls are retried
+    # retry_policy.counters reports how many retries have happened
+    def set_retry_policy(self, retry_policy: Optional[RetryPolicy]):
+        self.get_transport_adaptor().retry_policy = retry_policy
+
+    # Per endpoint-family budgets of requests per second and requests in flight, see RateLimiter
+    def set_rate_limiter(self, rate_limiter: Optional[RateLimiter]):
+        self.get_transport_adaptor().rate_limiter = rate_limiter
+
+    # Sends large request bodies (TML import) gzip / deflate compressed, see RequestCompression
+    def set_request_compression(self, request_compression: Optional[RequestCompression]):
+        self.get_transport_adaptor().request_compression = request_compression
+
+    # Sends all calls over HTTP/2, multiplexing concurrent calls over max_connections connections (requires httpx)
+    # prior_knowledge=True is needed for a plain http:// server
+    def set_http2_transport(self, max_connections: int = 10, prior_knowledge: bool = False) -> TSHTTP2Adapter:
+        adaptor = TSHTTP2Adapter(max_connections=max_connections, prior_knowledge=prior_knowledge)
+        adaptor.inherit_policies(self.requests_session.get_adapter(self.server))
+        self.set_tcp_keep_alive_adaptor(adaptor)
+        return adaptor
+
+    # Returns the TSHTTPAdapter (or TSHTTP2Adapter) mounted for the server, mounting a TSHTTPAdapter with the
+    # default settings if necessary
+    def get_transport_adaptor(self) -> Union[TSHTTPAdapter, TSHTTP2Adapter]:
+        adaptor = self.requests_session.get_adapter(self.server)
+        if not isinstance(adaptor, TransportPoliciesMixin):
+            adaptor = TSHTTPAdapter()
+            self.set_tcp_keep_alive_adaptor(adaptor)
+        return adaptor
+
+    # Mints the bearer token now with auth_token_full(), then mints a new one shortly before each expires,
+    # so long-running jobs never send an expired token. See BearerTokenManager
+    def set_managed_bearer_token(self, username: str, password: Optional[str] = None,
+                                 secret_key: Optional[str] = None, org_id: Optional[int] = None,
+                                 validity_time_in_sec: int = 300, refresh_margin_sec: Optional[float] = None,
+                                 additional_request_parameters: Optional[Dict] = None) -> BearerTokenManager:
+        token_manager = BearerTokenManager(self, username=username, password=password, secret_key=secret_key,
+                                           org_id=org_id, validity_time_in_sec=validity_time_in_sec,
+                                           refresh_margin_sec=refresh_margin_sec,
+                                           additional_request_parameters=additional_request_parameters)
+        token_manager.refresh()
+        self.requests_session.auth = ManagedBearerAuth(token_manager)
+        return token_manager
+
+    #
+    # Session management calls
+    # - up here vs. in the SESSION section below (because these two are required)
+    #
+    def auth_session_login(self,  username: Optional[str] = None, password: Optional[str] = None,
+                           remember_me: bool = True,
+                           bearer_token: Optional[str] = None,
+                           org_identifier: Optional[int] = None) -> requests.Session:
+        endpoint = 'auth/session/login'
+
+        url = self.base_url + endpoint
+
+        if bearer_token is not None:
+            response = self.requests_session.post(url=url,
+                                                  headers={"Authorization": "Bearer {}".format(bearer_token)},
+                                                  json={'remember_me': str(remember_me).lower()})
+        elif username is not None and password is not None:
+            json_post_data = {
+                'username': username,
+                'password': password,
+                'remember_me': str(remember_me).lower()
+            }
+            if org_identifier is not None:
+                json_post_data["org_identifier"] = org_identifier
+            response = self.requests_session.post(url=url, json=json_post_data)
+        else:
+            raise Exception("If using username/password, must include both")
+
+        # HTTP 204 - success, no content
+        response.raise_for_status()
+        return self.requests_session
+
+    def auth_session_logout(self) -> bool:
+        endpoint = 'auth/session/logout'
+
+        url = self.base_url + endpoint
+        response = self.requests_session.post(url=url)
+
+        # HTTP 204 - success, no content
+        response.raise_for_status()
+        return True
+
+    def auth_token_revoke(self) -> bool:
+        endpoint = 'auth/token/revoke'
+
+        url = self.base_url + endpoint
+        response = self.requests_session.post(url=url)
+
+        # HTTP 204 - success, no content
+        response.raise_for_status()
+        return True
+
+    #
+    # The basic HTTP methods behind get_request() / post_request(), sent through the requests.Session
+    #
+    def _get_request(self, endpoint):
+        url = self.base_url + endpoint
+        response = self.requests_session.get(url=url)
+        response.raise_for_status()
+        return response.json()
+
+    def _post_request(self, endpoint, request=None):
+        url = self.base_url + endpoint
+        if request is not None:
+            response = self.requests_session.post(url=url, json=request)
+        else:
+            response = self.requests_session.post(url=url)
+
+        response.raise_for_status()
+        # Most should return a JSON response, but things like deletes may just be 204s
+        try:
+            return response.json()
+        except requests.exceptions.JSONDecodeError:
+            return True
+
+    def post_request_binary(self, endpoint, request=None):
+        url = self.base_url + endpoint
+        if request is not None:
+            response = self.requests_session.post(url=url, json=request,
+                                                  headers={'Accept': 'application/octet-stream'})
+        else:
+            response = self.requests_session.post(url=url, headers={'Accept': 'application/octet-stream'})
+
+        response.raise_for_status()
+        return response.content
+
+    # Streaming version of post_request_binary() for large exports: yields the response in chunks as it arrives
+    # The request is sent (and any HTTP error raised) immediately, before iterating
+    def post_request_binary_stream(self, endpoint, request=None,
+                                   chunk_size: int = DEFAULT_CHUNK_SIZE) -> Iterator[bytes]:
+        url = self.base_url + endpoint
+        if request is not None:
+            response = self.requests_session.post(url=url, json=request,
+                                                  headers={'Accept': 'application/octet-stream'}, stream=True)
+        else:
+            response = self.requests_session.post(url=url, headers={'Accept': 'application/octet-stream'},
+                                                  stream=True)
+
+        # Error responses are small, so read in full to be available on the raised HTTPError
+        if not response.ok:
+            response.content
+        response.raise_for_status()
+        return iter_response_content(response, chunk_size=chunk_size)
+
+    # Writes the response directly to a file path or open binary file object, returning the number of bytes written
+    def post_request_binary_to_file(self, endpoint, destination: Destination, request=None,
+                                    chunk_size: int = DEFAULT_CHUNK_SIZE) -> int:
+        chunks = self.post_request_binary_stream(endpoint=endpoint, request=request, chunk_size=chunk_size)
+        return write_chunks(chunks, destination)
+
+    #
+    # Helpers that call the endpoint methods of TSRestApiV2Base many times, on worker threads
+    #
+    # Yields every user matching the search, requesting record_size at a time on up to max_workers threads.
+    # Users come out in the order the server returns them, each only once even if users are created or deleted
+    # during the scan, see pagination.UniqueItemsMerge
+    def users_search_iter(self, request: Dict, record_size: int = DEFAULT_PAGE_SIZE,
+                          max_workers: int = 4) -> Iterator[Dict]:
+        def fetch_page(record_offset: int, page_size: int) -> List:
+            return self.users_search(request=page_request(request, record_offset, page_size))
+
+        return iter_unique_items(fetch_page, record_size=record_size, record_offset=request.get('record_offset', 0),
+                                 max_workers=max_workers, key='id')
+
+    # Same as users_search_iter(), for groups
+    def groups_search_iter(self, request: Dict, record_size: int = DEFAULT_PAGE_SIZE,
+                           max_workers: int = 4) -> Iterator[Dict]:
+        def fetch_page(record_offset: int, page_size: int) -> List:
+            return self.groups_search(request=page_request(request, record_offset, page_size))
+
+        return iter_unique_items(fetch_page, record_size=record_size, record_offset=request.get('record_offset', 0),
+                                 max_workers=max_workers, key='id')
+
+    # Yields every result of the search, requesting record_size at a time (starting from any record_offset
+    # in the request), with read_ahead pages requested in the background while the current one is processed
+    def metadata_search_iter(self, request: Dict, record_size: int = DEFAULT_PAGE_SIZE,
+                             read_ahead: int = 1) -> Iterator[Dict]:
+        def fetch_page(record_offset: int, page_size: int) -> List:
+            return self.metadata_search(request=page_request(request, record_offset, page_size))
+
+        for page in iter_pages(fetch_page, record_size=record_size, record_offset=request.get('record_offset', 0),
+                               read_ahead=read_ahead):
+            for header in page:
+                yield header
+
+    # Imports any number of TML documents (YAML / JSON strings or dicts) in dependency order, table -> worksheet /
+    # view -> answer -> liveboard, as chunks of chunk_size documents on max_workers threads per wave, with the new
+    # GUIDs of each wave set in the references of the later ones. Returns a result per document, see WaveTMLImporter
+    def metadata_tml_import_waves(self, tml_documents: List[Union[str, Dict]], import_policy: str = 'ALL_OR_NONE',
+                                  create_new: bool = False, chunk_size: int = DEFAULT_TML_IMPORT_CHUNK_SIZE,
+                                  max_workers: int = 4, skip_dependents_of_failed: bool = True) -> List[Dict]:
+        def import_chunk(metadata_tmls: List[str]) -> List[Dict]:
+            return self.metadata_tml_import(metadata_tmls=metadata_tmls, import_policy=import_policy,
+                                            create_new=create_new)
+
+        importer = WaveTMLImporter(import_chunk, chunk_size=chunk_size, max_workers=max_workers,
+                                   skip_dependents_of_failed=skip_dependents_of_failed)
+        return importer.import_documents(tml_documents)
+
+    # Submits async imports and polls all of their statuses together, returning a Future per import.
+    # See TMLImportJobManager
+    def metadata_tml_async_import_manager(self, poll_interval_sec: float = 1.0, max_poll_interval_sec: float = 30.0,
+                                          backoff_factor: float = 2.0,
+                                          include_import_response: bool = True,
+                                          max_poll_failures: int = 5) -> TMLImportJobManager:
+        return TMLImportJobManager(self, poll_interval_sec=poll_interval_sec,
+                                   max_poll_interval_sec=max_poll_interval_sec, backoff_factor=backoff_factor,
+                                   include_import_response=include_import_response, max_poll_failures=max_poll_failures)
+
+    # Exports the TML of every GUID in metadata_ids, or of every object found by metadata_search_request, in requests
+    # of batch_size objects on max_workers threads. Yields (guid, edoc, error) as each request completes, with error
+    # None for objects that exported, so a failing object does not stop the others. See BulkTMLExporter
+    def metadata_tml_export_bulk(self, metadata_ids: Optional[Iterable[str]] = None,
+                                 metadata_search_request: Optional[Dict] = None, export_fqn: bool = False,
+                                 edoc_format: Optional[str] = None, export_schema_version: Optional[str] = None,
+                                 batch_size: int = DEFAULT_TML_EXPORT_BATCH_SIZE,
+                                 max_workers: int = 4) -> Iterator[TMLExportResult]:
+        if metadata_ids is None:
+            if metadata_search_request is None:
+                raise Exception("metadata_tml_export_bulk() requires either metadata_ids or metadata_search_request")
+            metadata_ids = (header['metadata_id']
+                            for header in self.metadata_search_iter(request=metadata_search_request))
+
+        def export_objects(guids: List[str]) -> List[Dict]:
+            return self.metadata_tml_export(metadata_ids=guids, export_associated=False, export_fqn=export_fqn,
+                                            edoc_format=edoc_format, export_schema_version=export_schema_version)
+
+        exporter = BulkTMLExporter(export_objects, batch_size=batch_size, max_workers=max_workers)
+        return exporter.export(metadata_ids)
+
+    # Resumable export of everything the batch endpoint returns for request, batch_size objects per batch with
+    # max_workers batches in flight, recording progress in journal_path. See TMLExportBatchJob
+    def metadata_tml_export_batch_job(self, request: Dict, journal_path: str,
+                                      batch_size: int = DEFAULT_TML_EXPORT_BATCH_SIZE,
+                                      max_workers: int = 4) -> TMLExportBatchJob:
+        return TMLExportBatchJob(lambda batch_request: self.metadata_tml_export_batch(request=batch_request),
+                                 request=request, journal_path=journal_path, batch_size=batch_size,
+                                 max_workers=max_workers)
+
+    #
+    # Streaming versions of the data methods, for results of any size in constant memory
+    # The *_batches() methods yield the 'contents' of each page of record_size rows ('column_names', 'data_rows'...)
+    # and the *_rows() methods yield the rows themselves. read_ahead pages are requested in the background while
+    # the current one is processed, and nothing is kept once the caller moves on to the next page
+    #
+    def searchdata_batches(self, request: Dict, record_size: int = DEFAULT_DATA_PAGE_SIZE,
+                           read_ahead: int = 1) -> Iterator[Dict]:
+        def fetch_page(record_offset: int, page_size: int) -> Dict:
+            return data_page_contents(self.searchdata(request=page_request(request, record_offset, page_size)))
+
+        return iter_pages(fetch_page, record_size=record_size, record_offset=request.get('record_offset', 0),
+                          read_ahead=read_ahead, page_length=data_page_length)
+
+    def searchdata_rows(self, request: Dict, record_size: int = DEFAULT_DATA_PAGE_SIZE,
+                        read_ahead: int = 1) -> Iterator:
+        return iter_data_rows(self.searchdata_batches(request=request, record_size=record_size,
+                                                      read_ahead=read_ahead))
+
+    def metadata_answer_data_batches(self, request: Dict, record_size: int = DEFAULT_DATA_PAGE_SIZE,
+                                     read_ahead: int = 1) -> Iterator[Dict]:
+        def fetch_page(record_offset: int, page_size: int) -> Dict:
+            return data_page_contents(self.metadata_answer_data(request=page_request(request, record_offset,
+                                                                                     page_size)))
+
+        return iter_pages(fetch_page, record_size=record_size, record_offset=request.get('record_offset', 0),
+                          read_ahead=read_ahead, page_length=data_page_length)
+
+    def metadata_answer_data_rows(self, request: Dict, record_size: int = DEFAULT_DATA_PAGE_SIZE,
+                                  read_ahead: int = 1) -> Iterator:
+        return iter_data_rows(self.metadata_answer_data_batches(request=request, record_size=record_size,
+                                                                read_ahead=read_ahead))
+
+    # Each visualization of the Liveboard is paged through in turn, so each batch has the 'visualization_id'
+    # and 'visualization_name' it belongs to. The first page of every visualization comes from a single request
+    def metadata_liveboard_data_batches(self, request: Dict, record_size: int = DEFAULT_DATA_PAGE_SIZE,
+                                        read_ahead: int = 1) -> Iterator[Dict]:
+        record_offset = request.get('record_offset', 0)
+        first_pages = self.metadata_liveboard_data(request=page_request(request, record_offset, record_size))
+        for contents in first_pages.get('contents', []):
+            yield contents
+            if data_page_length(contents) < record_size:
+                continue
+
+            viz_request = dict(request)
+            viz_request['visualization_identifiers'] = [contents['visualization_id']]
+
+            def fetch_page(page_offset: int, page_size: int, viz_request=viz_request) -> Dict:
+                return data_page_contents(self.metadata_liveboard_data(request=page_request(viz_request, page_offset,
+                                                                                            page_size)))
+
+            for page in iter_pages(fetch_page, record_size=record_size, record_offset=record_offset + record_size,
+                                   read_ahead=read_ahead, page_length=data_page_length):
+                yield page
+
+    # Rows of a single visualization on the Liveboard
+    def metadata_liveboard_data_rows(self, request: Dict, visualization_identifier: str,
+                                     record_size: int = DEFAULT_DATA_PAGE_SIZE, read_ahead: int = 1) -> Iterator:
+        viz_request = dict(request)
+        viz_request['visualization_identifiers'] = [visualization_identifier]
+        return iter_data_rows(self.metadata_liveboard_data_batches(request=viz_request, record_size=record_size,
+                                                                   read_ahead=read_ahead))
+
+    # pandas DataFrames of every row, built column-wise from COMPACT pages (see DataFrameBuilder for column_types
+    # and the categorical options). Requires pandas: pip install thoughtspot_rest_api_v1[pandas]
+    def searchdata_dataframe(self, request: Dict, column_types: Optional[Dict[str, str]] = None,
+                             record_size: int = DEFAULT_DATA_PAGE_SIZE, **builder_options):
+        builder = DataFrameBuilder(column_types=column_types, **builder_options)
+        compact_request = dict(request, data_format='COMPACT')
+        builder.add_pages(self.searchdata_batches(request=compact_request, record_size=record_size))
+        return builder.build()
+
+    def metadata_answer_data_dataframe(self, request: Dict, column_types: Optional[Dict[str, str]] = None,
+                                       record_size: int = DEFAULT_DATA_PAGE_SIZE, **builder_options):
+        builder = DataFrameBuilder(column_types=column_types, **builder_options)
+        compact_request = dict(request, data_format='COMPACT')
+        builder.add_pages(self.metadata_answer_data_batches(request=compact_request, record_size=record_size))
+        return builder.build()
+
+    # Dict of visualization_id: DataFrame, one for each visualization of the Liveboard
+    def metadata_liveboard_data_dataframes(self, request: Dict, column_types: Optional[Dict[str, str]] = None,
+                                           record_size: int = DEFAULT_DATA_PAGE_SIZE, **builder_options) -> Dict:
+        compact_request = dict(request, data_format='COMPACT')
+        return liveboard_data_to_dataframes(self.metadata_liveboard_data_batches(request=compact_request,
+                                                                                 record_size=record_size),
+                                            column_types=column_types, **builder_options)
+
+    # Fetches a range of any length (end defaults to now) as windows of at most window_millis on max_workers threads,
+    # splitting windows that return max_events_per_window or more events or time out. See LogWindowSplitter
+    # Returns all events in time order, with events repeated at the window boundaries removed
+    def logs_fetch_bulk(self, start_epoch_time_in_millis: int, end_epoch_time_in_millis: Optional[int] = None,
+                        log_type: str = 'SECURITY_AUDIT', window_millis: int = DEFAULT_WINDOW_MILLIS,
+                        max_workers: int = 4, max_events_per_window: Optional[int] = 10000,
+                        min_window_millis: int = 60 * 1000) -> List[Dict]:
+        if end_epoch_time_in_millis is None:
+            end_epoch_time_in_millis = int(time.time() * 1000)
+
+        def fetch_window(window_start: int, window_end: int) -> List[Dict]:
+            events = self.logs_fetch(log_type=log_type, start_epoch_time_in_millis=window_start,
+                                     end_epoch_time_in_millis=window_end)
+            # An empty response body comes back as True from post_request()
+            return events if isinstance(events, list) else []
+
+        splitter = LogWindowSplitter(fetch_window, window_millis=window_millis, max_workers=max_workers,
+                                     max_events_per_window=max_events_per_window,
+                                     min_window_millis=min_window_millis)
+        return splitter.fetch(start_epoch_time_in_millis, end_epoch_time_in_millis)
+
+    # LogTailer delivering new events of log_type, resuming from checkpoint (a LogCheckpoint or path of a JSON file)
+    # Use tailer.tail() as a generator, or tailer.run(callback)
+    def logs_tailer(self, checkpoint: Union[LogCheckpoint, str], log_type: str = 'SECURITY_AUDIT',
+                    start_epoch_time_in_millis: Optional[int] = None, overlap_millis: int = 5 * 60 * 1000,
+                    poll_interval_sec: float = 60) -> LogTailer:
+        if isinstance(checkpoint, str):
+            checkpoint = FileLogCheckpoint(checkpoint)
+
+        def fetch_range(range_start: int, range_end: int) -> List[Dict]:
+            events = self.logs_fetch(log_type=log_type, start_epoch_time_in_millis=range_start,
+                                     end_epoch_time_in_millis=range_end)
+            return events if isinstance(events, list) else []
+
+        return LogTailer(fetch_range, checkpoint, start_epoch_time_in_millis=start_epoch_time_in_millis,
+                         overlap_millis=overlap_millis, poll_interval_sec=poll_interval_sec)
+
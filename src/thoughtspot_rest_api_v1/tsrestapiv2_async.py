@@ -0,0 +1,383 @@
+import asyncio
+from typing import Optional, Dict, List, AsyncIterator
+
+try:
+    import httpx
+except ImportError:  # pragma: no cover - optional dependency, see the 'async' extra
+    httpx = None
+
+from .tsrestapiv2 import TSRestApiV2Base
+from .retry import RetryPolicy
+from .rate_limit import RateLimiter
+from .streaming import Destination, DEFAULT_CHUNK_SIZE
+from .pagination import aiter_pages, aiter_unique_items, page_request, DEFAULT_PAGE_SIZE
+from .pagination import data_page_contents, data_page_length, DEFAULT_DATA_PAGE_SIZE
+from .dataframes import DataFrameBuilder, LiveboardDataFrameBuilder
+from .tml_import import AsyncTMLImportJobManager
+
+
+#
+# asyncio version of TSRestApiV2
+# Every endpoint method of TSRestApiV2Base ends in 'return self.get_request()' or 'return self.post_request()'
+# (or post_request_binary()), so implementing those base methods as coroutines means every endpoint method
+# returns an awaitable here, without reimplementing any of them:
+#
+#    ts = AsyncTSRestApiV2(server_url=server)
+#    auth_token_response = await ts.auth_token_full(username=username, password=password)
+#    ts.bearer_token = auth_token_response['token']
+#    users = await ts.users_search(request={})
+#
+
+class AsyncTSRestApiV2(TSRestApiV2Base):
+    """
+    AsyncTSRestApiV2 has the same endpoint methods as TSRestApiV2, but issues all calls through an
+    httpx.AsyncClient so that a single event loop can keep many requests in flight at once. Each endpoint method
+    returns an awaitable. Authentication is shared with TSRestApiV2: auth_token_full() builds the same request,
+    and setting the bearer_token property sets the header used on every subsequent call.
+
+    Of the request policies, set_retry_policy(), set_rate_limiter() and set_request_coalescer() apply to every
+    call. The connection pool size and HTTP/2 are set by the max_connections and http2 arguments here. The
+    requests.Session transport settings, and the helpers that run endpoint methods on worker threads, are only
+    on TSRestApiV2.
+
+    Requires the optional httpx package: pip install thoughtspot_rest_api_v1[async]
+    """
+    def __init__(self, server_url: str, max_connections: int = 100, timeout: Optional[float] = None,
+                 http2: bool = False):
+        if httpx is None:
+            raise ImportError("AsyncTSRestApiV2 requires the httpx package: "
+                              "pip install thoughtspot_rest_api_v1[async]")
+        super().__init__(server_url=server_url)
+
+        # requests has no default timeout, so match that unless a timeout is specified
+        limits = httpx.Limits(max_connections=max_connections, max_keepalive_connections=max_connections)
+        # http2=True multiplexes the concurrent calls over fewer connections (requires the h2 package)
+        self.async_client = httpx.AsyncClient(limits=limits, timeout=timeout, http2=http2)
+        self.retry_policy = None
+        self.rate_limiter = None
+
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, exc_type, exc_val, exc_tb):
+        await self.aclose()
+
+    async def aclose(self):
+        await self.async_client.aclose()
+
+    # Same RetryPolicy as TSRestApiV2.set_retry_policy(), with the backoff awaited rather than slept
+    def set_retry_policy(self, retry_policy: Optional[RetryPolicy]):
+        self.retry_policy = retry_policy
+
+    # Same RateLimiter as TSRestApiV2.set_rate_limiter(), waiting without blocking the event loop
+    def set_rate_limiter(self, rate_limiter: Optional[RateLimiter]):
+        self.rate_limiter = rate_limiter
+
+    # Polling runs as a task on the event loop rather than on a thread
+    def metadata_tml_async_import_manager(self, poll_interval_sec: float = 1.0, max_poll_interval_sec: float = 30.0,
+                                          backoff_factor: float = 2.0,
+                                          include_import_response: bool = True,
+                                          max_poll_failures: int = 5) -> AsyncTMLImportJobManager:
+        return AsyncTMLImportJobManager(self, poll_interval_sec=poll_interval_sec,
+                                        max_poll_interval_sec=max_poll_interval_sec, backoff_factor=backoff_factor,
+                                        include_import_response=include_import_response,
+                                        max_poll_failures=max_poll_failures)
+
+    # stream=True returns once the headers arrive, with the body left to be read (and the response closed)
+    async def _send(self, method: str, url: str, stream: bool = False, **kwargs):
+        retry_policy = self.retry_policy
+        if retry_policy is None:
+            return await self._send_once(method, url, stream=stream, **kwargs)
+
+        attempt = 0
+        while True:
+            retry_policy.count_request()
+            try:
+                response = await self._send_once(method, url, stream=stream, **kwargs)
+            except httpx.TransportError as e:
+                request_sent = not isinstance(e, (httpx.ConnectError, httpx.ConnectTimeout))
+                if not retry_policy.should_retry_connection_failure(method, url, request_sent=request_sent,
+                                                                    attempt=attempt):
+                    raise
+                await asyncio.sleep(retry_policy.get_backoff(attempt))
+                attempt += 1
+                continue
+
+            if not retry_policy.should_retry_status(method, url, response.status_code, attempt):
+                return response
+            await response.aclose()
+            await asyncio.sleep(retry_policy.get_backoff(attempt, response.headers.get('Retry-After')))
+            attempt += 1
+
+    async def _send_once(self, method: str, url: str, stream: bool = False, **kwargs):
+        request = self.async_client.build_request(method, url, **kwargs)
+        if self.rate_limiter is None:
+            return await self.async_client.send(request, stream=stream)
+        async with self.rate_limiter.async_limit(url):
+            return await self.async_client.send(request, stream=stream)
+
+    #
+    # Session management calls that use the session directly rather than the base methods
+    #
+    async def auth_session_login(self, username: Optional[str] = None, password: Optional[str] = None,
+                                 remember_me: bool = True,
+                                 bearer_token: Optional[str] = None,
+                                 org_identifier: Optional[int] = None):
+        endpoint = 'auth/session/login'
+
+        url = self.base_url + endpoint
+
+        if bearer_token is not None:
+            headers = dict(self.api_headers)
+            headers['Authorization'] = 'Bearer {}'.format(bearer_token)
+            response = await self._send('POST', url, headers=headers,
+                                        json={'remember_me': str(remember_me).lower()})
+        elif username is not None and password is not None:
+            json_post_data = {
+                'username': username,
+                'password': password,
+                'remember_me': str(remember_me).lower()
+            }
+            if org_identifier is not None:
+                json_post_data["org_identifier"] = org_identifier
+            response = await self._send('POST', url, headers=self.api_headers, json=json_post_data)
+        else:
+            raise Exception("If using username/password, must include both")
+
+        # HTTP 204 - success, no content
+        response.raise_for_status()
+        return self.async_client
+
+    async def auth_session_logout(self) -> bool:
+        endpoint = 'auth/session/logout'
+
+        url = self.base_url + endpoint
+        response = await self._send('POST', url, headers=self.api_headers)
+
+        # HTTP 204 - success, no content
+        response.raise_for_status()
+        return True
+
+    async def auth_token_revoke(self) -> bool:
+        endpoint = 'auth/token/revoke'
+
+        url = self.base_url + endpoint
+        response = await self._send('POST', url, headers=self.api_headers)
+
+        # HTTP 204 - success, no content
+        response.raise_for_status()
+        return True
+
+    #
+    # Generic wrappers for the basic HTTP methods, as coroutines
+    # api_headers is passed on each call so a new bearer_token takes effect immediately
+    #
+    async def get_request(self, endpoint):
+        if self.request_coalescer is not None:
+            return await self.request_coalescer.async_call('GET', endpoint, None,
+                                                           lambda: self._get_request(endpoint))
+        return await self._get_request(endpoint)
+
+    async def post_request(self, endpoint, request=None):
+        if self.request_coalescer is not None:
+            return await self.request_coalescer.async_call('POST', endpoint, request,
+                                                           lambda: self._post_request(endpoint, request=request))
+        return await self._post_request(endpoint, request=request)
+
+    async def _get_request(self, endpoint):
+        url = self.base_url + endpoint
+        response = await self._send('GET', url, headers=self.api_headers)
+        response.raise_for_status()
+        return response.json()
+
+    async def _post_request(self, endpoint, request=None):
+        url = self.base_url + endpoint
+        if request is not None:
+            response = await self._send('POST', url, json=request, headers=self.api_headers)
+        else:
+            response = await self._send('POST', url, headers=self.api_headers)
+
+        response.raise_for_status()
+        # Most should return a JSON response, but things like deletes may just be 204s
+        try:
+            return response.json()
+        except ValueError:
+            return True
+
+    async def post_request_binary(self, endpoint, request=None):
+        url = self.base_url + endpoint
+        headers = dict(self.api_headers)
+        headers['Accept'] = 'application/octet-stream'
+        if request is not None:
+            response = await self._send('POST', url, json=request, headers=headers)
+        else:
+            response = await self._send('POST', url, headers=headers)
+
+        response.raise_for_status()
+        return response.content
+
+    # Streaming version of post_request_binary(), returning an async iterator of chunks:
+    #    async for chunk in await ts.report_liveboard_stream(request=request): ...
+    async def post_request_binary_stream(self, endpoint, request=None, chunk_size: int = DEFAULT_CHUNK_SIZE):
+        url = self.base_url + endpoint
+        headers = dict(self.api_headers)
+        headers['Accept'] = 'application/octet-stream'
+        if request is not None:
+            response = await self._send('POST', url, stream=True, json=request, headers=headers)
+        else:
+            response = await self._send('POST', url, stream=True, headers=headers)
+
+        # Error responses are small, so read in full to be available on the raised HTTPStatusError
+        if response.is_error:
+            await response.aread()
+            await response.aclose()
+        response.raise_for_status()
+        return self._aiter_response_content(response, chunk_size=chunk_size)
+
+    @staticmethod
+    async def _aiter_response_content(response, chunk_size: int):
+        try:
+            async for chunk in response.aiter_bytes(chunk_size=chunk_size):
+                yield chunk
+        finally:
+            await response.aclose()
+
+    async def post_request_binary_to_file(self, endpoint, destination: Destination, request=None,
+                                          chunk_size: int = DEFAULT_CHUNK_SIZE) -> int:
+        chunks = await self.post_request_binary_stream(endpoint=endpoint, request=request, chunk_size=chunk_size)
+        bytes_written = 0
+        fh = open(destination, 'wb') if isinstance(destination, str) else destination
+        try:
+            async for chunk in chunks:
+                fh.write(chunk)
+                bytes_written += len(chunk)
+        finally:
+            if isinstance(destination, str):
+                fh.close()
+        return bytes_written
+
+    #
+    # Paging iterators, as async generators:
+    #    async for header in ts.metadata_search_iter(request=request): ...
+    #
+    async def metadata_search_iter(self, request: Dict, record_size: int = DEFAULT_PAGE_SIZE,
+                                   read_ahead: int = 1) -> AsyncIterator[Dict]:
+        async def fetch_page(record_offset: int, page_size: int) -> List:
+            return await self.metadata_search(request=page_request(request, record_offset, page_size))
+
+        async for page in aiter_pages(fetch_page, record_size=record_size,
+                                      record_offset=request.get('record_offset', 0), read_ahead=read_ahead):
+            for header in page:
+                yield header
+
+    async def users_search_iter(self, request: Dict, record_size: int = DEFAULT_PAGE_SIZE,
+                                max_workers: int = 4) -> AsyncIterator[Dict]:
+        async def fetch_page(record_offset: int, page_size: int) -> List:
+            return await self.users_search(request=page_request(request, record_offset, page_size))
+
+        async for user in aiter_unique_items(fetch_page, record_size=record_size,
+                                             record_offset=request.get('record_offset', 0),
+                                             max_workers=max_workers, key='id'):
+            yield user
+
+    async def groups_search_iter(self, request: Dict, record_size: int = DEFAULT_PAGE_SIZE,
+                                 max_workers: int = 4) -> AsyncIterator[Dict]:
+        async def fetch_page(record_offset: int, page_size: int) -> List:
+            return await self.groups_search(request=page_request(request, record_offset, page_size))
+
+        async for group in aiter_unique_items(fetch_page, record_size=record_size,
+                                              record_offset=request.get('record_offset', 0),
+                                              max_workers=max_workers, key='id'):
+            yield group
+
+    async def searchdata_batches(self, request: Dict, record_size: int = DEFAULT_DATA_PAGE_SIZE,
+                                 read_ahead: int = 1) -> AsyncIterator[Dict]:
+        async def fetch_page(record_offset: int, page_size: int) -> Dict:
+            return data_page_contents(await self.searchdata(request=page_request(request, record_offset, page_size)))
+
+        async for contents in aiter_pages(fetch_page, record_size=record_size,
+                                          record_offset=request.get('record_offset', 0), read_ahead=read_ahead,
+                                          page_length=data_page_length):
+            yield contents
+
+    async def searchdata_rows(self, request: Dict, record_size: int = DEFAULT_DATA_PAGE_SIZE,
+                              read_ahead: int = 1) -> AsyncIterator:
+        async for contents in self.searchdata_batches(request=request, record_size=record_size,
+                                                      read_ahead=read_ahead):
+            for row in contents.get('data_rows', []):
+                yield row
+
+    async def metadata_answer_data_batches(self, request: Dict, record_size: int = DEFAULT_DATA_PAGE_SIZE,
+                                           read_ahead: int = 1) -> AsyncIterator[Dict]:
+        async def fetch_page(record_offset: int, page_size: int) -> Dict:
+            return data_page_contents(await self.metadata_answer_data(request=page_request(request, record_offset,
+                                                                                           page_size)))
+
+        async for contents in aiter_pages(fetch_page, record_size=record_size,
+                                          record_offset=request.get('record_offset', 0), read_ahead=read_ahead,
+                                          page_length=data_page_length):
+            yield contents
+
+    async def metadata_answer_data_rows(self, request: Dict, record_size: int = DEFAULT_DATA_PAGE_SIZE,
+                                        read_ahead: int = 1) -> AsyncIterator:
+        async for contents in self.metadata_answer_data_batches(request=request, record_size=record_size,
+                                                                read_ahead=read_ahead):
+            for row in contents.get('data_rows', []):
+                yield row
+
+    async def metadata_liveboard_data_batches(self, request: Dict, record_size: int = DEFAULT_DATA_PAGE_SIZE,
+                                              read_ahead: int = 1) -> AsyncIterator[Dict]:
+        record_offset = request.get('record_offset', 0)
+        first_pages = await self.metadata_liveboard_data(request=page_request(request, record_offset, record_size))
+        for contents in first_pages.get('contents', []):
+            yield contents
+            if data_page_length(contents) < record_size:
+                continue
+
+            viz_request = dict(request)
+            viz_request['visualization_identifiers'] = [contents['visualization_id']]
+
+            async def fetch_page(page_offset: int, page_size: int, viz_request=viz_request) -> Dict:
+                return data_page_contents(await self.metadata_liveboard_data(
+                    request=page_request(viz_request, page_offset, page_size)))
+
+            async for page in aiter_pages(fetch_page, record_size=record_size,
+                                          record_offset=record_offset + record_size, read_ahead=read_ahead,
+                                          page_length=data_page_length):
+                yield page
+
+    async def metadata_liveboard_data_rows(self, request: Dict, visualization_identifier: str,
+                                           record_size: int = DEFAULT_DATA_PAGE_SIZE,
+                                           read_ahead: int = 1) -> AsyncIterator:
+        viz_request = dict(request)
+        viz_request['visualization_identifiers'] = [visualization_identifier]
+        async for contents in self.metadata_liveboard_data_batches(request=viz_request, record_size=record_size,
+                                                                   read_ahead=read_ahead):
+            for row in contents.get('data_rows', []):
+                yield row
+
+    async def searchdata_dataframe(self, request: Dict, column_types: Optional[Dict[str, str]] = None,
+                                   record_size: int = DEFAULT_DATA_PAGE_SIZE, **builder_options):
+        builder = DataFrameBuilder(column_types=column_types, **builder_options)
+        async for contents in self.searchdata_batches(request=dict(request, data_format='COMPACT'),
+                                                      record_size=record_size):
+            builder.add_page(contents)
+        return builder.build()
+
+    async def metadata_answer_data_dataframe(self, request: Dict, column_types: Optional[Dict[str, str]] = None,
+                                             record_size: int = DEFAULT_DATA_PAGE_SIZE, **builder_options):
+        builder = DataFrameBuilder(column_types=column_types, **builder_options)
+        async for contents in self.metadata_answer_data_batches(request=dict(request, data_format='COMPACT'),
+                                                                record_size=record_size):
+            builder.add_page(contents)
+        return builder.build()
+
+    async def metadata_liveboard_data_dataframes(self, request: Dict, column_types: Optional[Dict[str, str]] = None,
+                                                 record_size: int = DEFAULT_DATA_PAGE_SIZE,
+                                                 **builder_options) -> Dict:
+        builder = LiveboardDataFrameBuilder(column_types=column_types, **builder_options)
+        async for contents in self.metadata_liveboard_data_batches(request=dict(request, data_format='COMPACT'),
+                                                                   record_size=record_size):
+            builder.add_page(contents)
+        return builder.build()
+
@@ -0,0 +1,61 @@
+import asyncio
+
+import pytest
+
+httpx = pytest.importorskip('httpx')
+
+from thoughtspot_rest_api_v1 import AsyncTSRestApiV2, TSRestApiV2, RetryPolicy, RateLimiter, RateLimit
+
+
+def client_with(handler):
+    ts = AsyncTSRestApiV2(server_url='https://ts.example.com/')
+    ts.async_client = httpx.AsyncClient(transport=httpx.MockTransport(handler))
+    return ts
+
+
+# The requests.Session transport settings and the thread-based helpers are not inherited
+@pytest.mark.parametrize('method_name', ['set_tcp_keep_alive_adaptor', 'set_connection_pool', 'set_http2_transport',
+                                         'get_transport_adaptor', 'set_request_compression',
+                                         'set_managed_bearer_token', 'logs_fetch_bulk', 'logs_tailer',
+                                         'metadata_tml_export_bulk', 'metadata_tml_export_batch_job',
+                                         'metadata_tml_import_waves'])
+def test_sync_only_methods_are_not_on_the_async_client(method_name):
+    assert hasattr(TSRestApiV2, method_name)
+    assert not hasattr(AsyncTSRestApiV2, method_name)
+    assert not hasattr(AsyncTSRestApiV2(server_url='https://ts.example.com'), 'requests_session')
+
+
+def test_endpoint_methods_are_awaitable_and_send_the_bearer_token():
+    def handler(request):
+        assert request.url.path == '/api/rest/2.0/metadata/search'
+        assert request.headers['Authorization'] == 'Bearer abc'
+        return httpx.Response(200, json=[{'metadata_id': 'g1'}])
+
+    async def run():
+        async with client_with(handler) as ts:
+            ts.bearer_token = 'abc'
+            return await ts.metadata_search(request={})
+    assert asyncio.run(run()) == [{'metadata_id': 'g1'}]
+
+
+def test_retry_policy_and_rate_limiter_apply():
+    statuses = [503, 200]
+    seen = {'in_flight': 0, 'peak': 0}
+
+    async def handler(request):
+        seen['in_flight'] += 1
+        seen['peak'] = max(seen['peak'], seen['in_flight'])
+        await asyncio.sleep(0.01)
+        seen['in_flight'] -= 1
+        status = statuses.pop(0) if statuses else 200
+        return httpx.Response(status, json={})
+
+    async def run():
+        async with client_with(handler) as ts:
+            ts.set_retry_policy(RetryPolicy(max_retries=2, backoff_factor=0.001, jitter=False))
+            ts.set_rate_limiter(RateLimiter(budgets={'metadata/': RateLimit(max_in_flight=1)}))
+            await asyncio.gather(*[ts.metadata_search(request={}) for _ in range(4)])
+            return ts.retry_policy.counters
+    counters = asyncio.run(run())
+    assert seen['peak'] == 1
+    assert counters['retries'] == 1
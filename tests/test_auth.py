@@ -0,0 +1,132 @@
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import pytest
+import requests
+
+from thoughtspot_rest_api_v1 import BearerTokenManager, ManagedBearerAuth
+from thoughtspot_rest_api_v1 import auth
+
+
+class Clock:
+    def __init__(self):
+        self.now = 1000.0
+
+    def monotonic(self):
+        return self.now
+
+
+class StubClient:
+    def __init__(self):
+        self.bearer_token = None
+        self.minted = 0
+        self.mint_started = threading.Event()
+        self.release_mint = threading.Event()
+        self.release_mint.set()
+
+    def auth_token_full(self, **kwargs):
+        self.mint_started.set()
+        self.release_mint.wait(5)
+        self.minted += 1
+        return {'token': 't{}'.format(self.minted)}
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    clock = Clock()
+    monkeypatch.setattr(auth.time, 'monotonic', clock.monotonic)
+    return clock
+
+
+def test_requires_a_password_or_secret_key():
+    with pytest.raises(Exception):
+        BearerTokenManager(StubClient(), username='u')
+
+
+def test_token_is_minted_once_and_reused(clock):
+    ts = StubClient()
+    manager = BearerTokenManager(ts, username='u', secret_key='k', validity_time_in_sec=300)
+    assert manager.get_token() == 't1'
+    clock.now += 200
+    assert manager.get_token() == 't1'
+    assert ts.minted == 1 and ts.bearer_token == 't1'
+
+
+def test_refreshes_in_the_background_shortly_before_expiry(clock):
+    ts = StubClient()
+    manager = BearerTokenManager(ts, username='u', secret_key='k', validity_time_in_sec=300, refresh_margin_sec=60)
+    manager.get_token()
+    clock.now += 250
+    ts.release_mint.clear()
+    # The caller is not held up by the refresh
+    assert manager.get_token() == 't1'
+    ts.release_mint.set()
+    manager._background_refresh.join(5)
+    assert manager.get_token() == 't2'
+
+
+def test_callers_wait_for_a_single_refresh_once_expired(clock):
+    ts = StubClient()
+    manager = BearerTokenManager(ts, username='u', secret_key='k', validity_time_in_sec=300)
+    manager.get_token()
+    clock.now += 301
+    ts.release_mint.clear()
+    ts.mint_started.clear()
+    tokens = []
+    threads = [threading.Thread(target=lambda: tokens.append(manager.get_token())) for _ in range(4)]
+    for thread in threads:
+        thread.start()
+    ts.mint_started.wait(5)
+    ts.release_mint.set()
+    for thread in threads:
+        thread.join(5)
+    assert tokens == ['t2'] * 4
+    assert ts.minted == 2
+
+
+class Handler(BaseHTTPRequestHandler):
+    protocol_version = 'HTTP/1.1'
+    valid_token = 't2'
+    authorizations = []
+
+    def do_POST(self):
+        self.rfile.read(int(self.headers.get('Content-Length', 0)))
+        self.authorizations.append(self.headers.get('Authorization'))
+        status = 200 if self.headers.get('Authorization') == 'Bearer {}'.format(self.valid_token) else 401
+        self.send_response(status)
+        self.send_header('Content-Length', '2')
+        self.end_headers()
+        self.wfile.write(b'{}')
+
+    def log_message(self, format, *args):
+        pass
+
+
+@pytest.fixture
+def server_url():
+    server = ThreadingHTTPServer(('127.0.0.1', 0), Handler)
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    yield 'http://127.0.0.1:{}/api/rest/2.0/'.format(server.server_address[1])
+    server.shutdown()
+    server.server_close()
+
+
+def test_a_401_mints_a_new_token_and_sends_once_more(server_url):
+    Handler.authorizations.clear()
+    session = requests.Session()
+    session.auth = ManagedBearerAuth(BearerTokenManager(StubClient(), username='u', secret_key='k'))
+    response = session.post(server_url + 'metadata/search', json={})
+    assert response.status_code == 200
+    assert Handler.authorizations == ['Bearer t1', 'Bearer t2']
+
+    # Still rejected with the new token: the 401 is returned rather than minting again
+    Handler.valid_token = 'none'
+    try:
+        assert session.post(server_url + 'metadata/search', json={}).status_code == 401
+    finally:
+        Handler.valid_token = 't2'
+
+    # Token endpoints are sent without the bearer token
+    session.post(server_url + 'auth/token/full', json={})
+    assert Handler.authorizations[-1] is None
@@ -0,0 +1,104 @@
+import asyncio
+import threading
+import time
+
+import pytest
+
+from thoughtspot_rest_api_v1 import RequestCoalescer
+
+
+def test_concurrent_identical_reads_share_one_request():
+    coalescer = RequestCoalescer()
+    release = threading.Event()
+    sent = []
+
+    def send():
+        sent.append(1)
+        release.wait(5)
+        return {'config': 1}
+
+    results = []
+    threads = [threading.Thread(target=lambda: results.append(coalescer.call('POST', 'system/config', {}, send)))
+               for _ in range(5)]
+    for thread in threads:
+        thread.start()
+    deadline = time.monotonic() + 5
+    while coalescer.coalesced_count < 4 and time.monotonic() < deadline:
+        time.sleep(0.001)
+    release.set()
+    for thread in threads:
+        thread.join()
+    assert len(sent) == 1
+    assert results == [{'config': 1}] * 5
+
+
+def test_key_order_does_not_matter_but_endpoint_and_body_do():
+    coalescer = RequestCoalescer()
+    assert coalescer.get_key('POST', 'metadata/search', {'a': 1, 'b': 2}) == \
+        coalescer.get_key('POST', 'metadata/search', {'b': 2, 'a': 1})
+    assert coalescer.get_key('POST', 'metadata/search', {'a': 1}) != coalescer.get_key('POST', 'metadata/search', {})
+    assert coalescer.get_key('POST', 'metadata/delete', {}) is None
+
+
+def test_errors_are_raised_to_every_caller_and_not_kept():
+    coalescer = RequestCoalescer()
+
+    def fail():
+        raise ValueError('boom')
+
+    with pytest.raises(ValueError):
+        coalescer.call('GET', 'system', None, fail)
+    assert coalescer.call('GET', 'system', None, lambda: 'ok') == 'ok'
+
+
+def test_copy_results_gives_waiters_their_own_copy():
+    async def run():
+        coalescer = RequestCoalescer(copy_results=True)
+
+        async def send():
+            await asyncio.sleep(0.01)
+            return {'users': []}
+
+        return await asyncio.gather(*[coalescer.async_call('POST', 'users/search', {}, send) for _ in range(3)])
+    results = asyncio.run(run())
+    assert results[0] == results[1] == results[2]
+    assert results[0] is not results[1] and results[1] is not results[2]
+
+
+def test_cancelled_leader_does_not_cancel_the_waiters():
+    async def run():
+        coalescer = RequestCoalescer()
+        sent = []
+
+        async def send():
+            sent.append(1)
+            await asyncio.sleep(0.05)
+            return 'config'
+
+        leader = asyncio.ensure_future(coalescer.async_call('GET', 'system/config', None, send))
+        await asyncio.sleep(0)
+        waiters = [asyncio.ensure_future(coalescer.async_call('GET', 'system/config', None, send)) for _ in range(2)]
+        await asyncio.sleep(0.01)
+        leader.cancel()
+        results = await asyncio.gather(*waiters)
+        assert leader.cancelled()
+        assert not coalescer._async_in_flight
+        return sent, results
+    sent, results = asyncio.run(run())
+    assert sent == [1]
+    assert results == ['config', 'config']
+
+
+def test_async_errors_reach_every_caller():
+    async def run():
+        coalescer = RequestCoalescer()
+
+        async def send():
+            await asyncio.sleep(0.01)
+            raise ValueError('boom')
+
+        results = await asyncio.gather(*[coalescer.async_call('GET', 'system', None, send) for _ in range(3)],
+                                       return_exceptions=True)
+        assert not coalescer._async_in_flight
+        return results
+    assert all(isinstance(result, ValueError) for result in asyncio.run(run()))
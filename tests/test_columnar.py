@@ -0,0 +1,115 @@
+import pytest
+
+numpy = pytest.importorskip('numpy')
+pyarrow = pytest.importorskip('pyarrow')
+
+from thoughtspot_rest_api_v1.columnar import (
+    ColumnarConverter, infer_column_type, widen_column_type, iter_numpy_batches
+)
+
+
+def page(column_names, rows):
+    return {'column_names': column_names, 'data_rows': rows}
+
+
+def test_infer_column_type():
+    assert infer_column_type([1, None, 2]) == 'INT64'
+    assert infer_column_type([1, 2.5]) == 'DOUBLE'
+    assert infer_column_type([True, False]) == 'BOOL'
+    assert infer_column_type([1, 'a']) == 'VARCHAR'
+    assert infer_column_type([None]) == 'VARCHAR'
+
+
+def test_widen_column_type():
+    assert widen_column_type(None, 'INT64') == 'INT64'
+    assert widen_column_type('INT64', None) == 'INT64'
+    assert widen_column_type('INT64', 'DOUBLE') == 'DOUBLE'
+    assert widen_column_type('DOUBLE', 'INT64') == 'DOUBLE'
+    assert widen_column_type('BOOL', 'INT64') == 'VARCHAR'
+    assert widen_column_type('DOUBLE', 'VARCHAR') == 'VARCHAR'
+
+
+def test_numpy_int_then_float_pages_widen():
+    converter = ColumnarConverter()
+    first = converter.to_numpy(page(['x'], [[1], [2]]))
+    second = converter.to_numpy(page(['x'], [[1.5], [2.7]]))
+    assert first['x'].dtype == numpy.int64
+    assert second['x'].dtype == numpy.float64
+    assert second['x'].tolist() == [1.5, 2.7]
+    assert converter.column_types['x'] == 'DOUBLE'
+
+
+def test_numpy_string_on_later_page_widens_to_varchar():
+    converter = ColumnarConverter()
+    converter.to_numpy(page(['x'], [[1], [2]]))
+    second = converter.to_numpy(page(['x'], [['a'], [3]]))
+    assert second['x'].dtype == object
+    assert second['x'].tolist() == ['a', 3]
+    assert converter.column_types['x'] == 'VARCHAR'
+
+
+def test_arrow_mixed_page_is_not_truncated():
+    converter = ColumnarConverter()
+    batch = converter.to_arrow(page(['x'], [[1.5], [2]]))
+    assert batch.schema.field('x').type == pyarrow.float64()
+    assert batch.column(0).to_pylist() == [1.5, 2.0]
+
+
+def test_arrow_int_then_float_pages_widen():
+    converter = ColumnarConverter()
+    first = converter.to_arrow(page(['x'], [[1], [2]]))
+    second = converter.to_arrow(page(['x'], [[1.5], [None]]))
+    assert first.schema.field('x').type == pyarrow.int64()
+    assert second.schema.field('x').type == pyarrow.float64()
+    assert second.column(0).to_pylist() == [1.5, None]
+
+
+def test_null_only_page_does_not_fix_the_type():
+    converter = ColumnarConverter()
+    first = converter.to_arrow(page(['x'], [[None], [None]]))
+    assert first.schema.field('x').type == pyarrow.null()
+    assert 'x' not in converter.column_types
+    second = converter.to_arrow(page(['x'], [[3], [4]]))
+    assert second.schema.field('x').type == pyarrow.int64()
+
+
+@pytest.mark.parametrize('rows', [[[1.5], [2]], [['a'], [2]]])
+def test_declared_integer_column_rejects_values_that_do_not_fit(rows):
+    converter = ColumnarConverter(column_types={'x': 'INT64'})
+    with pytest.raises(ValueError, match="Column 'x'"):
+        converter.to_numpy(page(['x'], rows))
+    with pytest.raises(ValueError, match="Column 'x'"):
+        converter.to_arrow(page(['x'], rows))
+
+
+def test_declared_integer_column_accepts_integral_floats():
+    converter = ColumnarConverter(column_types={'x': 'INT64'})
+    assert converter.to_numpy(page(['x'], [[1.0], [2]]))['x'].tolist() == [1, 2]
+
+
+def test_declared_double_column_rejects_strings():
+    converter = ColumnarConverter(column_types={'x': 'DOUBLE'})
+    converter.to_numpy(page(['x'], [[1], [2.5]]))
+    with pytest.raises(ValueError):
+        converter.to_numpy(page(['x'], [['n/a'], [2.5]]))
+
+
+def test_dates_from_epoch_seconds_and_iso_strings():
+    converter = ColumnarConverter(column_types={'d': 'DATE'})
+    epoch = converter.to_numpy(page(['d'], [[0], [None]]))['d']
+    assert str(epoch[0]) == '1970-01-01T00:00:00'
+    assert numpy.isnat(epoch[1])
+    iso = converter.to_arrow(page(['d'], [['2024-01-02T03:04:05'], [None]]))
+    assert iso.schema.field('d').type == pyarrow.timestamp('s')
+
+
+def test_v1_page_form_and_liveboard_pages_get_their_own_converter():
+    pages = [
+        {'visualization_id': 'a', 'column_names': ['x'], 'data_rows': [[1]]},
+        {'visualization_id': 'b', 'column_names': ['x'], 'data_rows': [['s']]},
+        {'visualization_id': 'a', 'column_names': ['x'], 'data_rows': [[2]]},
+    ]
+    dtypes = [batch['x'].dtype for batch in iter_numpy_batches(pages)]
+    assert dtypes == [numpy.int64, object, numpy.int64]
+    v1 = ColumnarConverter().to_numpy({'columnNames': ['y'], 'data': [[1.5]]})
+    assert v1['y'].tolist() == [1.5]
@@ -0,0 +1,106 @@
+import gzip
+import io
+
+import requests
+
+from thoughtspot_rest_api_v1.compression import RequestCompression
+from thoughtspot_rest_api_v1.transport import TransportPoliciesMixin
+
+
+class StubAdapter(TransportPoliciesMixin):
+    def __init__(self, statuses):
+        self.statuses = list(statuses)
+        self.sent = []
+
+    def _send_pooled(self, request, **kwargs):
+        self.sent.append(request)
+        response = requests.Response()
+        response.status_code = self.statuses.pop(0)
+        response._content = b''
+        response.raw = io.BytesIO()
+        return response
+
+
+def import_request(size=1000):
+    return requests.Request('POST', 'https://ts.example.com/callosum/v1/tspublic/v1/metadata/tml/import',
+                            data={'import_objects': 'x' * size}, headers={'Authorization': 'Bearer abc'}).prepare()
+
+
+def adapter_with(statuses, **compression_options):
+    adapter = StubAdapter(statuses)
+    adapter.request_compression = RequestCompression(min_size=100, **compression_options)
+    return adapter
+
+
+def encodings(adapter):
+    return [(r.url.rsplit('/', 1)[-1], r.headers.get('Content-Encoding')) for r in adapter.sent]
+
+
+def test_small_bodies_are_not_compressed():
+    adapter = adapter_with([200])
+    adapter.send(import_request(size=10))
+    assert encodings(adapter) == [('import', None)]
+    assert adapter.request_compression.supported is None
+
+
+def test_probe_before_the_first_compressed_request():
+    adapter = adapter_with([200, 200, 200])
+    assert adapter.send(import_request()).status_code == 200
+    probe, sent = adapter.sent[:2]
+    assert probe.url == 'https://ts.example.com/api/rest/2.0/metadata/search'
+    assert probe.headers['Authorization'] == 'Bearer abc'
+    assert gzip.decompress(probe.body) == b'{"record_size": 1}'
+    assert sent.headers['Content-Encoding'] == 'gzip'
+    assert gzip.decompress(sent.body).startswith(b'import_objects=')
+    assert adapter.request_compression.supported is True
+    # Probed once only
+    adapter.send(import_request())
+    assert encodings(adapter) == [('search', 'gzip'), ('import', 'gzip'), ('import', 'gzip')]
+
+
+def test_server_that_fails_compressed_bodies_never_gets_a_compressed_import():
+    for status in (400, 415, 500):
+        adapter = adapter_with([status, 200, 200, 200])
+        assert adapter.send(import_request()).status_code == 200
+        assert adapter.request_compression.supported is False
+        adapter.send(import_request())
+        assert encodings(adapter) == [('search', 'gzip'), ('search', None), ('import', None), ('import', None)]
+
+
+def test_inconclusive_probe_sends_uncompressed_and_probes_again():
+    adapter = adapter_with([401, 401, 200, 200, 200])
+    adapter.send(import_request())
+    assert adapter.request_compression.supported is None
+    adapter.send(import_request())
+    assert encodings(adapter) == [('search', 'gzip'), ('search', None), ('import', None),
+                                  ('search', 'gzip'), ('import', 'gzip')]
+
+
+def test_probe_keeps_the_path_prefix_of_the_server():
+    adapter = adapter_with([200, 200])
+    request = requests.Request('POST', 'https://ts.example.com/ts/callosum/v1/tspublic/v1/metadata/tml/import',
+                               data={'import_objects': 'x' * 1000}).prepare()
+    adapter.send(request)
+    assert adapter.sent[0].url == 'https://ts.example.com/ts/api/rest/2.0/metadata/search'
+
+
+def test_415_after_a_successful_probe_is_resent_uncompressed():
+    adapter = adapter_with([200, 415, 200, 200])
+    assert adapter.send(import_request()).status_code == 200
+    assert adapter.request_compression.supported is False
+    adapter.send(import_request())
+    assert encodings(adapter) == [('search', 'gzip'), ('import', 'gzip'), ('import', None), ('import', None)]
+
+
+def test_other_errors_to_a_compressed_import_are_never_sent_twice():
+    for status in (400, 500):
+        adapter = adapter_with([200, status])
+        assert adapter.send(import_request()).status_code == status
+        assert encodings(adapter) == [('search', 'gzip'), ('import', 'gzip')]
+
+
+def test_deflate():
+    adapter = adapter_with([200], encoding='deflate')
+    adapter.request_compression.supported = True
+    adapter.send(import_request())
+    assert adapter.sent[0].headers['Content-Encoding'] == 'deflate'
@@ -0,0 +1,62 @@
+import pytest
+
+pandas = pytest.importorskip('pandas')
+
+from thoughtspot_rest_api_v1.dataframes import DataFrameBuilder, data_to_dataframe, liveboard_data_to_dataframes
+
+
+def page(column_names, rows, **extra):
+    p = {'column_names': column_names, 'data_rows': rows}
+    p.update(extra)
+    return p
+
+
+def test_int_then_float_pages_keep_the_fractions():
+    df = data_to_dataframe([page(['Revenue'], [[100], [200]]), page(['Revenue'], [[99.99], [0.5]])])
+    assert df['Revenue'].dtype == 'float64'
+    assert df['Revenue'].tolist() == [100.0, 200.0, 99.99, 0.5]
+
+
+def test_integer_column_with_nulls_is_nullable_int64():
+    df = data_to_dataframe([page(['n'], [[1], [None]]), page(['n'], [[3], [4]])])
+    assert str(df['n'].dtype) == 'Int64'
+    assert df['n'].isna().tolist() == [False, True, False, False]
+
+
+def test_null_only_first_page_takes_the_type_of_later_pages():
+    df = data_to_dataframe([page(['n'], [[None]]), page(['n'], [[1.5]])])
+    assert df['n'].dtype == 'float64'
+
+
+def test_string_on_a_later_page_makes_an_object_column():
+    df = data_to_dataframe([page(['s'], [[1], [2]]), page(['s'], [['x'], [3]])],
+                           categorical_max_unique_ratio=None)
+    assert df['s'].dtype == object
+    assert df['s'].tolist() == [1, 2, 'x', 3]
+
+
+def test_declared_types_dates_bools_and_categories():
+    df = data_to_dataframe({'contents': [page(['d', 'b', 'region'],
+                                              [[0, True, 'east'], [86400, None, 'east'],
+                                               [None, False, 'west'], [0, True, 'east']])]},
+                           column_types={'d': 'DATE', 'b': 'BOOL'})
+    assert str(df['d'].dtype).startswith('datetime64')
+    assert str(df['b'].dtype) == 'boolean'
+    assert str(df['region'].dtype) == 'category'
+
+
+def test_declared_integer_column_rejects_fractions():
+    builder = DataFrameBuilder(column_types={'n': 'INT64'})
+    with pytest.raises(ValueError):
+        builder.add_page(page(['n'], [[1.5]]))
+
+
+def test_liveboard_frames_per_visualization():
+    frames = liveboard_data_to_dataframes([
+        page(['a'], [[1]], visualization_id='v1', visualization_name='First'),
+        page(['b'], [['x']], visualization_id='v2', visualization_name='Second'),
+        page(['a'], [[2.5]], visualization_id='v1', visualization_name='First'),
+    ])
+    assert list(frames) == ['v1', 'v2']
+    assert frames['v1']['a'].tolist() == [1.0, 2.5]
+    assert frames['v1'].attrs['visualization_name'] == 'First'
@@ -0,0 +1,136 @@
+import datetime
+
+import pytest
+import requests
+
+from thoughtspot_rest_api_v1 import LogWindowSplitter, LogTailer, FileLogCheckpoint, SQLiteLogCheckpoint
+from thoughtspot_rest_api_v1 import logs
+from thoughtspot_rest_api_v1.logs import log_event_time_millis
+
+MINUTE = 60 * 1000
+
+
+def iso(millis):
+    return datetime.datetime.fromtimestamp(millis / 1000, tz=datetime.timezone.utc).strftime('%Y-%m-%dT%H:%M:%S.%fZ')
+
+
+def event(millis):
+    return {'date': iso(millis), 'log': '{{"id": "{}"}}'.format(millis)}
+
+
+class StubLog:
+    """Events every minute. Returns the events in [start, end] (both ends included, as the endpoint does)"""
+    def __init__(self, end, failing_windows=None):
+        self.events = [event(t) for t in range(0, end + 1, MINUTE)]
+        self.failing_windows = failing_windows or {}
+        self.calls = []
+
+    def fetch_window(self, start, end):
+        self.calls.append((start, end))
+        if (start, end) in self.failing_windows:
+            raise self.failing_windows[(start, end)]
+        return [e for e in self.events if iso(start) <= e['date'] <= iso(end)]
+
+
+def test_windows_are_merged_in_order_without_boundary_duplicates():
+    log = StubLog(60 * MINUTE)
+    splitter = LogWindowSplitter(log.fetch_window, window_millis=10 * MINUTE, max_workers=3,
+                                 max_events_per_window=None)
+    assert splitter.fetch(0, 60 * MINUTE) == log.events
+    assert splitter.windows_fetched == 6 and splitter.windows_split == 0
+
+
+def test_full_windows_are_split_until_they_fit():
+    log = StubLog(40 * MINUTE)
+    splitter = LogWindowSplitter(log.fetch_window, window_millis=40 * MINUTE, max_events_per_window=12,
+                                 min_window_millis=MINUTE)
+    assert splitter.fetch(0, 40 * MINUTE) == log.events
+    assert splitter.windows_split == 3
+    assert all(end - start == 10 * MINUTE for start, end in log.calls[3:])
+
+
+def test_timeouts_and_server_errors_split_the_window():
+    response = requests.Response()
+    response.status_code = 504
+    log = StubLog(20 * MINUTE, failing_windows={
+        (0, 20 * MINUTE): requests.exceptions.Timeout(),
+        (0, 10 * MINUTE): requests.exceptions.HTTPError(response=response),
+    })
+    splitter = LogWindowSplitter(log.fetch_window, window_millis=20 * MINUTE, max_events_per_window=None,
+                                 min_window_millis=MINUTE)
+    assert splitter.fetch(0, 20 * MINUTE) == log.events
+    assert splitter.windows_split == 2
+
+
+def test_windows_at_the_minimum_are_not_split_again():
+    log = StubLog(2 * MINUTE, failing_windows={(0, 2 * MINUTE): requests.exceptions.Timeout()})
+    splitter = LogWindowSplitter(log.fetch_window, window_millis=2 * MINUTE, min_window_millis=2 * MINUTE)
+    with pytest.raises(requests.exceptions.Timeout):
+        splitter.fetch(0, 2 * MINUTE)
+
+
+def test_events_are_merged_by_time_when_some_dates_have_no_fraction():
+    whole_second = {'date': '2024-03-20T15:33:22Z', 'log': '{"id": "a"}'}
+    with_fraction = {'date': '2024-03-20T15:33:22.123Z', 'log': '{"id": "b"}'}
+    next_second = {'date': '2024-03-20T15:33:23Z', 'log': '{"id": "c"}'}
+    merged = logs.merge_log_windows({(0, MINUTE): [next_second, with_fraction, whole_second]})
+    assert merged == [whole_second, with_fraction, next_second]
+
+
+def test_log_event_time_millis():
+    assert log_event_time_millis({'date': '2024-03-20T15:33:22.123Z'}) == 1710948802123
+    assert log_event_time_millis({'date': '2024-03-20T15:33:22Z'}) == 1710948802000
+    assert log_event_time_millis({'date': 'yesterday'}) is None
+    assert log_event_time_millis({}) is None
+
+
+class Clock:
+    def __init__(self, millis):
+        self.millis = millis
+
+    def time(self):
+        return self.millis / 1000
+
+
+@pytest.fixture(params=['file', 'sqlite'])
+def checkpoint_factory(request, tmp_path):
+    if request.param == 'file':
+        return lambda: FileLogCheckpoint(str(tmp_path / 'checkpoint.json'))
+    return lambda: SQLiteLogCheckpoint(str(tmp_path / 'checkpoint.db'), name='audit')
+
+
+def test_tailer_delivers_late_events_once_and_resumes_from_the_checkpoint(monkeypatch, checkpoint_factory):
+    clock = Clock(100 * MINUTE)
+    monkeypatch.setattr(logs.time, 'time', clock.time)
+    log = StubLog(0)
+    log.events = [event(t) for t in (90 * MINUTE, 95 * MINUTE)]
+
+    tailer = LogTailer(log.fetch_window, checkpoint_factory(), start_epoch_time_in_millis=80 * MINUTE,
+                       overlap_millis=10 * MINUTE)
+    assert tailer.poll() == log.events
+    tailer.commit()
+
+    # Written late, with a timestamp inside the overlap of the next poll
+    clock.millis = 110 * MINUTE
+    log.events.append(event(98 * MINUTE))
+    log.events.append(event(105 * MINUTE))
+    assert tailer.poll() == [event(98 * MINUTE), event(105 * MINUTE)]
+    tailer.commit()
+
+    # A new tailer on the same checkpoint carries on where the first stopped
+    clock.millis = 120 * MINUTE
+    log.events.append(event(115 * MINUTE))
+    resumed = LogTailer(log.fetch_window, checkpoint_factory(), overlap_millis=10 * MINUTE)
+    assert resumed.high_water_mark == 110 * MINUTE
+    assert resumed.poll() == [event(115 * MINUTE)]
+    assert log.calls[-1] == (100 * MINUTE, 120 * MINUTE)
+
+
+def test_uncommitted_polls_are_delivered_again(monkeypatch, checkpoint_factory):
+    monkeypatch.setattr(logs.time, 'time', Clock(100 * MINUTE).time)
+    log = StubLog(0)
+    log.events = [event(95 * MINUTE)]
+    assert LogTailer(log.fetch_window, checkpoint_factory(), start_epoch_time_in_millis=90 * MINUTE).poll() == \
+        log.events
+    assert LogTailer(log.fetch_window, checkpoint_factory(), start_epoch_time_in_millis=90 * MINUTE).poll() == \
+        log.events
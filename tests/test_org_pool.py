@@ -0,0 +1,82 @@
+import json
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import pytest
+
+from thoughtspot_rest_api_v1 import OrgClientPool
+
+ORGS = [{'id': 0, 'name': 'Primary'}, {'id': 1, 'name': 'cust_a'}, {'id': 2, 'name': 'cust_b'}]
+
+
+class Handler(BaseHTTPRequestHandler):
+    protocol_version = 'HTTP/1.1'
+    calls = []
+
+    def do_POST(self):
+        body = json.loads(self.rfile.read(int(self.headers.get('Content-Length', 0))) or b'{}')
+        endpoint = self.path.split('/api/rest/2.0/')[-1]
+        self.calls.append(endpoint)
+        if endpoint == 'auth/token/full':
+            result = {'token': 'org{}'.format(body['org_id'])}
+        elif endpoint == 'orgs/search':
+            result = ORGS
+        else:
+            # The Org a call runs in is the Org of its token
+            result = {'token': self.headers.get('Authorization')}
+        content = json.dumps(result).encode('utf-8')
+        self.send_response(200)
+        self.send_header('Content-Type', 'application/json')
+        self.send_header('Content-Length', str(len(content)))
+        self.end_headers()
+        self.wfile.write(content)
+
+    def log_message(self, format, *args):
+        pass
+
+
+@pytest.fixture
+def org_pool():
+    server = ThreadingHTTPServer(('127.0.0.1', 0), Handler)
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    Handler.calls.clear()
+    org_pool = OrgClientPool(server_url='http://127.0.0.1:{}'.format(server.server_address[1]), username='u',
+                             secret_key='k')
+    yield org_pool
+    org_pool.close()
+    server.shutdown()
+    server.server_close()
+
+
+def system_config(ts):
+    return ts.post_request('system/config', request={})['token']
+
+
+def test_clients_are_created_once_per_org_and_share_one_adapter(org_pool):
+    ts = org_pool.get_client('cust_a')
+    assert org_pool.get_client(1) is ts
+    assert system_config(ts) == 'Bearer org1'
+    assert ts.requests_session.get_adapter(ts.base_url) is org_pool.transport_adaptor
+    assert org_pool.primary.requests_session.get_adapter(ts.base_url) is org_pool.transport_adaptor
+    assert Handler.calls.count('auth/token/full') == 2
+    assert Handler.calls.count('orgs/search') == 1
+
+
+def test_unknown_org_names_raise_after_reloading_the_names(org_pool):
+    with pytest.raises(Exception, match='cust_z'):
+        org_pool.get_client('cust_z')
+    assert Handler.calls.count('orgs/search') == 2
+
+
+def test_fanout_runs_in_every_org_other_than_the_primary(org_pool):
+    def fn(ts):
+        token = system_config(ts)
+        if token == 'Bearer org2':
+            raise ValueError('failed in cust_b')
+        return token
+
+    results = {org_id: (result, error) for org_id, result, error in org_pool.fanout(fn, max_workers=2)}
+    assert sorted(results) == [1, 2]
+    assert results[1] == ('Bearer org1', None)
+    assert isinstance(results[2][1], ValueError)
@@ -0,0 +1,109 @@
+import asyncio
+
+import pytest
+
+from thoughtspot_rest_api_v1.pagination import (
+    iter_pages, aiter_pages, iter_unique_items, aiter_unique_items, project_fields
+)
+
+
+class Server:
+    """
+    Paged search over a list of records, with changes made to the list before the Nth request is answered
+    """
+    def __init__(self, count, changes=None):
+        self.records = [{'id': i} for i in range(count)]
+        self.changes = changes or {}
+        self.requests = []
+
+    def fetch_page(self, record_offset, record_size):
+        self.requests.append((record_offset, record_size))
+        change = self.changes.get(len(self.requests))
+        if change is not None:
+            change(self.records)
+        return [dict(record) for record in self.records[record_offset:record_offset + record_size]]
+
+    async def afetch_page(self, record_offset, record_size):
+        return self.fetch_page(record_offset, record_size)
+
+
+def delete(*ids):
+    def change(records):
+        records[:] = [record for record in records if record['id'] not in ids]
+    return change
+
+
+def insert_at_start(*ids):
+    def change(records):
+        records[:0] = [{'id': i} for i in ids]
+    return change
+
+
+def ids(items):
+    return [item['id'] for item in items]
+
+
+@pytest.mark.parametrize('read_ahead, max_workers', [(0, 1), (1, 1), (3, 3)])
+def test_iter_pages_in_offset_order_until_a_short_page(read_ahead, max_workers):
+    server = Server(23)
+    pages = list(iter_pages(server.fetch_page, record_size=5, read_ahead=read_ahead, max_workers=max_workers))
+    assert [ids(page) for page in pages] == [list(range(i, min(i + 5, 23))) for i in range(0, 23, 5)]
+
+
+def test_iter_pages_rejects_a_bad_record_size():
+    with pytest.raises(ValueError):
+        next(iter_pages(lambda offset, size: [], record_size=0))
+
+
+def test_aiter_pages():
+    server = Server(12)
+
+    async def collect():
+        return [page async for page in aiter_pages(server.afetch_page, record_size=5, read_ahead=2)]
+    assert [len(page) for page in asyncio.run(collect())] == [5, 5, 2]
+
+
+def test_unique_items_without_changes():
+    server = Server(30)
+    assert ids(iter_unique_items(server.fetch_page, record_size=5)) == list(range(30))
+
+
+def test_unique_items_with_deletions_mid_scan_skip_no_surviving_record():
+    # Deleting 3 already-seen records moves 10-12 back before the start of the third page
+    server = Server(30, changes={3: delete(2, 3, 4)})
+    assert ids(iter_unique_items(server.fetch_page, record_size=5, max_workers=1)) == list(range(30))
+
+
+def test_unique_items_with_more_deletions_than_a_page():
+    server = Server(40, changes={4: delete(*range(3, 15))})
+    result = ids(iter_unique_items(server.fetch_page, record_size=5, max_workers=1))
+    assert len(result) == len(set(result))
+    assert set(range(15, 40)) <= set(result)
+
+
+def test_unique_items_with_insertions_mid_scan_repeat_nothing():
+    server = Server(30, changes={3: insert_at_start(100, 101, 102)})
+    result = ids(iter_unique_items(server.fetch_page, record_size=5, max_workers=1))
+    assert sorted(i for i in result if i < 100) == list(range(30))
+    assert len(result) == len(set(result))
+
+
+def test_unique_items_with_parallel_pages_and_deletions():
+    server = Server(60, changes={5: delete(20, 21)})
+    result = ids(iter_unique_items(server.fetch_page, record_size=5, max_workers=4))
+    assert len(result) == len(set(result))
+    assert set(range(60)) - {20, 21} <= set(result)
+
+
+def test_aiter_unique_items_with_deletions_mid_scan():
+    server = Server(30, changes={3: delete(2, 3, 4)})
+
+    async def collect():
+        return [item async for item in aiter_unique_items(server.afetch_page, record_size=5, max_workers=1)]
+    assert ids(asyncio.run(collect())) == list(range(30))
+
+
+def test_project_fields():
+    assert project_fields({'id': 1, 'name': 'a', 'x': 2}, ['id', 'name', 'missing']) == {'id': 1, 'name': 'a'}
+    item = {'id': 1}
+    assert project_fields(item) is item
@@ -0,0 +1,89 @@
+import asyncio
+import threading
+import time
+
+from thoughtspot_rest_api_v1.rate_limit import RateLimit, RateLimiter, endpoint_path
+
+V2 = 'https://ts.example.com/api/rest/2.0/'
+V1 = 'https://ts.example.com/callosum/v1/tspublic/v1/'
+
+
+def test_endpoint_path():
+    assert endpoint_path(V2 + 'metadata/search') == 'metadata/search'
+    assert endpoint_path(V1 + 'metadata/tml/import') == 'metadata/tml/import'
+    assert endpoint_path('https://ts.example.com/callosum/v1/session/info') == 'session/info'
+    assert endpoint_path('https://ts.example.com/other/path') == 'other/path'
+
+
+def test_longest_prefix_the_endpoint_starts_with():
+    search, metadata, tml_import, default = RateLimit(), RateLimit(), RateLimit(), RateLimit()
+    limiter = RateLimiter(budgets={'search': search, 'metadata/': metadata, '/metadata/tml/import': tml_import},
+                          default=default)
+    assert limiter.get_rate_limit(V2 + 'metadata/search') is metadata
+    assert limiter.get_rate_limit(V2 + 'metadata/tml/import') is tml_import
+    assert limiter.get_rate_limit(V1 + 'metadata/tml/import') is tml_import
+    assert limiter.get_rate_limit(V2 + 'searchdata') is search
+    assert limiter.get_rate_limit(V2 + 'users/search') is default
+
+
+def test_a_prefix_does_not_match_everything():
+    api, default = RateLimit(), RateLimit()
+    limiter = RateLimiter(budgets={'api/': api}, default=default)
+    assert limiter.get_rate_limit(V2 + 'metadata/search') is default
+
+
+def test_no_budget_and_no_default_is_unlimited():
+    limiter = RateLimiter()
+    assert limiter.get_rate_limit(V2 + 'searchdata') is None
+    with limiter.limit(V2 + 'searchdata'):
+        pass
+
+
+def test_token_bucket_spaces_requests_after_the_burst():
+    rate_limit = RateLimit(requests_per_second=20, burst=2)
+    started = time.monotonic()
+    for _ in range(6):
+        with rate_limit.acquire():
+            pass
+    # 2 from the burst, then 4 at 20 per second
+    assert time.monotonic() - started >= 0.18
+
+
+def test_max_in_flight():
+    rate_limit = RateLimit(max_in_flight=2)
+    in_flight = []
+    peak = []
+    lock = threading.Lock()
+
+    def call():
+        with rate_limit.acquire():
+            with lock:
+                in_flight.append(1)
+                peak.append(len(in_flight))
+            time.sleep(0.02)
+            with lock:
+                in_flight.pop()
+
+    threads = [threading.Thread(target=call) for _ in range(8)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    assert max(peak) == 2
+
+
+def test_async_limit_caps_in_flight_without_blocking_the_loop():
+    limiter = RateLimiter(budgets={'searchdata': RateLimit(max_in_flight=2, requests_per_second=100)})
+    state = {'in_flight': 0, 'peak': 0}
+
+    async def call():
+        async with limiter.async_limit(V2 + 'searchdata'):
+            state['in_flight'] += 1
+            state['peak'] = max(state['peak'], state['in_flight'])
+            await asyncio.sleep(0.01)
+            state['in_flight'] -= 1
+
+    async def run():
+        await asyncio.gather(*[call() for _ in range(10)])
+    asyncio.run(run())
+    assert state['peak'] == 2
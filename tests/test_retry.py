@@ -0,0 +1,86 @@
+import io
+
+import pytest
+import requests
+import urllib3
+
+from thoughtspot_rest_api_v1 import RetryPolicy
+from thoughtspot_rest_api_v1.transport import TransportPoliciesMixin
+
+BASE_URL = 'https://ts.example.com/api/rest/2.0/'
+
+
+class StubAdapter(TransportPoliciesMixin):
+    """Each outcome is a status code, or an exception to raise"""
+    def __init__(self, outcomes, retry_policy):
+        self.outcomes = list(outcomes)
+        self.retry_policy = retry_policy
+        self.sent = 0
+
+    def _send_pooled(self, request, **kwargs):
+        self.sent += 1
+        outcome = self.outcomes.pop(0)
+        if isinstance(outcome, Exception):
+            raise outcome
+        response = requests.Response()
+        response.status_code = outcome
+        response._content = b''
+        response.raw = io.BytesIO()
+        return response
+
+
+def post(endpoint):
+    return requests.Request('POST', BASE_URL + endpoint, json={}).prepare()
+
+
+def policy(**kwargs):
+    kwargs.setdefault('backoff_factor', 0)
+    return RetryPolicy(**kwargs)
+
+
+def test_read_only_posts_are_retried_on_gateway_errors():
+    adapter = StubAdapter([502, 504, 200], policy())
+    assert adapter.send(post('metadata/search')).status_code == 200
+    assert adapter.retry_policy.counters['retries_by_status'] == {502: 1, 504: 1}
+
+
+def test_other_posts_are_only_retried_when_nothing_was_done():
+    adapter = StubAdapter([502], policy())
+    assert adapter.send(post('metadata/tml/import')).status_code == 502
+    adapter = StubAdapter([429, 503, 200], policy())
+    assert adapter.send(post('metadata/tml/import')).status_code == 200
+
+
+def test_connection_failures():
+    refused = requests.exceptions.ConnectionError(urllib3.exceptions.MaxRetryError(
+        None, BASE_URL, reason=urllib3.exceptions.NewConnectionError(None, 'refused')))
+    reset = requests.exceptions.ConnectionError('Connection reset by peer')
+
+    # Never reached the server: safe to send again
+    adapter = StubAdapter([refused, 200], policy())
+    assert adapter.send(post('metadata/tml/import')).status_code == 200
+    # May have been processed
+    adapter = StubAdapter([reset, 200], policy())
+    with pytest.raises(requests.exceptions.ConnectionError):
+        adapter.send(post('metadata/tml/import'))
+    adapter = StubAdapter([reset, 200], policy())
+    assert adapter.send(post('metadata/search')).status_code == 200
+    assert adapter.retry_policy.counters['connection_error_retries'] == 1
+
+
+def test_gives_up_after_max_retries():
+    adapter = StubAdapter([503] * 4, policy(max_retries=3))
+    assert adapter.send(post('metadata/search')).status_code == 503
+    assert adapter.sent == 4
+    assert adapter.retry_policy.counters == {'requests': 4, 'retries': 3, 'retries_by_status': {503: 3},
+                                             'connection_error_retries': 0, 'gave_up': 1}
+
+
+def test_backoff():
+    retry_policy = RetryPolicy(backoff_factor=1, backoff_max=5, jitter=False, retry_after_max=30)
+    assert [retry_policy.get_backoff(attempt) for attempt in range(4)] == [1, 2, 4, 5]
+    assert retry_policy.get_backoff(0, retry_after='12') == 12
+    assert retry_policy.get_backoff(0, retry_after='600') == 30
+    assert retry_policy.get_backoff(0, retry_after='Wed, 21 Oct 2015 07:28:00 GMT') == 0
+    assert retry_policy.get_backoff(2, retry_after='soon') == 4
+    assert 0 <= RetryPolicy(backoff_factor=1).get_backoff(3) <= 8
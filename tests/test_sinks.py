@@ -0,0 +1,108 @@
+import gzip
+import io
+
+import pytest
+
+from thoughtspot_rest_api_v1.sinks import CSVSink, write_data_pages
+
+
+def page(rows, column_names=('x', 'y')):
+    return {'column_names': list(column_names), 'data_rows': rows}
+
+
+def test_csv_sink_writes_header_once_and_counts_rows():
+    out = io.StringIO()
+    with CSVSink(out, row_group_size=2) as sink:
+        sink.write_pages([page([[1, 'a'], [2, 'b']]), page([[3, 'c']])])
+    assert out.getvalue().splitlines() == ['x,y', '1,a', '2,b', '3,c']
+    assert sink.rows_written == 3
+    assert sink.row_groups_written == 2
+
+
+def test_csv_sink_rejects_pages_with_other_columns():
+    with CSVSink(io.StringIO()) as sink:
+        sink.write_page(page([[1, 'a']]))
+        with pytest.raises(Exception):
+            sink.write_page(page([[1]], column_names=['z']))
+
+
+def test_csv_gzip_and_v1_pages(tmp_path):
+    path = str(tmp_path / 'out.csv.gz')
+    rows = write_data_pages([{'columnNames': ['a'], 'data': [[1], [2]]}], path, compression='gzip')
+    assert rows == 2
+    with gzip.open(path, 'rt') as fh:
+        assert fh.read().splitlines() == ['a', '1', '2']
+
+
+def test_csv_compression_needs_a_path():
+    with pytest.raises(ValueError):
+        CSVSink(io.StringIO(), compression='gzip')
+
+
+@pytest.fixture
+def parquet():
+    pytest.importorskip('pyarrow')
+    import pyarrow.parquet
+    return pyarrow.parquet
+
+
+def test_parquet_row_groups_of_row_group_size(parquet, tmp_path):
+    from thoughtspot_rest_api_v1.sinks import ParquetSink
+    path = str(tmp_path / 'out.parquet')
+    with ParquetSink(path, row_group_size=2) as sink:
+        sink.write_pages([page([[1, 'a'], [2, 'b'], [3, 'c']]), page([[4, 'd']])])
+    assert sink.rows_written == 4
+    assert parquet.ParquetFile(path).metadata.num_row_groups == 2
+    assert parquet.read_table(path).column('x').to_pylist() == [1, 2, 3, 4]
+
+
+def test_parquet_int_then_float_pages_in_one_row_group_are_widened(parquet, tmp_path):
+    path = str(tmp_path / 'out.parquet')
+    rows = write_data_pages([page([[100, 'a'], [200, 'b']]), page([[99.99, 'c'], [0.5, 'd']])], path,
+                            file_format='parquet')
+    assert rows == 4
+    table = parquet.read_table(path)
+    assert str(table.schema.field('x').type) == 'double'
+    assert table.column('x').to_pylist() == [100.0, 200.0, 99.99, 0.5]
+
+
+def test_parquet_string_after_numbers_is_widened_to_string(parquet, tmp_path):
+    path = str(tmp_path / 'out.parquet')
+    write_data_pages([page([[1, 'a']]), page([['n/a', 'b']])], path, file_format='parquet')
+    assert parquet.read_table(path).column('x').to_pylist() == ['1', 'n/a']
+
+
+def test_parquet_page_that_does_not_fit_written_row_groups_raises(parquet, tmp_path):
+    from thoughtspot_rest_api_v1.sinks import ParquetSink
+    sink = ParquetSink(str(tmp_path / 'out.parquet'), row_group_size=2)
+    sink.write_page(page([[1, 'a'], [2, 'b']]))
+    with pytest.raises(ValueError, match='row_group_size'):
+        sink.write_page(page([[1.5, 'c'], [2.5, 'd']]))
+
+
+def test_parquet_column_null_in_the_first_row_group_takes_later_values(parquet, tmp_path):
+    from thoughtspot_rest_api_v1.sinks import ParquetSink
+    path = str(tmp_path / 'out.parquet')
+    with ParquetSink(path, row_group_size=2) as sink:
+        sink.write_page(page([[1, None], [2, None]]))
+        sink.write_page(page([[3, 'x'], [4, 'y']]))
+    table = parquet.read_table(path)
+    assert str(table.schema.field('y').type) == 'string'
+    assert table.column('y').to_pylist() == [None, None, 'x', 'y']
+
+
+def test_parquet_null_column_in_the_first_row_group_keeps_its_declared_type(parquet, tmp_path):
+    from thoughtspot_rest_api_v1.sinks import ParquetSink
+    path = str(tmp_path / 'out.parquet')
+    with ParquetSink(path, row_group_size=2, column_types={'y': 'INT64'}) as sink:
+        sink.write_page(page([[1, None], [2, None]]))
+        sink.write_page(page([[3, 5], [4, 6]]))
+    table = parquet.read_table(path)
+    assert str(table.schema.field('y').type) == 'int64'
+    assert table.column('y').to_pylist() == [None, None, 5, 6]
+
+
+def test_parquet_all_empty_pages_write_a_file_with_the_columns(parquet, tmp_path):
+    path = str(tmp_path / 'out.parquet')
+    assert write_data_pages([page([])], path, file_format='parquet') == 0
+    assert parquet.read_table(path).column_names == ['x', 'y']
@@ -0,0 +1,109 @@
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import urlparse, parse_qs
+
+import pytest
+import requests
+
+from thoughtspot_rest_api_v1 import TSRestApiV1, RateLimiter, RateLimit
+from thoughtspot_rest_api_v1.transport import TSHTTPAdapter, TSHTTP2Adapter, ConnectionPoolExhausted
+
+BODY = b'%PDF' + b'x' * 100000
+
+
+class Handler(BaseHTTPRequestHandler):
+    protocol_version = 'HTTP/1.1'
+    requests_seen = []
+
+    def do_POST(self):
+        self.requests_seen.append(self.path)
+        self.send_response(200)
+        self.send_header('Content-Length', str(len(BODY)))
+        self.end_headers()
+        self.wfile.write(BODY)
+
+    def log_message(self, format, *args):
+        pass
+
+
+@pytest.fixture
+def server_url():
+    server = ThreadingHTTPServer(('127.0.0.1', 0), Handler)
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    yield 'http://127.0.0.1:{}'.format(server.server_address[1])
+    server.shutdown()
+    server.server_close()
+
+
+def blocking_session(url):
+    session = requests.Session()
+    session.mount(url, TSHTTPAdapter(pool_maxsize=1, pool_block=True, pool_timeout=0))
+    return session
+
+
+def test_streamed_response_holds_its_pool_slot_until_closed(server_url):
+    session = blocking_session(server_url)
+    response = session.post(server_url, stream=True)
+    with pytest.raises(ConnectionPoolExhausted):
+        session.post(server_url)
+    response.close()
+    assert session.post(server_url).content == BODY
+
+
+def test_streamed_response_frees_its_pool_slot_when_read(server_url):
+    session = blocking_session(server_url)
+    response = session.post(server_url, stream=True)
+    assert b''.join(response.iter_content(8192)) == BODY
+    assert session.post(server_url, stream=True).content == BODY
+    assert session.post(server_url).content == BODY
+
+
+@pytest.fixture(params=['http1', 'http2'])
+def rate_limited_session(request, server_url):
+    rate_limiter = RateLimiter(default=RateLimit(max_in_flight=1))
+    if request.param == 'http1':
+        adaptor = TSHTTPAdapter(rate_limiter=rate_limiter)
+    else:
+        pytest.importorskip('httpx')
+        adaptor = TSHTTP2Adapter(rate_limiter=rate_limiter)
+    session = requests.Session()
+    session.mount(server_url, adaptor)
+    yield session
+    adaptor.close()
+
+
+# Sends a request on another thread, returning the thread and the list its response body is added to
+def post_in_background(session, url):
+    bodies = []
+    thread = threading.Thread(target=lambda: bodies.append(session.post(url).content), daemon=True)
+    thread.start()
+    return thread, bodies
+
+
+def test_streamed_response_holds_its_rate_limit_slot_until_closed(rate_limited_session, server_url):
+    response = rate_limited_session.post(server_url, stream=True)
+    thread, bodies = post_in_background(rate_limited_session, server_url)
+    thread.join(0.2)
+    assert bodies == []
+    response.close()
+    thread.join(5)
+    assert bodies == [BODY]
+
+
+def test_streamed_response_frees_its_rate_limit_slot_when_read(rate_limited_session, server_url):
+    response = rate_limited_session.post(server_url, stream=True)
+    assert b''.join(response.iter_content(8192)) == BODY
+    thread, bodies = post_in_background(rate_limited_session, server_url)
+    thread.join(5)
+    assert bodies == [BODY]
+
+
+def test_pdf_stream_and_pdf_send_the_same_parameters(server_url):
+    ts = TSRestApiV1(server_url=server_url)
+    Handler.requests_seen.clear()
+    assert ts.export_pinboard_pdf('pb1', one_visualization_per_page=True, footer_text='f') == BODY
+    assert b''.join(ts.export_pinboard_pdf_stream('pb1', one_visualization_per_page=True, footer_text='f')) == BODY
+    first, second = [parse_qs(urlparse(path).query) for path in Handler.requests_seen]
+    assert first == second
+    assert first['layout_type'] == ['VISUALIZATION'] and first['footer_text'] == ['f']
@@ -0,0 +1,114 @@
+import json
+
+import pytest
+import requests
+
+from thoughtspot_rest_api_v1 import BulkTMLExporter, TMLExportBatchJob, TMLExportError
+from thoughtspot_rest_api_v1.tml_export import match_exported_objects
+
+
+def exported(guid, status_code='OK'):
+    return {'info': {'id': guid, 'status': {'status_code': status_code, 'error_message': 'bad'}},
+            'edoc': 'guid: {}'.format(guid)}
+
+
+class StubServer:
+    """Fails a whole request containing any of bad_guids, as the server does for an invalid GUID"""
+    def __init__(self, bad_guids=(), status_code=400):
+        self.bad_guids = set(bad_guids)
+        self.status_code = status_code
+        self.requests = []
+
+    def export_objects(self, guids):
+        self.requests.append(list(guids))
+        if self.bad_guids.intersection(guids):
+            response = requests.Response()
+            response.status_code = self.status_code
+            raise requests.exceptions.HTTPError(response=response)
+        return [exported(guid) for guid in guids]
+
+
+def test_bulk_export_yields_every_guid_once():
+    server = StubServer()
+    exporter = BulkTMLExporter(server.export_objects, batch_size=3, max_workers=2)
+    results = list(exporter.export(['g{}'.format(i) for i in range(7)] + ['g0']))
+    assert sorted(guid for guid, _, _ in results) == ['g{}'.format(i) for i in range(7)]
+    assert all(edoc == 'guid: {}'.format(guid) and error is None for guid, edoc, error in results)
+    assert exporter.requests_sent == 3
+
+
+def test_failed_batches_are_split_down_to_the_bad_guid():
+    server = StubServer(bad_guids={'g5'})
+    exporter = BulkTMLExporter(server.export_objects, batch_size=8, max_workers=1)
+    results = {guid: (edoc, error) for guid, edoc, error in exporter.export(['g{}'.format(i) for i in range(8)])}
+    assert isinstance(results['g5'][1], requests.exceptions.HTTPError)
+    assert all(error is None for guid, (edoc, error) in results.items() if guid != 'g5')
+    assert exporter.batches_split == 3
+
+
+def test_authorization_failures_are_not_split():
+    server = StubServer(bad_guids={'g1'}, status_code=401)
+    exporter = BulkTMLExporter(server.export_objects, batch_size=4, max_workers=1)
+    results = list(exporter.export(['g0', 'g1', 'g2']))
+    assert len(server.requests) == 1
+    assert all(isinstance(error, requests.exceptions.HTTPError) for _, _, error in results)
+
+
+def test_match_exported_objects():
+    results = list(match_exported_objects(['g1', 'g2', 'g3'], [exported('g2', 'ERROR'), exported('g1')]))
+    assert results[0] == ('g1', 'guid: g1', None)
+    assert isinstance(results[1][2], TMLExportError) and results[1][2].info['id'] == 'g2'
+    assert isinstance(results[2][2], TMLExportError)
+    # No ids in the response: matched by position
+    assert list(match_exported_objects(['g1'], [{'edoc': 'x'}])) == [('g1', 'x', None)]
+
+
+class StubBatchServer:
+    def __init__(self, total):
+        self.total = total
+        self.offsets = []
+
+    def export_batch(self, request):
+        self.offsets.append(request['batch_offset'])
+        end = min(self.total, request['batch_offset'] + request['batch_size'])
+        return [exported('g{}'.format(i)) for i in range(request['batch_offset'], end)]
+
+
+def test_batch_job_exports_every_batch(tmp_path):
+    server = StubBatchServer(total=25)
+    job = TMLExportBatchJob(server.export_batch, {'metadata_type': 'USER'}, str(tmp_path / 'journal.jsonl'),
+                            batch_size=10, max_workers=3)
+    batches = dict(job.batches())
+    assert sorted(batches) == [0, 10, 20]
+    assert sum(len(objects) for objects in batches.values()) == 25
+    assert job.complete is True
+
+
+def test_batch_job_resumes_after_the_last_handled_batch(tmp_path):
+    journal_path = str(tmp_path / 'journal.jsonl')
+    server = StubBatchServer(total=25)
+    job = TMLExportBatchJob(server.export_batch, {'metadata_type': 'USER'}, journal_path, batch_size=10,
+                            max_workers=1)
+    batches = job.batches()
+    assert next(batches)[0] == 0
+    assert next(batches)[0] == 10
+    # Stopped while handling the batch at offset 10, so only offset 0 is recorded
+    batches.close()
+
+    resumed = TMLExportBatchJob(server.export_batch, {'metadata_type': 'USER'}, journal_path, batch_size=10,
+                                max_workers=1)
+    assert [offset for offset, _ in resumed.batches()] == [10, 20]
+    assert resumed.complete is True
+
+    with pytest.raises(Exception, match='different export'):
+        TMLExportBatchJob(server.export_batch, {'metadata_type': 'GROUP'}, journal_path, batch_size=10)
+
+
+def test_batch_job_ignores_a_line_cut_short(tmp_path):
+    journal_path = tmp_path / 'journal.jsonl'
+    job_line = json.dumps({'job': {'request': {'metadata_type': 'USER'}, 'batch_size': 10}})
+    journal_path.write_text(job_line + '\n' + json.dumps({'batch_offset': 0, 'count': 10}) + '\n{"batch_off')
+    server = StubBatchServer(total=15)
+    job = TMLExportBatchJob(server.export_batch, {'metadata_type': 'USER'}, str(journal_path), batch_size=10,
+                            max_workers=1)
+    assert [offset for offset, _ in job.batches()] == [10]
@@ -0,0 +1,209 @@
+import asyncio
+import json
+import threading
+import time
+
+import pytest
+
+from thoughtspot_rest_api_v1.tml_import import (
+    TMLDocument, WaveTMLImporter, plan_tml_waves, TMLImportJobManager, AsyncTMLImportJobManager, TMLImportTaskError
+)
+
+
+TABLE_YAML = """guid: t-1
+table:
+  name: Sales
+  connection:
+    name: Warehouse
+  columns:
+  - name: Region
+    db_column_name: REGION
+"""
+
+WORKSHEET_YAML = """guid: w-1
+worksheet:
+  name: Sales
+  tables:
+  - name: Sales
+  description: Updated on 2024-01-31
+"""
+
+ANSWER_YAML = """guid: a-1
+answer:
+  name: Sales by region
+  tables:
+  - id: Sales
+    name: Sales
+"""
+
+
+def test_yaml_scalars_are_kept_as_written():
+    document = TMLDocument(0, """guid: x
+table:
+  name: on
+  created: 2024-01-31
+  flag: yes
+  enabled: true
+  code: 0123
+  ratio: 1.5
+  missing: null
+""")
+    body = document.tml['table']
+    assert body == {'name': 'on', 'created': '2024-01-31', 'flag': 'yes', 'enabled': True, 'code': 123,
+                    'ratio': 1.5, 'missing': None}
+    document.modified = True
+    assert json.loads(document.to_import_string())['table']['created'] == '2024-01-31'
+
+
+def test_dict_sources_are_not_modified():
+    source = {'guid': 'w-1', 'worksheet': {'name': 'W', 'tables': [{'name': 'T'}]}}
+    document = TMLDocument(0, source)
+    document.references[0][1]['fqn'] = 'new'
+    assert 'fqn' not in source['worksheet']['tables'][0]
+
+
+def test_waves_follow_references_and_types():
+    documents = [TMLDocument(i, source) for i, source in enumerate([ANSWER_YAML, WORKSHEET_YAML, TABLE_YAML])]
+    waves = plan_tml_waves(documents)
+    assert [[document.tml_type for document in wave] for wave in waves] == [['table'], ['worksheet'], ['answer']]
+    # The Worksheet named Sales refers to the Table named Sales, the Answer to the Worksheet
+    assert documents[1].reference_targets == [2]
+    assert documents[0].reference_targets == [1]
+
+
+class StubImporter:
+    def __init__(self, failing_names=()):
+        self.failing_names = set(failing_names)
+        self.chunks = []
+
+    def import_chunk(self, tml_strings):
+        self.chunks.append(tml_strings)
+        results = []
+        for tml_string in tml_strings:
+            document = TMLDocument(0, tml_string)
+            if document.name in self.failing_names:
+                results.append({'response': {'status': {'status_code': 'ERROR', 'error_message': 'bad'}}})
+            else:
+                results.append({'response': {'status': {'status_code': 'OK'},
+                                             'header': {'id_guid': 'new-' + document.guid}}})
+        return results
+
+
+def test_new_guids_are_fed_forward_by_type_and_name():
+    importer = StubImporter()
+    results = WaveTMLImporter(importer.import_chunk, chunk_size=2).import_documents(
+        [ANSWER_YAML, WORKSHEET_YAML, TABLE_YAML])
+    assert [result['new_guid'] for result in results] == ['new-a-1', 'new-w-1', 'new-t-1']
+    sent = {TMLDocument(0, tml).guid: TMLDocument(0, tml).tml for chunk in importer.chunks for tml in chunk}
+    # Same name, different types: each reference gets the GUID of the object it is to
+    assert sent['w-1']['worksheet']['tables'][0]['fqn'] == 'new-t-1'
+    assert sent['a-1']['answer']['tables'][0]['fqn'] == 'new-w-1'
+    # Unmodified documents are sent as given
+    assert TABLE_YAML in importer.chunks[0]
+
+
+def test_dependents_of_a_failed_document_are_skipped():
+    importer = StubImporter(failing_names={'Sales by region'})
+    results = WaveTMLImporter(importer.import_chunk).import_documents(
+        [TABLE_YAML, WORKSHEET_YAML, ANSWER_YAML,
+         'guid: l-1\nliveboard:\n  name: Board\n  visualizations:\n  - answer:\n      tables:\n      - name: Sales\n'])
+    assert [result['status_code'] for result in results] == ['OK', 'OK', 'ERROR', 'OK']
+    skipping = StubImporter(failing_names={'Sales'})
+    results = WaveTMLImporter(skipping.import_chunk).import_documents([TABLE_YAML, WORKSHEET_YAML])
+    assert [result['status_code'] for result in results] == ['ERROR', 'SKIPPED']
+
+
+class StubImportServer:
+    """
+    metadata_tml_async_import() / metadata_tml_async_status() of a TSRestApiV2, with tasks that finish once
+    their status has been asked for finish_after times
+    """
+    def __init__(self, finish_after=1, failing_tasks=(), status_error=None):
+        self.finish_after = finish_after
+        self.failing_tasks = set(failing_tasks)
+        self.status_error = status_error
+        self.polls = {}
+        self.status_requests = []
+        self._lock = threading.Lock()
+
+    def metadata_tml_async_import(self, metadata_tmls, **kwargs):
+        with self._lock:
+            task_id = 'task-{}'.format(len(self.polls))
+            self.polls[task_id] = 0
+        return {'task_id': task_id}
+
+    def metadata_tml_async_status(self, request):
+        self.status_requests.append(request)
+        if self.status_error is not None:
+            raise self.status_error
+        entries = []
+        with self._lock:
+            for task_id in request['task_ids']:
+                self.polls[task_id] += 1
+                if self.polls[task_id] < self.finish_after:
+                    status = 'IN_PROGRESS'
+                elif task_id in self.failing_tasks:
+                    status = 'FAILED'
+                else:
+                    status = 'COMPLETED'
+                entries.append({'task_id': task_id, 'task_status': status})
+        return {'status_list': entries, 'last_batch': True}
+
+
+class AsyncStubImportServer(StubImportServer):
+    async def metadata_tml_async_import(self, metadata_tmls, **kwargs):
+        return StubImportServer.metadata_tml_async_import(self, metadata_tmls, **kwargs)
+
+    async def metadata_tml_async_status(self, request):
+        return StubImportServer.metadata_tml_async_status(self, request)
+
+
+def test_manager_resolves_and_fails_futures():
+    server = StubImportServer(finish_after=2, failing_tasks={'task-1'})
+    with TMLImportJobManager(server, poll_interval_sec=0.01) as manager:
+        futures = [manager.submit(metadata_tmls=['a']) for _ in range(3)]
+    assert futures[0].result()['task_status'] == 'COMPLETED'
+    with pytest.raises(TMLImportTaskError) as e:
+        futures[1].result()
+    assert e.value.task_id == 'task-1'
+    # All unfinished tasks are checked in each status call
+    assert len(server.status_requests[0]['task_ids']) == 3
+
+
+def test_manager_fails_futures_after_repeated_poll_failures():
+    server = StubImportServer(status_error=ConnectionError('server down'))
+    started = time.monotonic()
+    with TMLImportJobManager(server, poll_interval_sec=0.01, max_poll_interval_sec=0.02,
+                             max_poll_failures=3) as manager:
+        future = manager.submit(metadata_tmls=['a'])
+    assert time.monotonic() - started < 5
+    with pytest.raises(ConnectionError):
+        future.result(timeout=0)
+    assert manager.status_calls == 0
+    assert len(server.status_requests) == 3
+
+
+def test_steady_submits_do_not_starve_polling():
+    server = StubImportServer(finish_after=1)
+    with TMLImportJobManager(server, poll_interval_sec=0.05) as manager:
+        deadline = time.monotonic() + 0.5
+        while time.monotonic() < deadline:
+            manager.submit(metadata_tmls=['a'])
+            time.sleep(0.01)
+        polls_while_submitting = manager.status_calls
+    assert polls_while_submitting >= 3
+
+
+def test_async_manager_resolves_and_gives_up_after_poll_failures():
+    async def run():
+        server = AsyncStubImportServer(finish_after=2, failing_tasks={'task-1'})
+        async with AsyncTMLImportJobManager(server, poll_interval_sec=0.01) as manager:
+            futures = [await manager.submit(metadata_tmls=['a']) for _ in range(2)]
+        assert futures[0].result()['task_status'] == 'COMPLETED'
+        assert isinstance(futures[1].exception(), TMLImportTaskError)
+
+        failing = AsyncStubImportServer(status_error=ConnectionError('server down'))
+        async with AsyncTMLImportJobManager(failing, poll_interval_sec=0.01, max_poll_failures=2) as manager:
+            future = await manager.submit(metadata_tmls=['a'])
+        assert isinstance(future.exception(), ConnectionError)
+    asyncio.run(asyncio.wait_for(run(), timeout=5))
@@ -0,0 +1,91 @@
+import json
+from collections import OrderedDict
+
+import pytest
+
+from thoughtspot_rest_api_v1 import TSRestApiV1, JSONBackend
+
+
+class StubResponse:
+    def __init__(self, body):
+        self.content = json.dumps(body).encode('utf-8')
+        self.status_code = 200
+
+    def raise_for_status(self):
+        pass
+
+
+class StubSession:
+    def __init__(self, body):
+        self.body = body
+        self.posts = []
+
+    def post(self, url, data=None, headers=None):
+        self.posts.append(data)
+        return StubResponse(self.body)
+
+
+EDOC = json.dumps({'guid': 'g1', 'table': {'name': 't1', 'columns': [{'name': 'c1'}]}})
+EXPORT_BODY = {'object': [{'info': {'name': 't1', 'id': 'g1', 'status': {'status_code': 'OK'}}, 'edoc': EDOC}]}
+
+
+def client(body):
+    ts = TSRestApiV1(server_url='https://ts.example.com')
+    ts.requests_session = StubSession(body)
+    return ts
+
+
+def test_default_decoding_is_unchanged():
+    ts = client(EXPORT_BODY)
+    tml = ts.metadata_tml_export('g1')
+    assert type(tml) is dict and type(tml['table']) is dict
+
+    associated = ts.metadata_tml_export('g1', export_associated=True)
+    assert type(associated) is OrderedDict and type(associated['object'][0]) is OrderedDict
+
+    tml, name_guid_map = ts.metadata_tml_export_with_associations_map('g1')
+    assert type(tml) is dict and name_guid_map == {'t1': 'g1'}
+
+    assert ts.metadata_tml_export_string('g1', formattype='JSON') == EDOC
+    assert type(ts.metadata_tml_import(tml)) is dict
+
+
+def test_ordered_true_and_false_apply_to_every_method():
+    ts = client(EXPORT_BODY)
+    ts.set_tml_json_backend(ordered=True)
+    assert type(ts.metadata_tml_export('g1')) is OrderedDict
+    assert type(ts.metadata_tml_import({'guid': 'g1'})) is OrderedDict
+
+    ts.set_tml_json_backend(ordered=False)
+    assert type(ts.metadata_tml_export('g1', export_associated=True)) is dict
+
+
+def test_import_encodes_with_the_backend():
+    ts = client(EXPORT_BODY)
+    ts.metadata_tml_import([{'guid': 'g1'}, {'guid': 'g2'}])
+    assert ts.requests_session.posts[0]['import_objects'] == str(['{"guid": "g1"}', '{"guid": "g2"}'])
+
+
+def test_errors_in_a_200_response_raise():
+    body = {'object': [{'response': {'status': {'status_code': 'ERROR', 'error_message': 'bad'}}}]}
+    with pytest.raises(SyntaxError):
+        client(body).metadata_tml_import({'guid': 'g1'})
+    with pytest.raises(SyntaxError):
+        TSRestApiV1.raise_tml_errors(StubResponse(body))
+
+
+def test_raise_tml_errors_decodes_with_the_given_backend():
+    decoded = TSRestApiV1.raise_tml_errors(StubResponse(EXPORT_BODY), json_backend=JSONBackend(ordered=True))
+    assert type(decoded) is OrderedDict
+    assert type(TSRestApiV1.raise_tml_errors(StubResponse(EXPORT_BODY))) is dict
+
+
+def test_orjson_backend():
+    pytest.importorskip('orjson')
+    with pytest.raises(ValueError):
+        JSONBackend(backend='orjson', ordered=True)
+    ts = client(EXPORT_BODY)
+    ts.set_tml_json_backend(backend='orjson')
+    associated = ts.metadata_tml_export('g1', export_associated=True)
+    assert type(associated) is dict and associated['object'][0]['info']['id'] == 'g1'
+    assert ts.metadata_tml_export('g1')['table']['columns'] == [{'name': 'c1'}]
@@ -0,0 +1,97 @@
+import json
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import pytest
+
+from thoughtspot_rest_api_v1 import TSRestApiV2, TSHTTPAdapter, RetryPolicy
+
+
+class Handler(BaseHTTPRequestHandler):
+    protocol_version = 'HTTP/1.1'
+    statuses = []
+    seen_headers = []
+
+    def do_POST(self):
+        self.rfile.read(int(self.headers.get('Content-Length', 0)))
+        self.seen_headers.append(dict(self.headers))
+        status = self.statuses.pop(0) if self.statuses else 200
+        content = json.dumps({'authorization': self.headers.get('Authorization')}).encode('utf-8')
+        self.send_response(status)
+        self.send_header('Content-Type', 'application/json')
+        self.send_header('Content-Length', str(len(content)))
+        self.send_header('Set-Cookie', 'JSESSIONID=abc; Path=/')
+        self.end_headers()
+        self.wfile.write(content)
+
+    def log_message(self, format, *args):
+        pass
+
+
+@pytest.fixture
+def ts():
+    server = ThreadingHTTPServer(('127.0.0.1', 0), Handler)
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    Handler.statuses = []
+    Handler.seen_headers = []
+    yield TSRestApiV2(server_url='http://127.0.0.1:{}'.format(server.server_address[1]))
+    server.shutdown()
+    server.server_close()
+
+
+def test_connection_pool_keeps_the_policies_already_set(ts):
+    retry_policy = RetryPolicy(backoff_factor=0)
+    ts.set_retry_policy(retry_policy)
+    adaptor = ts.set_connection_pool(pool_maxsize=8)
+    assert isinstance(adaptor, TSHTTPAdapter) and adaptor.retry_policy is retry_policy
+    assert ts.get_transport_adaptor() is adaptor
+
+    Handler.statuses = [503]
+    assert ts.post_request('metadata/search', request={}) == {'authorization': None}
+    assert retry_policy.counters['retries'] == 1
+
+
+def test_bearer_token_changes_while_other_threads_send(ts):
+    ts.set_connection_pool(pool_maxsize=4)
+    errors = []
+
+    def send():
+        try:
+            for _ in range(20):
+                ts.post_request('metadata/search', request={})
+        except Exception as e:
+            errors.append(e)
+
+    threads = [threading.Thread(target=send) for _ in range(4)]
+    for thread in threads:
+        thread.start()
+    for i in range(50):
+        ts.bearer_token = 't{}'.format(i)
+    for thread in threads:
+        thread.join()
+    assert errors == []
+    assert ts.post_request('metadata/search', request={}) == {'authorization': 'Bearer t49'}
+    assert ts.requests_session.headers['X-Requested-By'] == 'ThoughtSpot'
+
+
+def test_http2_transport_sends_through_httpx_with_the_same_policies(ts):
+    pytest.importorskip('httpx')
+    pytest.importorskip('h2')
+    retry_policy = RetryPolicy(backoff_factor=0)
+    ts.set_retry_policy(retry_policy)
+    ts.bearer_token = 'abc'
+    adaptor = ts.set_http2_transport(max_connections=4)
+    assert adaptor.retry_policy is retry_policy
+
+    Handler.statuses = [502]
+    assert ts.post_request('metadata/search', request={}) == {'authorization': 'Bearer abc'}
+    assert retry_policy.counters['retries'] == 1
+    # The session cookie is kept as with TSHTTPAdapter
+    assert ts.requests_session.cookies.get('JSESSIONID') == 'abc'
+    ts.post_request('metadata/search', request={})
+    assert 'JSESSIONID=abc' in Handler.seen_headers[-1]['Cookie']
+
+    response = ts.requests_session.post(ts.base_url + 'metadata/search', json={}, stream=True)
+    assert json.loads(b''.join(response.iter_content(4))) == {'authorization': 'Bearer abc'}
+    adaptor.close()
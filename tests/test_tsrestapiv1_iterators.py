@@ -0,0 +1,66 @@
+from thoughtspot_rest_api_v1 import TSRestApiV1
+
+
+def client():
+    return TSRestApiV1(server_url='https://ts.example.com')
+
+
+def test_searchdata_rows_page_by_offset():
+    rows = [[i] for i in range(11)]
+    offsets = []
+
+    def searchdata(query_string, data_source_guid, format_type, batch_size, offset):
+        offsets.append(offset)
+        return {'columnNames': ['a'], 'data': rows[offset:offset + batch_size]}
+
+    ts = client()
+    ts.searchdata = searchdata
+    assert list(ts.searchdata_rows('[a]', 'ds', batch_size=4, read_ahead=0)) == rows
+    assert offsets == [0, 4, 8]
+
+
+def test_pinboarddata_pages_each_viz_that_has_more_rows():
+    rows_by_viz = {'v1': [[i] for i in range(5)], 'v2': [[0]]}
+    calls = []
+
+    def pinboarddata(pinboard_guid, vizids, format_type, batch_size, offset):
+        calls.append((vizids, offset))
+        return {vizid: {'columnNames': ['a'], 'data': rows_by_viz[vizid][offset:offset + batch_size]}
+                for vizid in vizids}
+
+    ts = client()
+    ts.pinboarddata = pinboarddata
+    batches = list(ts.pinboarddata_batches('pb', ['v1', 'v2'], batch_size=2, read_ahead=0))
+    assert [(vizid, len(batch['data'])) for vizid, batch in batches] == [('v1', 2), ('v1', 2), ('v1', 1), ('v2', 1)]
+    assert calls == [(['v1', 'v2'], 0), (['v1'], 2), (['v1'], 4)]
+    assert list(ts.pinboarddata_rows('pb', 'v1', batch_size=2)) == rows_by_viz['v1']
+
+
+def test_metadata_list_iter_stops_on_is_last_batch_and_projects_fields():
+    headers = [{'id': 'g{}'.format(i), 'name': 'n{}'.format(i), 'owner': 'o'} for i in range(5)]
+    offsets = []
+
+    def metadata_list(batchsize, offset, **kwargs):
+        offsets.append(offset)
+        return {'headers': headers[offset:offset + batchsize], 'isLastBatch': offset + batchsize >= len(headers)}
+
+    ts = client()
+    ts.metadata_list = metadata_list
+    assert list(ts.metadata_list_iter('PINBOARD_ANSWER_BOOK', batchsize=5, fields=['id', 'name'],
+                                      read_ahead=0)) == [{'id': h['id'], 'name': h['name']} for h in headers]
+    # A full batch marked as the last one is not followed by another request
+    assert offsets == [0]
+
+
+def test_metadata_listobjectheaders_iter_stops_on_a_short_batch():
+    headers = [{'id': 'g{}'.format(i)} for i in range(6)]
+    offsets = []
+
+    def metadata_listobjectheaders(batchsize, offset, **kwargs):
+        offsets.append(offset)
+        return headers[offset:offset + batchsize]
+
+    ts = client()
+    ts.metadata_listobjectheaders = metadata_listobjectheaders
+    assert list(ts.metadata_listobjectheaders_iter('LOGICAL_TABLE', batchsize=3, read_ahead=0)) == headers
+    assert offsets == [0, 3, 6]
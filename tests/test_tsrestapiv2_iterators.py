@@ -0,0 +1,61 @@
+from thoughtspot_rest_api_v1 import TSRestApiV2
+
+
+def client_with(post_request):
+    ts = TSRestApiV2(server_url='https://ts.example.com')
+    ts.post_request = post_request
+    return ts
+
+
+def test_metadata_search_iter_pages_from_the_requested_offset():
+    headers = [{'metadata_id': 'g{}'.format(i)} for i in range(23)]
+    requests_sent = []
+
+    def post_request(endpoint, request):
+        assert endpoint == 'metadata/search'
+        requests_sent.append(request)
+        return headers[request['record_offset']:request['record_offset'] + request['record_size']]
+
+    ts = client_with(post_request)
+    assert list(ts.metadata_search_iter({'metadata': [{'type': 'LIVEBOARD'}], 'record_offset': 3},
+                                        record_size=10, read_ahead=2)) == headers[3:]
+    # Pages requested ahead are at most read_ahead beyond the short page that ends the search
+    assert sorted(r['record_offset'] for r in requests_sent)[:3] == [3, 13, 23]
+    assert len(requests_sent) <= 5
+    assert all(r['metadata'] == [{'type': 'LIVEBOARD'}] for r in requests_sent)
+
+
+class StubDataServer:
+    """Rows of each visualization, returned a page at a time as the data endpoints do"""
+    def __init__(self, rows_by_viz):
+        self.rows_by_viz = rows_by_viz
+        self.requests = []
+
+    def post_request(self, endpoint, request):
+        self.requests.append((endpoint, request))
+        viz_ids = request.get('visualization_identifiers', list(self.rows_by_viz))
+        start = request['record_offset']
+        end = start + request['record_size']
+        return {'contents': [{'visualization_id': viz_id, 'column_names': ['a'],
+                              'data_rows': self.rows_by_viz[viz_id][start:end]} for viz_id in viz_ids]}
+
+
+def test_searchdata_rows_and_batches():
+    rows = [[i] for i in range(12)]
+    server = StubDataServer({'answer': rows})
+    ts = client_with(server.post_request)
+    assert list(ts.searchdata_rows({'query_string': '[a]'}, record_size=5)) == rows
+    assert [len(batch['data_rows']) for batch in ts.metadata_answer_data_batches({}, record_size=4)] == [4, 4, 4, 0]
+    assert {endpoint for endpoint, _ in server.requests} == {'searchdata', 'metadata/answer/data'}
+
+
+def test_liveboard_batches_page_each_visualization_on_its_own():
+    server = StubDataServer({'v1': [[i] for i in range(7)], 'v2': [[i] for i in range(2)]})
+    ts = client_with(server.post_request)
+    batches = list(ts.metadata_liveboard_data_batches({'metadata_identifier': 'lb'}, record_size=3, read_ahead=0))
+    assert [(batch['visualization_id'], len(batch['data_rows'])) for batch in batches] == \
+        [('v1', 3), ('v1', 3), ('v1', 1), ('v2', 2)]
+    # Only the first request covers every visualization
+    assert all(request['visualization_identifiers'] == ['v1'] for _, request in server.requests[1:])
+    assert list(ts.metadata_liveboard_data_rows({'metadata_identifier': 'lb'}, 'v1', record_size=3)) == \
+        [[i] for i in range(7)]